@@ -0,0 +1,211 @@
+"""
+Connection pooling for the MySQL backends (DB_POOL).
+
+Django opens a new connection for every request when CONN_MAX_AGE is 0, paying
+a TCP + TLS + auth handshake against Azure MySQL each time. The pooled backends
+(Trainee.db_pool.mysql, Trainee.db_pool.mysql_connector) keep connections per
+worker process instead: the first query of a request checks one out, and the
+close() Django does at the end of the request hands it back.
+
+DATABASES[alias]['POOL'] configures the pool:
+    SIZE                connections per process; ASGI requests run in parallel threads
+    TIMEOUT             seconds to wait for a free connection before failing
+    MAX_LIFETIME        connections older than this are closed instead of reused
+    HEALTH_CHECK_IDLE   a connection idle longer than this is pinged before reuse
+    CONNECT_RETRIES     extra connection attempts on transient errors
+"""
+import os
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+DEFAULTS = {
+    'SIZE': 4,
+    'TIMEOUT': 10,
+    'MAX_LIFETIME': 600,
+    'HEALTH_CHECK_IDLE': 30,
+    'CONNECT_RETRIES': 2,
+}
+
+STAT_KEYS = ('checkouts', 'reused', 'created', 'waits', 'wait_seconds', 'timeouts',
+             'health_checks', 'reconnects', 'expired', 'discarded')
+
+
+class ConnectionPool:
+    """Idle raw DB-API connections of one database alias in this process"""
+
+    def __init__(self, alias, options, database_error):
+        self.alias = alias
+        self.options = {**DEFAULTS, **options}
+        self.database_error = database_error
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = []  # [(connection, created_at, released_at)], most recently used last
+        self.in_use = {}  # id(connection) -> created_at
+        self.opening = 0
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+
+    def count(self, event, amount=1):
+        # Callers hold the condition lock
+        self.stats[event] += amount
+        from core.metrics import DB_POOL_EVENTS
+        DB_POOL_EVENTS.labels(self.alias, event).inc(amount)
+
+    def checkout(self, connect):
+        """Return a healthy raw connection; connect() opens a new one"""
+        deadline = time.monotonic() + self.options['TIMEOUT']
+        waited_since = None
+        with self.condition:
+            self.count('checkouts')
+            while True:
+                entry = self.take_idle()
+                if entry is not None:
+                    break
+                if len(self.in_use) + self.opening < self.options['SIZE']:
+                    self.opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.count('timeouts')
+                    raise OperationalError(
+                        f"Connection pool '{self.alias}' exhausted: {self.options['SIZE']} connections "
+                        f"in use for {self.options['TIMEOUT']}s"
+                    )
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self.count('waits')
+                self.condition.wait(remaining)
+            if waited_since is not None:
+                self.count('wait_seconds', time.monotonic() - waited_since)
+
+        if entry is not None:
+            connection, created_at, released_at = entry
+            if time.monotonic() - released_at < self.options['HEALTH_CHECK_IDLE'] or self.ping(connection):
+                with self.condition:
+                    self.count('reused')
+                return connection
+            # Dropped by the server (wait_timeout, failover): replace it in the same slot
+            with self.condition:
+                self.in_use.pop(id(connection), None)
+                self.opening += 1
+                self.count('reconnects')
+            self.close_quietly(connection)
+
+        try:
+            connection = self.open(connect)
+        except BaseException:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opening -= 1
+            self.in_use[id(connection)] = time.monotonic()
+            self.count('created')
+        return connection
+
+    def take_idle(self):
+        now = time.monotonic()
+        while self.idle:
+            connection, created_at, released_at = self.idle.pop()
+            if now - created_at >= self.options['MAX_LIFETIME']:
+                self.count('expired')
+                self.close_quietly(connection)
+                continue
+            self.in_use[id(connection)] = created_at
+            return connection, created_at, released_at
+        return None
+
+    def open(self, connect):
+        for attempt in range(self.options['CONNECT_RETRIES'] + 1):
+            try:
+                return connect()
+            except self.database_error:
+                if attempt == self.options['CONNECT_RETRIES']:
+                    raise
+                with self.condition:
+                    self.count('reconnects')
+                time.sleep(0.1 * 2 ** attempt)
+
+    def ping(self, connection):
+        with self.condition:
+            self.count('health_checks')
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def release(self, connection, reusable):
+        with self.condition:
+            created_at = self.in_use.pop(id(connection), None)
+            if created_at is not None and reusable and time.monotonic() - created_at < self.options['MAX_LIFETIME']:
+                self.idle.append((connection, created_at, time.monotonic()))
+                self.condition.notify()
+                return
+            if created_at is not None:
+                self.count('discarded')
+                self.condition.notify()
+        self.close_quietly(connection)
+
+    @staticmethod
+    def close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'size': self.options['SIZE'],
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in self.stats.items()},
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(wrapper):
+    pool = _pools.get(wrapper.alias)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(wrapper.alias)
+            # After a fork the parent's sockets must be left alone, not closed
+            if pool is None or pool.pid != os.getpid():
+                pool = ConnectionPool(wrapper.alias, wrapper.settings_dict.get('POOL', {}), wrapper.Database.OperationalError)
+                _pools[wrapper.alias] = pool
+    return pool
+
+
+def pool_stats():
+    """{alias: statistics} of the pools of this process"""
+    return {alias: pool.snapshot() for alias, pool in _pools.items() if pool.pid == os.getpid()}
+
+
+class PooledDatabaseWrapperMixin:
+    """DatabaseWrapper mixin: get_new_connection() checks out, _close() gives back"""
+
+    def get_new_connection(self, conn_params):
+        return get_pool(self).checkout(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Never hand a connection with an open transaction or a failed statement to the next request
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable and not self.get_autocommit():
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        get_pool(self).release(self.connection, reusable)
@@ -0,0 +1,7 @@
+from mysql.connector.django.base import DatabaseWrapper as ConnectorDatabaseWrapper
+
+from Trainee.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, ConnectorDatabaseWrapper):
+    """mysql.connector.django with pooled connections"""
@@ -1,6 +1,76 @@
 """
-Custom middleware to fix Azure App Service redirect loop
+Custom middleware: Azure App Service redirect loop fix, per-request SQL instrumentation,
+Prometheus request metrics, throttling, read-replica routing and on-demand profiling
+
+Everything in MIDDLEWARE from this module runs natively in both modes: under
+ASGI (async get_response) __call__ hands back a coroutine and process_view is
+a coroutine function, so Django adds no sync_to_async/async_to_sync hop around
+them. Blocking work (throttle store, profiler admin check) moves to a thread
+only when a request actually needs it.
 """
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Distinct SQL statements (slowest first) included in a slow request log entry
+SLOW_LOG_QUERIES = 5
+
+# QueryStats of the current request; contextvars follow sync_to_async into the ORM threads
+_query_stats = contextvars.ContextVar('query_stats', default=None)
+
+
+class DualModeMiddleware:
+    """Base for middleware with a sync __call__ and an async __acall__ (and optionally aprocess_view)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            if hasattr(self, 'aprocess_view'):
+                # Django only wraps process_view in sync_to_async when it is not a coroutine function
+                self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class StaticFilesMiddleware(DualModeMiddleware, WhiteNoiseMiddleware):
+    """WhiteNoise (sync-only in whitenoise 6) with a native async path"""
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        DualModeMiddleware.__init__(self, get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
 
 class AzureProxyMiddleware:
     """
@@ -21,3 +91,317 @@ class AzureProxyMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class QueryStats:
+    """Counts and times every query of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # SQL text (with placeholders) -> [executions, seconds]; many executions of one text = N+1
+        self.signatures = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            signature = self.signatures.get(sql)
+            if signature is None:
+                self.signatures[sql] = [1, elapsed]
+            else:
+                signature[0] += 1
+                signature[1] += elapsed
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper installed once on every connection; reports to the QueryStats of the current request"""
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class QueryInstrumentationMiddleware(DualModeMiddleware):
+    """
+    Per-request SQL instrumentation, cheap enough to stay on in production.
+
+    Adds a Server-Timing header (db, serialize, total) and logs requests that
+    exceed SLOW_REQUEST_MS or SLOW_REQUEST_QUERIES, plus any request that runs
+    the same SQL N_PLUS_ONE_THRESHOLD or more times (an N+1 signature).
+    "serialize" is the non-SQL time spent in the view and renderer: DRF
+    serializers, permission checks and JSON encoding.
+
+    Connections are per thread, and under ASGI the ORM runs in other threads
+    than this middleware, so every connection carries record_query and the
+    request's QueryStats travels in a contextvar instead.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        connection_created.connect(instrument_connection, dispatch_uid='query-instrumentation')
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, started = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def begin(self, request):
+        # Connections opened before the middleware was loaded (this thread only)
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        stats = QueryStats()
+        request._query_stats = stats
+        request._view_started = None
+        return stats, _query_stats.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        finished = time.perf_counter()
+        total_ms = (finished - started) * 1000
+        db_ms = stats.duration * 1000
+        serialize_ms = 0.0
+        if request._view_started is not None:
+            view_started, db_before_view = request._view_started
+            serialize_ms = max(0.0, (finished - view_started - (stats.duration - db_before_view)) * 1000)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", '
+                f'serialize;dur={serialize_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+
+        repeated = [
+            (sql, executions, seconds) for sql, (executions, seconds) in stats.signatures.items()
+            if executions >= settings.N_PLUS_ONE_THRESHOLD
+        ]
+        if total_ms >= settings.SLOW_REQUEST_MS or stats.count >= settings.SLOW_REQUEST_QUERIES or repeated:
+            self.log_request(request, response, stats, total_ms, db_ms, repeated)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.mark_view_started(request)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.mark_view_started(request)
+        return None
+
+    def mark_view_started(self, request):
+        # Everything from here on (minus SQL) is view, serializer and renderer work
+        stats = getattr(request, '_query_stats', None)
+        if stats is not None:
+            request._view_started = (time.perf_counter(), stats.duration)
+
+    def log_request(self, request, response, stats, total_ms, db_ms, repeated):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '-'
+        lines = [
+            f'{request.method} {request.path} view={view_name} status={response.status_code} '
+            f'total={total_ms:.1f}ms db={db_ms:.1f}ms queries={stats.count}'
+        ]
+        for sql, executions, seconds in sorted(repeated, key=lambda item: -item[1]):
+            lines.append(f'  N+1 suspect: {executions}x {seconds * 1000:.1f}ms {sql[:500]}')
+        slowest = sorted(stats.signatures.items(), key=lambda item: -item[1][1])[:SLOW_LOG_QUERIES]
+        for sql, (executions, seconds) in slowest:
+            lines.append(f'  {executions}x {seconds * 1000:.1f}ms {sql[:500]}')
+        logger.warning('\n'.join(lines))
+
+
+class PrometheusMetricsMiddleware(DualModeMiddleware):
+    """
+    Request count, latency, status and SQL metrics per URL name (core/metrics.py).
+    Reads the query stats of QueryInstrumentationMiddleware, so it must come after it.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        from core import metrics
+        self.metrics = metrics
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.metrics.observe_request(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.metrics.observe_request(request, response, time.perf_counter() - started)
+        return response
+
+
+class ThrottleMiddleware(DualModeMiddleware):
+    """
+    Sliding-window throttles per IP, user and endpoint (core/throttling.py).
+    Runs once the URL is resolved but before DRF authentication and the view, so
+    rejected logins never reach password hashing or the database.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        from core import throttling
+        self.throttling = throttling
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.THROTTLE_ENABLED:
+            return None
+        return self.throttled(self.throttling.check_request(request, request.resolver_match.view_name))
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.THROTTLE_ENABLED:
+            return None
+        return self.throttled(await self.throttling.acheck_request(request, request.resolver_match.view_name))
+
+    def throttled(self, wait):
+        if wait:
+            response = JsonResponse(self.throttling.throttled_body(wait), status=429)
+            response['Retry-After'] = str(wait)
+            return response
+        return None
+
+
+class ReplicaRoutingMiddleware(DualModeMiddleware):
+    """
+    Sends the reads of GET/HEAD requests to the API views to a read replica
+    (core/routers.py) unless the client wrote within REPLICA_STICKY_SECONDS,
+    and pins clients to the primary after successful writes.
+    A no-op when DATABASE_REPLICAS is empty.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        from core import routers
+        self.routers = routers
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        token = self.routers.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.routers.end_request(token)
+        if self.pins(request, response):
+            self.routers.pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        token = self.routers.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.routers.end_request(token)
+        if self.pins(request, response):
+            await self.routers.apin_to_primary(request)
+        return response
+
+    def pins(self, request, response):
+        return request.method not in self.routers.SAFE_METHODS and response.status_code < 400
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = self.routers.current_routing()
+        if self.may_route(routing, request, view_func) and not self.routers.is_pinned(request):
+            self.routers.route_reads_to_replica(routing)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        routing = self.routers.current_routing()
+        if self.may_route(routing, request, view_func) and not await self.routers.ais_pinned(request):
+            self.routers.route_reads_to_replica(routing)
+        return None
+
+    def may_route(self, routing, request, view_func):
+        return (
+            routing is not None and request.method in self.routers.READ_METHODS
+            and self.routers.is_routed_view(view_func)
+        )
+
+    def process_exception(self, request, exception):
+        # Lost connection or replica gone mid-request: later requests read from the primary
+        routing = self.routers.current_routing()
+        if routing is not None and routing.alias is not None and isinstance(exception, OperationalError):
+            self.routers.mark_unhealthy(routing.alias)
+        return None
+
+
+class RequestProfilerMiddleware(DualModeMiddleware):
+    """
+    Staff-only on-demand profiling. Send "X-Profile: 1" (cProfile) or
+    "X-Profile: sample" (sampling profiler), or the same value as ?profile=.
+    The profile is stored by core.profiling and its id returned in X-Profile-Id;
+    fetch it from /api/admin/profiles/<id>/. Requests without the flag only pay
+    a header lookup and a substring check.
+
+    Under ASGI the profilers watch the event loop thread for the duration of the
+    request: ORM work shows up as awaits on its threads, and other requests
+    served by the same worker meanwhile are included.
+    """
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = self.requested_mode(request)
+        if not mode or not self.is_admin(request):
+            return self.get_response(request)
+
+        from core import profiling
+        profiler = profiling.start_profiler(mode)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        response['X-Profile-Id'] = profiling.save_profile(profiler, mode, request)
+        return response
+
+    async def __acall__(self, request):
+        mode = self.requested_mode(request)
+        if not mode or not await sync_to_async(self.is_admin)(request):
+            return await self.get_response(request)
+
+        from core import profiling
+        profiler = profiling.start_profiler(mode)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        response['X-Profile-Id'] = await sync_to_async(profiling.save_profile)(profiler, mode, request)
+        return response
+
+    def requested_mode(self, request):
+        """'cprofile', 'sample' or None"""
+        mode = request.META.get('HTTP_X_PROFILE')
+        if not mode and 'profile=' in request.META.get('QUERY_STRING', ''):
+            mode = request.GET.get('profile')
+        if not mode:
+            return None
+        return 'sample' if mode == 'sample' else 'cprofile'
+
+    def is_admin(self, request):
+        from core.permissions import is_admin_request
+        return is_admin_request(request)
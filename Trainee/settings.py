@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,7 +47,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files
+    'Trainee.middleware.StaticFilesMiddleware',  # Serve static files (WhiteNoise)
+    'Trainee.middleware.QueryInstrumentationMiddleware',  # Server-Timing + slow/N+1 query log
+    'Trainee.middleware.PrometheusMetricsMiddleware',  # /metrics (after the query instrumentation)
+    'Trainee.middleware.ThrottleMiddleware',  # 429 before authentication and the view
+    'Trainee.middleware.ReplicaRoutingMiddleware',  # API reads from DATABASE_REPLICAS
+    'Trainee.middleware.RequestProfilerMiddleware',  # ?profile=1 / X-Profile for admins
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,9 +84,12 @@ WSGI_APPLICATION = 'Trainee.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Keep MySQL connections open per worker process and reuse them between requests
+# (Trainee/db_pool); DB_POOL=False opens a new connection for every request
+DB_POOL = os.environ.get('DB_POOL', 'True') == 'True'
 DATABASES = {
     'default': {
-        'ENGINE': 'mysql.connector.django',
+        'ENGINE': 'Trainee.db_pool.mysql_connector' if DB_POOL else 'mysql.connector.django',
         'NAME': os.environ.get('DB_NAME', 'sql7802231'),
         'USER': os.environ.get('DB_USER', 'sql7802230'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'Mypassword1'),
@@ -93,13 +102,106 @@ DATABASES = {
             'ssl_verify_cert': False,
             'ssl_verify_identity': False,
         },
+        # Used by the pooled engine only (see Trainee/db_pool/__init__.py)
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', '4')),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', '600')),
+            'HEALTH_CHECK_IDLE': float(os.environ.get('DB_POOL_HEALTH_CHECK_IDLE', '30')),
+            'CONNECT_RETRIES': int(os.environ.get('DB_POOL_CONNECT_RETRIES', '2')),
+        },
+    }
+}
+
+# Read replicas of the primary (core/routers.py): comma separated hosts, same database and credentials.
+# GET requests to the API read from a replica; a client reads from the primary for
+# REPLICA_STICKY_SECONDS after a write, and a failing replica is skipped for REPLICA_RETRY_SECONDS
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', '30'))
+
+# Cache
+# Shared by every gunicorn worker: cached responses, their version keys (core/response_cache.py)
+# and read-your-writes pins (core/routers.py) must be the same in all of them, so there is no
+# per-process LocMemCache. CACHE_LOCATION is a directory; with several app instances point it at
+# storage they all mount (e.g. /home on Azure App Service).
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'trainee-cache'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '3000'))},
     }
 }
 
+# Seconds an anonymous read response stays cached (writes invalidate it earlier, see core/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Cache-Control max-age for anonymous GET responses (clients/CDN revalidate with ETag afterwards)
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', '0'))
+
+# Maximum number of items accepted by one batch write request (posts/comments/ratings)
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '1000'))
+
+# Moderation queue: how long a claimed batch stays reserved and how many posts one claim/bulk action may take
+MODERATION_LEASE_SECONDS = int(os.environ.get('MODERATION_LEASE_SECONDS', '600'))
+MODERATION_MAX_BATCH = int(os.environ.get('MODERATION_MAX_BATCH', '100'))
+
+# Seconds the admin statistics snapshot is reused before it is recomputed (0 = always fresh)
+ADMIN_STATS_SNAPSHOT_SECONDS = int(os.environ.get('ADMIN_STATS_SNAPSHOT_SECONDS', '60'))
+
+# Per-request SQL instrumentation (Trainee/middleware.py QueryInstrumentationMiddleware)
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True') == 'True'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', '50'))
+# Log a request when the same SQL runs this many times (N+1 signature)
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '10'))
+
+# On-demand profiling of staff requests (Trainee/middleware.py RequestProfilerMiddleware)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '100'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+
+# Prometheus /metrics (core/metrics.py); when set, scrapers must send "Authorization: Bearer <token>".
+# Empty: only staff users can read it (per-route traffic, latency and SQL counts are not public)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# JWT: build request.user from token claims instead of loading the User row (core/authentication.py);
+# deactivation, deletion and role changes reach every worker within the refresh interval
+JWT_STATELESS_AUTH = os.environ.get('JWT_STATELESS_AUTH', 'True') == 'True'
+JWT_REVOCATION_REFRESH_SECONDS = int(os.environ.get('JWT_REVOCATION_REFRESH_SECONDS', '30'))
+
+# Proxies in front of gunicorn that append to X-Forwarded-For (Azure App Service: its front end).
+# The client IP is the entry that many hops from the right; 0 when clients connect directly
+NUM_PROXIES = int(os.environ.get('NUM_PROXIES', '1'))
+
+# Sliding-window throttles shared by all workers (core/throttling.py); rates are "<n>/<second|minute|hour|day>",
+# an empty rate disables that scope. login/refresh/register count per IP, the others per user (IP when anonymous)
+# post and comment count every item of a batch request
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_DB = os.environ.get('THROTTLE_DB', os.path.join(tempfile.gettempdir(), 'trainee-throttle.sqlite3'))
+THROTTLE_RATES = {
+    'login': os.environ.get('THROTTLE_LOGIN_RATE', '10/minute'),
+    'refresh': os.environ.get('THROTTLE_REFRESH_RATE', '30/minute'),
+    'register': os.environ.get('THROTTLE_REGISTER_RATE', '5/hour'),
+    'post': os.environ.get('THROTTLE_POST_RATE', '10/minute'),
+    'comment': os.environ.get('THROTTLE_COMMENT_RATE', '20/minute'),
+    'write': os.environ.get('THROTTLE_WRITE_RATE', '120/minute'),
+    'export': os.environ.get('THROTTLE_EXPORT_RATE', '30/hour'),
+}
+
+# Async variants of the hot public read endpoints (core/async_views.py); gunicorn_config.py
+# turns this on together with the ASGI worker, under WSGI every async view would cost an event loop
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -109,6 +211,8 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # DRF's own get_ident() trusts the same hops as core.throttling.client_ip()
+    'NUM_PROXIES': NUM_PROXIES,
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
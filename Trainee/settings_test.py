@@ -0,0 +1,39 @@
+"""
+Settings for the test suite: two local SQLite files stand in for the MySQL
+primary and a read replica (core/routers.py), without replication between them.
+
+    python manage.py test --settings=Trainee.settings_test
+"""
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(tempfile.gettempdir(), 'trainee-primary.sqlite3'),
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'trainee-test-primary.sqlite3')},
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(tempfile.gettempdir(), 'trainee-replica.sqlite3'),
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'trainee-test-replica.sqlite3')},
+    },
+}
+DATABASE_REPLICAS = ['replica1']
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'trainee-test-cache'),
+    }
+}
+THROTTLE_ENABLED = False
+# PBKDF2 logins take longer than SLOW_REQUEST_MS; keep the slow-request log out of
+# the test output (tests that check it use assertLogs)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'null': {'class': 'logging.NullHandler'}},
+    'loggers': {'Trainee.middleware': {'handlers': ['null'], 'propagate': False}},
+}
@@ -3,9 +3,9 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
-from rest_framework_simplejwt.views import TokenRefreshView
-from core.jwt_serializers import CustomTokenObtainPairView
+from core.jwt_serializers import CustomTokenObtainPairView, CustomTokenRefreshView
 from core.frontend_views import index
+from core.metrics import metrics_view
 import os
 
 urlpatterns = [
@@ -14,7 +14,10 @@ urlpatterns = [
     
     # JWT Authentication endpoints
     path('api/auth/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/auth/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    
+    # Prometheus metrics (aggregated over all gunicorn workers)
+    path('metrics', metrics_view, name='metrics'),
     
     # OpenAPI schema
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
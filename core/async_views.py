@@ -0,0 +1,116 @@
+"""
+Async variants of the hot public read endpoints (ASYNC_READ_VIEWS, ASGI deployments).
+
+Each class extends its DRF view, so queryset, serializer, pagination, response
+cache and conditional GET stay defined in one place; only the database access
+is awaited through Django's async ORM. Anonymous GETs run on the event loop,
+anything else (authenticated reads, writes) is handed to the regular DRF view
+in a worker thread.
+"""
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from . import views
+from .pagination import apaginate_queryset
+
+
+class AsyncReadMixin:
+    """APIView.dispatch() for anonymous GETs with an awaitable handler"""
+
+    @classmethod
+    def as_async_view(cls, **initkwargs):
+        sync_view = cls.as_view(**initkwargs)
+        run_sync = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+                return await run_sync(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        markcoroutinefunction(view)
+        view.cls = cls
+        view.initkwargs = initkwargs
+        # Writes delegated to the DRF view authenticate with JWT, like the sync routes
+        return csrf_exempt(view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Anonymous request: authentication, AllowAny and negotiation need no queries
+            self.initial(request, *args, **kwargs)
+            response = await self.aget(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListMixin(AsyncReadMixin):
+    async def aget(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await apaginate_queryset(self.paginator, queryset, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        objects = [obj async for obj in queryset]
+        return Response(self.get_serializer(objects, many=True).data)
+
+
+class AsyncRetrieveMixin(AsyncReadMixin):
+    async def aget(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        instance = await aget_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance).data)
+
+
+# The async mixins go last: the cache and conditional GET mixins of the DRF
+# views wrap them through super().adispatch() / super().aget()
+
+class SectionListView(views.SectionListView, AsyncListMixin):
+    pass
+
+
+class SectionPostsView(views.SectionPostsView, AsyncListMixin):
+    pass
+
+
+class PublicPostsView(views.PublicPostsView, AsyncListMixin):
+    pass
+
+
+class PostDetailView(views.PostDetailView, AsyncRetrieveMixin):
+    pass
+
+
+class CommentListView(views.CommentListView, AsyncListMixin):
+    pass
+
+
+class RatingListView(views.RatingListView, AsyncListMixin):
+    pass
+
+
+ASYNC_VIEWS = {
+    views.SectionListView: SectionListView,
+    views.SectionPostsView: SectionPostsView,
+    views.PublicPostsView: PublicPostsView,
+    views.PostDetailView: PostDetailView,
+    views.CommentListView: CommentListView,
+    views.RatingListView: RatingListView,
+}
+
+
+def read_view(view_class):
+    """URL callback for a hot read endpoint: the async variant when ASYNC_READ_VIEWS is on"""
+    if settings.ASYNC_READ_VIEWS:
+        return ASYNC_VIEWS[view_class].as_async_view()
+    return view_class.as_view()
@@ -0,0 +1,94 @@
+"""
+Stateless JWT authentication (JWT_STATELESS_AUTH).
+
+request.user is built from the claims added by CustomTokenObtainPairSerializer
+instead of loading the User row on every request. Deactivation, deletion and role
+changes are recorded in TokenRevocation (see core/signals.py); each process keeps
+the recent rows in memory and reloads them every JWT_REVOCATION_REFRESH_SECONDS,
+so revoked tokens stop working in the whole server within that interval.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser, TokenRevocation
+
+
+class RevocationFilter:
+    """In-process copy of TokenRevocation: {user_id: revoked_at timestamp}"""
+
+    def __init__(self):
+        self.revoked = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def window_start(self):
+        # Older revocations only cover access tokens that have expired anyway
+        return timezone.now() - api_settings.ACCESS_TOKEN_LIFETIME
+
+    def refresh(self):
+        rows = TokenRevocation.objects.filter(revoked_at__gt=self.window_start()).values_list('user_id', 'revoked_at')
+        self.revoked = {user_id: revoked_at.timestamp() for user_id, revoked_at in rows}
+        self.loaded_at = time.monotonic()
+
+    def is_revoked(self, user_id, issued_at):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= settings.JWT_REVOCATION_REFRESH_SECONDS:
+            # One worker thread reloads, the others keep using the current copy
+            if self.lock.acquire(blocking=self.loaded_at is None):
+                try:
+                    self.refresh()
+                finally:
+                    self.lock.release()
+        revoked_at = self.revoked.get(user_id)
+        # iat has whole seconds, so a token from the same second as the revocation is rejected too
+        return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
+
+    def remember(self, user_id, revoked_at):
+        self.revoked = {**self.revoked, user_id: revoked_at.timestamp()}
+
+
+revocations = RevocationFilter()
+
+
+def revoke_user_tokens(user_id):
+    """Reject every access token of the user issued until now (other processes follow on their next refresh)"""
+    now = timezone.now()
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': now})
+    TokenRevocation.objects.filter(revoked_at__lte=revocations.window_start()).delete()
+    transaction.on_commit(lambda: revocations.remember(user_id, now))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the User query: request.user is a ClaimsUser holding
+    id, username, email, is_staff and is_active from the token; any other field is
+    loaded from the database only when something reads it.
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            # Token without our claims (issued by the plain simplejwt views)
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        if revocations.is_revoked(user_id, validated_token.get('iat')):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        if not validated_token.get('is_active', True):
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return ClaimsUser.from_db(
+            'default',
+            ['id', 'username', 'email', 'is_staff', 'is_active'],
+            [user_id, validated_token.get('username', ''), validated_token.get('email', ''),
+             validated_token['role'] == 'admin', True],
+        )
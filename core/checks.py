@@ -0,0 +1,31 @@
+"""
+System checks run at startup (manage.py check, runserver, migrate) and by
+`manage.py check --deploy`.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose entries are invisible to other worker processes
+PROCESS_LOCAL_CACHES = frozenset([
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+])
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """Read-your-writes pins (core/routers.py) only work when every worker sees the same cache"""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'DATABASE_REPLICAS is set but the default cache ({backend}) is not shared between workers.',
+            hint=(
+                'A write pins the client to the primary through the cache; with a per-process cache '
+                'the next request may hit another worker and read its own write from a lagging replica. '
+                'Use a shared backend (FileBasedCache on a common CACHE_LOCATION, Redis, Memcached).'
+            ),
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,69 @@
+"""
+Conditional GET (ETag / Last-Modified) for read views.
+
+The validator is built from the response cache versions of the resources the
+view depends on (core/response_cache.py): every write that changes the output
+bumps one of them, including data embedded from other tables such as author
+names (GLOBAL_RESOURCE). Checking it costs one cache lookup and no query, so a
+client holding the matching ETag gets 304 Not Modified before the view reads
+or serializes anything.
+
+Right after a write a read replica may not have the rows behind the newest
+version yet; such responses carry no validator, so clients do not keep a
+pre-write body under the post-write ETag.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins
+from .response_cache import ResourceVersionsMixin
+from .routers import reads_from_replica, recently_written
+
+
+class ConditionalGetMixin(ResourceVersionsMixin):
+    """ETag for list and detail GETs, Last-Modified for single objects"""
+
+    def get_validators(self, request, versions):
+        """(ETag, Last-Modified timestamp), both None while a replica may lag behind the versions"""
+        if recently_written(versions) and reads_from_replica():
+            return None, None
+        user_key = request.user.pk if request.user.is_authenticated else 'anon'
+        raw = f"{request.get_full_path()}|{user_key}|{sorted(versions.items())}"
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+        # Versions are time.time_ns() of the last write, so the newest one is a safe Last-Modified.
+        # Lists only send the ETag: HTTP dates have whole seconds, too coarse for busy collections
+        last_modified = None
+        if isinstance(self, mixins.RetrieveModelMixin):
+            last_modified = max(versions.values()) // 1_000_000_000
+        return etag, last_modified
+
+    def patch_validators(self, request, response, etag, last_modified):
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            # Anonymous responses are identical for everyone, so a CDN may keep them
+            patch_cache_control(response, public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE, must_revalidate=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, self.get_resource_versions())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return self.patch_validators(request, response, etag, last_modified)
+
+    async def aget(self, request, *args, **kwargs):
+        """get() for the async read views (core/async_views.py)"""
+        etag, last_modified = self.get_validators(request, await self.aget_resource_versions())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().aget(request, *args, **kwargs)
+        return self.patch_validators(request, response, etag, last_modified)
@@ -29,6 +29,8 @@ def custom_exception_handler(exc, context):
             custom_response_data['message'] = 'Permission denied'
         elif response.status_code == 422:
             custom_response_data['message'] = 'Validation error'
+        elif response.status_code == 429:
+            custom_response_data['message'] = 'Too many requests'
         elif response.status_code == 500:
             custom_response_data['message'] = 'Internal server error'
 
@@ -0,0 +1,139 @@
+"""
+Streaming export of the public catalogue (public approved posts) as NDJSON or CSV,
+served by /api/posts/export/ and the export_data management command.
+
+Posts are read in keyset chunks ordered by (updated_at, id): every chunk is one
+short indexed query, so memory stays constant for any catalogue size (MySQL
+drivers buffer a whole result set, so a single .iterator() query would not).
+An export covers updated_at in [since, until), where until is the moment the
+export started; pass it back as the next since to receive only later changes.
+Edits, new ratings and comments (Post.adjust_counters) and comment edits all
+move updated_at. Removals are not reported: a post that is deleted, made
+private or unapproved simply stops appearing, so an incremental consumer keeps
+it until its next full export.
+"""
+import csv
+import io
+import json
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Post
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+CHUNK_SIZE = 500
+
+POST_FIELDS = (
+    'id', 'title', 'type', 'description', 'calories', 'recommendations', 'section_id', 'section_name',
+    'user_id', 'author_username', 'average_rating', 'rating_count', 'comment_count', 'created_at', 'updated_at',
+)
+# Model lookups behind the export field names
+POST_COLUMNS = {
+    'id': 'id', 'title': 'title', 'type': 'type', 'description': 'description', 'calories': 'calories',
+    'recommendations': 'recommendations', 'section_id': 'section_id', 'section_name': 'section__name',
+    'user_id': 'user_id', 'author_username': 'user__username', 'rating_sum': 'rating_sum',
+    'rating_count': 'rating_count', 'comment_count': 'comment_count', 'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+COMMENT_COLUMNS = {
+    'id': 'id', 'post_id': 'post_id', 'user_id': 'user_id', 'author_username': 'user__username',
+    'text': 'text', 'created_at': 'created_at', 'updated_at': 'updated_at',
+}
+
+
+def parse_since(value):
+    """ISO date or datetime -> aware datetime (dates mean midnight); ValueError when invalid"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'since must be an ISO date or datetime, got {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def public_posts(since, until, using=None):
+    posts = Post.objects.using(using).filter(is_public=True, is_approved=True, updated_at__lt=until)
+    if since is not None:
+        posts = posts.filter(updated_at__gte=since)
+    return posts
+
+
+def iter_post_chunks(since, until, using=None, with_comments=False, chunk_size=CHUNK_SIZE):
+    """Yield lists of export rows (dicts in POST_FIELDS order), walking (updated_at, id)"""
+    posts = public_posts(since, until, using).order_by('updated_at', 'id')
+    last = None
+    while True:
+        chunk = posts
+        if last is not None:
+            chunk = chunk.filter(Q(updated_at__gt=last[0]) | Q(updated_at=last[0], id__gt=last[1]))
+        rows = [post_row(values) for values in chunk.values(*POST_COLUMNS.values())[:chunk_size]]
+        if not rows:
+            return
+        if with_comments:
+            comments = comments_by_post([row['id'] for row in rows], using)
+            for row in rows:
+                row['comments'] = comments.get(row['id'], [])
+        yield rows
+        last = (rows[-1]['updated_at'], rows[-1]['id'])
+
+
+def post_row(values):
+    row = {name: values[column] for name, column in POST_COLUMNS.items()}
+    rating_sum = row.pop('rating_sum')
+    row['average_rating'] = rating_sum / row['rating_count'] if row['rating_count'] else None
+    return {name: row[name] for name in POST_FIELDS}
+
+
+def comments_by_post(post_ids, using=None):
+    comments = {}
+    rows = (
+        Comment.objects.using(using).filter(post_id__in=post_ids)
+        .order_by('post_id', 'created_at', 'id').values(*COMMENT_COLUMNS.values())
+    )
+    for values in rows:
+        row = {name: values[column] for name, column in COMMENT_COLUMNS.items()}
+        comments.setdefault(row.pop('post_id'), []).append(row)
+    return comments
+
+
+def render_chunks(chunks, output_format):
+    """Text chunks of the export file, one per row chunk; CSV has no room for embedded comments"""
+    if output_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=POST_FIELDS)
+        writer.writeheader()
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()  # header of an empty export
+    else:
+        for rows in chunks:
+            yield ''.join(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for row in rows)
+
+
+def streaming_content(request, content):
+    """Django buffers a whole sync iterator under ASGI; hand it an async one there"""
+    if isinstance(request, ASGIRequest):
+        return aiter_content(content)
+    return content
+
+
+async def aiter_content(content):
+    # The ORM needs one thread for the whole export, as under WSGI
+    iterator = iter(content)
+    done = object()
+    while (chunk := await sync_to_async(next, thread_sensitive=True)(iterator, done)) is not done:
+        yield chunk
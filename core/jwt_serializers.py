@@ -1,5 +1,17 @@
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+
+def add_user_claims(token, user):
+    # core.authentication.StatelessJWTAuthentication builds request.user from these
+    token['username'] = user.username
+    token['email'] = user.email
+    token['role'] = 'admin' if user.is_staff else 'user'
+    token['is_active'] = user.is_active
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom JWT serializer that adds user role to the token payload"""
@@ -9,10 +21,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
 
         # Add custom claims
-        token['username'] = user.username
-        token['email'] = user.email
-        token['role'] = 'admin' if user.is_staff else 'user'
-        token['is_active'] = user.is_active
+        add_user_claims(token, user)
 
         return token
     
@@ -33,3 +42,24 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Takes the claims of the new access token from the current user row instead of
+    copying them from the refresh token, so a refresh never renews a revoked role
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        access = refresh.access_token
+        add_user_claims(access, user)
+        return {'access': str(access)}
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
@@ -0,0 +1,351 @@
+import json
+import logging
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import profiling, urls as core_urls
+from core.models import Comment, Post, Rating, Section
+
+ROLES = ('anonymous', 'user', 'admin')
+
+POST_BODY = {
+    'title': 'Benchmark meal plan',
+    'type': 'meal',
+    'description': 'Oatmeal with banana and peanut butter, chicken with rice for lunch.',
+    'calories': 650,
+    'is_public': True,
+}
+
+# (url name, method, {url kwarg: fixture}, body(fixtures) or None)
+# Every route of core/urls.py plus PROJECT_ROUTES; writes run inside a rolled back transaction.
+# A route without a scenario stops the command, so new routes must be added here.
+ROUTES = [
+    ('section-list', 'get', {}, None),
+    ('section-list', 'post', {}, lambda f: {'name': 'Benchmark section', 'description': 'Created by the benchmark'}),
+    ('section-overview', 'get', {}, None),
+    ('section-detail', 'get', {'pk': 'section'}, None),
+    # DELETE would cascade over the whole section, PATCH exercises the same view
+    ('section-detail', 'patch', {'pk': 'section'}, lambda f: {'description': 'Updated by the benchmark'}),
+    ('section-posts', 'get', {'section_id': 'section'}, None),
+    ('section-post-detail', 'get', {'section_id': 'section', 'pk': 'post'}, None),
+    ('section-post-create', 'post', {'section_id': 'section'}, lambda f: {**POST_BODY, 'section_id': f['section']}),
+    ('section-post-comments', 'get', {'section_id': 'section', 'post_id': 'post'}, None),
+    ('section-post-comment-create', 'post', {'section_id': 'section', 'post_id': 'post'}, lambda f: {'text': 'Great plan, thanks!'}),
+
+    ('user-list', 'get', {}, None),
+    ('user-detail', 'get', {'pk': 'user'}, None),
+    ('user-posts', 'get', {'pk': 'user'}, None),
+    ('user-create', 'post', {}, lambda f: {'username': 'benchmark_user', 'email': 'benchmark@example.com', 'password': 'BenchPass123!'}),
+    ('user-update', 'patch', {}, lambda f: {'first_name': 'Bench'}),
+    ('user-delete', 'delete', {'pk': 'user'}, None),
+
+    ('admin-pending-users', 'get', {}, None),
+    ('admin-approve-user', 'put', {'pk': 'pending_user'}, None),
+    ('admin-pending-posts', 'get', {}, None),
+    ('admin-debug-posts', 'get', {}, None),
+    ('admin-stats', 'get', {}, None),
+    ('admin-stats-users', 'get', {}, None),
+    ('admin-moderation-queue', 'get', {}, None),
+    ('admin-moderation-claim', 'post', {}, lambda f: {'count': 20}),
+    ('admin-moderation-approve', 'post', {}, lambda f: {'ids': f['pending_posts']}),
+    ('admin-moderation-reject', 'post', {}, lambda f: {'ids': f['pending_posts']}),
+    ('admin-profile-list', 'get', {}, None),
+    ('admin-profile-detail', 'get', {'profile_id': 'profile'}, None),
+    ('admin-db-pool', 'get', {}, None),
+
+    ('post-list', 'get', {}, None),
+    ('public-posts', 'get', {}, None),
+    ('post-search', 'get', {}, None),
+    ('post-top', 'get', {}, None),
+    ('post-trending', 'get', {}, None),
+    ('post-export', 'get', {}, None),
+    ('post-detail', 'get', {'pk': 'post'}, None),
+    ('post-create', 'post', {}, lambda f: POST_BODY),
+    ('post-batch-create', 'post', {}, lambda f: [{**POST_BODY, 'section_id': f['section']}] * 20),
+    ('post-update', 'patch', {'pk': 'own_post'}, lambda f: {'calories': 700}),
+    ('post-replace', 'put', {'pk': 'own_post'}, lambda f: POST_BODY),
+    ('post-delete', 'delete', {'pk': 'own_post'}, None),
+    ('post-publish', 'put', {'pk': 'own_post'}, None),
+    ('post-approve', 'put', {'pk': 'pending_post'}, None),
+
+    ('comment-list', 'get', {'post_id': 'post'}, None),
+    ('comment-detail', 'get', {'pk': 'comment'}, None),
+    ('comment-create', 'post', {'post_id': 'post'}, lambda f: {'text': 'Great plan, thanks!'}),
+    ('comment-batch-create', 'post', {'post_id': 'post'}, lambda f: [{'text': f'Benchmark comment {i}'} for i in range(20)]),
+    ('comment-update', 'patch', {'pk': 'own_comment'}, lambda f: {'text': 'Edited by the benchmark'}),
+    ('comment-replace', 'put', {'pk': 'own_comment'}, lambda f: {'text': 'Replaced by the benchmark'}),
+    ('comment-delete', 'delete', {'pk': 'own_comment'}, None),
+
+    ('rating-list', 'get', {'post_id': 'post'}, None),
+    ('rating-detail', 'get', {'pk': 'rating'}, None),
+    ('rating-create', 'post', {'post_id': 'unrated_post'}, lambda f: {'rating': 4}),
+    ('rating-batch-create', 'post', {}, lambda f: [{'post': pk, 'rating': 5} for pk in f['public_posts']]),
+    ('rating-update', 'patch', {'pk': 'own_rating'}, lambda f: {'rating': 3}),
+    ('rating-replace', 'put', {'pk': 'own_rating'}, lambda f: {'rating': 2}),
+    ('rating-delete', 'delete', {'pk': 'own_rating'}, None),
+
+    ('token_obtain_pair', 'post', {}, lambda f: {'username': f['username'], 'password': f['password']}),
+    ('token_refresh', 'post', {}, lambda f: {'refresh': f['refresh']}),
+    ('metrics', 'get', {}, None),
+]
+
+# Routes of Trainee/urls.py outside core/urls.py that are part of the API
+PROJECT_ROUTES = ('token_obtain_pair', 'token_refresh', 'metrics')
+
+QUERY_STRINGS = {
+    'post-search': {'q': 'chicken protein'},
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every API route as anonymous, user and admin: p50/p95/p99 latency, queries and bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Measured requests per route and role (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests before measuring (default: 2)')
+        parser.add_argument('--roles', default=','.join(ROLES), help='Comma separated roles (default: anonymous,user,admin)')
+        parser.add_argument('--routes', help='Only routes whose name contains one of these comma separated strings')
+        parser.add_argument('--user', help='Username of the normal user (default: first active non-staff author)')
+        parser.add_argument('--admin', help='Username of the admin (default: first active superuser or staff user)')
+        parser.add_argument('--password', default='testpass123', help='Password of --user, for the login benchmark')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare against a previous JSON result file')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20.0,
+            help='Flag a regression when p95 grows by more than this percent (default: 20)',
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=1.0,
+            help='Ignore p95 changes smaller than this many milliseconds (default: 1.0)',
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions (for CI)')
+
+    def handle(self, *args, **options):
+        roles = [role.strip() for role in options['roles'].split(',') if role.strip()]
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise CommandError(f"Unknown roles: {', '.join(sorted(unknown))}")
+
+        users = self.get_users(options)
+        fixtures = self.get_fixtures(users['user'], options['password'])
+        routes = self.get_routes(options['routes'])
+        tokens = {role: str(RefreshToken.for_user(user).access_token) for role, user in users.items() if user}
+
+        client = Client(raise_request_exception=False)
+        # Expected 401/403 responses would otherwise log a warning per request
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            # Repeated writes would hit the throttles and measure 429 responses
+            with override_settings(THROTTLE_ENABLED=False):
+                results = self.run_routes(client, routes, roles, fixtures, tokens, options)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'cold_cache': options['cold_cache'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Saved {len(results)} results to {options['output']}"))
+
+        if options['compare']:
+            regressions = self.compare(results, options)
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} routes regressed by more than {options["threshold"]}%')
+
+    def run_routes(self, client, routes, roles, fixtures, tokens, options):
+        results = []
+        for name, method, kwargs, body in routes:
+            path = reverse(name, kwargs={key: fixtures[fixture] for key, fixture in kwargs.items()})
+            data = body(fixtures) if body else QUERY_STRINGS.get(name)
+            for role in roles:
+                if role != 'anonymous' and role not in tokens:
+                    continue
+                headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens[role]}'} if role in tokens else {}
+                result = self.measure(client, method, path, data, headers, options)
+                result.update({'route': name, 'method': method.upper(), 'role': role, 'path': path})
+                results.append(result)
+                self.write_result(result)
+        return results
+
+    def get_users(self, options):
+        active = User.objects.filter(is_active=True)
+        if options['user']:
+            user = active.filter(username=options['user']).first()
+        else:
+            author_id = Post.objects.filter(user__is_active=True, user__is_staff=False).values_list('user_id', flat=True).first()
+            user = active.filter(pk=author_id).first()
+        if user is None:
+            raise CommandError('No normal user with posts found, seed the database with create_test_data first')
+
+        if options['admin']:
+            admin = active.filter(username=options['admin'], is_staff=True).first()
+        else:
+            admin = active.filter(is_superuser=True).first() or active.filter(is_staff=True).first()
+        if admin is None:
+            self.stdout.write(self.style.WARNING('No admin user found, skipping the admin role'))
+        return {'user': user, 'admin': admin}
+
+    def get_fixtures(self, user, password):
+        visible = Post.objects.filter(is_public=True, is_approved=True, section__isnull=False)
+        post = visible.order_by('-comment_count', 'pk').first()
+        own_post = Post.objects.filter(user=user).order_by('pk').first()
+        if post is None or own_post is None:
+            raise CommandError('Not enough posts, seed the database with create_test_data first')
+        comment = Comment.objects.filter(post=post).order_by('pk').first()
+        rating = Rating.objects.filter(post=post).order_by('pk').first()
+        own_comment = Comment.objects.filter(user=user).order_by('pk').first() or comment
+        own_rating = Rating.objects.filter(user=user).order_by('pk').first() or rating
+        pending_posts = list(Post.objects.filter(is_approved=False).order_by('created_at', 'id').values_list('pk', flat=True)[:20])
+        pending_user = User.objects.filter(is_active=False).order_by('pk').first() or user
+
+        return {
+            'user': user.pk,
+            'username': user.username,
+            'password': password,
+            'refresh': str(RefreshToken.for_user(user)),
+            'section': post.section_id or Section.objects.values_list('pk', flat=True).first(),
+            'post': post.pk,
+            'own_post': own_post.pk,
+            'comment': comment.pk if comment else own_comment.pk if own_comment else 0,
+            'rating': rating.pk if rating else own_rating.pk if own_rating else 0,
+            'own_comment': own_comment.pk if own_comment else 0,
+            'own_rating': own_rating.pk if own_rating else 0,
+            'unrated_post': visible.exclude(rating__user=user).values_list('pk', flat=True).first() or post.pk,
+            'public_posts': list(visible.order_by('pk').values_list('pk', flat=True)[:20]),
+            'pending_posts': pending_posts,
+            'pending_post': pending_posts[0] if pending_posts else own_post.pk,
+            'pending_user': pending_user.pk,
+            'profile': self.get_profile_id(),
+        }
+
+    def get_profile_id(self):
+        """Newest stored request profile; one of a trivial request is stored when there is none"""
+        profiles = profiling.list_profiles()
+        if profiles:
+            return profiles[0]['id']
+        profiler = profiling.start_profiler('cprofile')
+        reverse('post-list')
+        profiler.disable()
+        return profiling.save_profile(profiler, 'cprofile', RequestFactory().get('/benchmark/'))
+
+    def get_routes(self, route_filter):
+        covered = {name for name, _, _, _ in ROUTES}
+        names = [pattern.name for pattern in core_urls.urlpatterns] + list(PROJECT_ROUTES)
+        missing = [name for name in names if name not in covered]
+        if missing:
+            raise CommandError(f"Routes without a benchmark scenario, add them to ROUTES: {', '.join(missing)}")
+        if not route_filter:
+            return ROUTES
+        needles = [needle.strip() for needle in route_filter.split(',') if needle.strip()]
+        return [route for route in ROUTES if any(needle in route[0] for needle in needles)]
+
+    def measure(self, client, method, path, data, headers, options):
+        request = getattr(client, method)
+        # secure=True so production settings (SECURE_SSL_REDIRECT) don't answer every request with a redirect
+        kwargs = {'secure': True, **headers}
+        if method == 'get':
+            kwargs['data'] = data
+        elif data is not None:
+            kwargs.update(data=json.dumps(data), content_type='application/json')
+
+        timings = []
+        queries = []
+        sizes = []
+        statuses = set()
+        for iteration in range(options['warmup'] + options['iterations']):
+            if options['cold_cache']:
+                cache.clear()
+            # Writes are rolled back so every iteration sees the same data
+            with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(path, **kwargs)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if iteration < options['warmup']:
+                continue
+            timings.append(elapsed * 1000)
+            # The benchmark's own SAVEPOINT/BEGIN statements are not part of the request
+            queries.append(sum(1 for query in captured.captured_queries if 'SAVEPOINT' not in query['sql']))
+            sizes.append(len(content))
+            statuses.add(response.status_code)
+
+        timings.sort()
+        return {
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    def write_result(self, result):
+        status_str = ','.join(str(code) for code in result['status'])
+        self.stdout.write(
+            f"{result['method']:6s} {result['route']:28s} {result['role']:9s} {status_str:7s} "
+            f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"{result['queries']:3d} queries  {result['bytes']:8d} B"
+        )
+
+    def compare(self, results, options):
+        with open(options['compare']) as fh:
+            baseline = {
+                (row['method'], row['route'], row['role']): row
+                for row in json.load(fh)['results']
+            }
+
+        self.stdout.write(f"\n=== Compared with {options['compare']} (threshold {options['threshold']}%) ===")
+        regressions = 0
+        for result in results:
+            previous = baseline.get((result['method'], result['route'], result['role']))
+            if previous is None:
+                continue
+            delta = result['p95_ms'] - previous['p95_ms']
+            change = delta / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+            more_queries = result['queries'] > previous['queries']
+            slower = change > options['threshold'] and delta >= options['min_delta_ms']
+            if not slower and not more_queries:
+                continue
+            regressions += 1
+            self.stdout.write(self.style.WARNING(
+                f"✗ {result['method']:6s} {result['route']:28s} {result['role']:9s} "
+                f"p95 {previous['p95_ms']:.2f} → {result['p95_ms']:.2f}ms ({change:+.0f}%), "
+                f"queries {previous['queries']} → {result['queries']}"
+            ))
+
+        if regressions:
+            self.stdout.write(self.style.WARNING(f'{regressions} regressions'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ No regressions'))
+        return regressions
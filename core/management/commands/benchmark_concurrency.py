@@ -0,0 +1,180 @@
+import http.client
+import itertools
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+from core.models import Post
+from .benchmark import percentile
+
+# The async read endpoints (core/async_views.py) with the fixture their URL needs
+READ_ROUTES = [
+    ('section-list', {}),
+    ('public-posts', {}),
+    ('section-posts', {'section_id': 'section'}),
+    ('post-detail', {'pk': 'post'}),
+    ('comment-list', {'post_id': 'post'}),
+    ('rating-list', {'post_id': 'post'}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Throughput of the public read endpoints under N concurrent keep-alive connections against a '
+        'running server; run it once per deployment (sync WSGI, GUNICORN_WORKER=asgi) and --compare'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--concurrency', default='1,8,32,64', help='Comma separated connection counts (default: 1,8,32,64)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level (default: 10)')
+        parser.add_argument('--routes', help='Only routes whose name contains one of these comma separated strings')
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Add a unique query parameter to every request so the response cache never answers',
+        )
+        parser.add_argument('--label', default='', help='Name of the deployment stored with the results (e.g. sync, asgi)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Show the throughput change against a previous JSON result file')
+
+    def handle(self, *args, **options):
+        base = urlsplit(options['url'])
+        if base.scheme not in ('http', 'https') or not base.hostname:
+            raise CommandError(f"Invalid --url {options['url']}")
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be comma separated integers')
+
+        paths = self.get_paths(options['routes'])
+        self.stdout.write(f"{options['label'] or base.netloc}: {len(paths)} paths, {options['duration']:.0f}s per level")
+
+        results = []
+        for level in levels:
+            result = self.run_level(base, paths, level, options)
+            results.append(result)
+            self.write_result(result)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'label': options['label'],
+            'url': options['url'],
+            'duration': options['duration'],
+            'no_cache': options['no_cache'],
+            'paths': paths,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n✓ Saved {len(results)} results to {options['output']}"))
+        if options['compare']:
+            self.compare(results, options['compare'])
+
+    def get_paths(self, route_filter):
+        # Same database as the server under test
+        post = (
+            Post.objects.filter(is_public=True, is_approved=True, section__isnull=False)
+            .order_by('-comment_count', 'pk').first()
+        )
+        if post is None:
+            raise CommandError('No public posts found, seed the database with create_test_data first')
+        fixtures = {'post': post.pk, 'section': post.section_id}
+
+        routes = READ_ROUTES
+        if route_filter:
+            needles = [needle.strip() for needle in route_filter.split(',') if needle.strip()]
+            routes = [route for route in routes if any(needle in route[0] for needle in needles)]
+        return [reverse(name, kwargs={key: fixtures[fixture] for key, fixture in kwargs.items()}) for name, kwargs in routes]
+
+    def run_level(self, base, paths, concurrency, options):
+        deadline = time.monotonic() + options['duration']
+        counter = itertools.count()
+        timings = [[] for _ in range(concurrency)]
+        errors = [0] * concurrency
+        statuses = [dict() for _ in range(concurrency)]
+
+        def worker(slot):
+            connection = None
+            for path in itertools.cycle(paths):
+                if time.monotonic() >= deadline:
+                    break
+                if options['no_cache']:
+                    path = f'{path}?nocache={next(counter)}'
+                if connection is None:
+                    connection_class = http.client.HTTPSConnection if base.scheme == 'https' else http.client.HTTPConnection
+                    connection = connection_class(base.hostname, base.port, timeout=30)
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers={'Host': base.netloc})
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    errors[slot] += 1
+                    connection.close()
+                    connection = None
+                    continue
+                timings[slot].append((time.perf_counter() - started) * 1000)
+                statuses[slot][response.status] = statuses[slot].get(response.status, 0) + 1
+                if response.will_close:
+                    connection.close()
+                    connection = None
+            if connection is not None:
+                connection.close()
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(itertools.chain.from_iterable(timings))
+        status_counts = {}
+        for counts in statuses:
+            for code, count in counts.items():
+                status_counts[str(code)] = status_counts.get(str(code), 0) + count
+        if not latencies:
+            raise CommandError(f"No successful requests at concurrency {concurrency}, is {options['url']} running?")
+        return {
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'errors': sum(errors),
+            'status': status_counts,
+        }
+
+    def write_result(self, result):
+        status_str = ','.join(f'{code}×{count}' for code, count in sorted(result['status'].items()))
+        self.stdout.write(
+            f"{result['concurrency']:4d} conn  {result['rps']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+            f"{result['errors']} errors  {status_str}"
+        )
+
+    def compare(self, results, path):
+        with open(path) as fh:
+            baseline = json.load(fh)
+        previous = {row['concurrency']: row for row in baseline['results']}
+
+        self.stdout.write(f"\n=== Compared with {baseline.get('label') or path} ===")
+        for result in results:
+            row = previous.get(result['concurrency'])
+            if row is None:
+                continue
+            change = (result['rps'] - row['rps']) / row['rps'] * 100 if row['rps'] else 0
+            self.stdout.write(
+                f"{result['concurrency']:4d} conn  {row['rps']:8.1f} → {result['rps']:8.1f} req/s ({change:+.0f}%)  "
+                f"p95 {row['p95_ms']:.2f} → {result['p95_ms']:.2f}ms"
+            )
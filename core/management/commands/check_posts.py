@@ -1,49 +1,54 @@
 from django.core.management.base import BaseCommand
+from core.management.post_options import PostWriter, add_post_arguments, filter_posts
 from core.models import Post
-from django.contrib.auth.models import User
+from core.stats import post_breakdown, users_with_post_counts
 
 class Command(BaseCommand):
     help = 'Check all posts and their visibility status'
 
-    def handle(self, *args, **kwargs):
-        posts = Post.objects.all().order_by('-created_at')
+    def add_arguments(self, parser):
+        add_post_arguments(parser)
+
+    def handle(self, *args, **options):
+        posts = filter_posts(Post.objects.all(), options)
+        table = options['format'] == 'table'
         
-        self.stdout.write(self.style.SUCCESS(f'\n=== Total Posts: {posts.count()} ===\n'))
+        # Same grouped aggregation as /api/admin/stats/
+        breakdown = post_breakdown(posts) if table else None
+        if table:
+            self.stdout.write(self.style.SUCCESS(f"\n=== Total Posts: {breakdown['summary']['total_posts']} ===\n"))
         
-        for post in posts:
-            status = []
-            if post.is_public:
-                status.append('PUBLIC')
-            else:
-                status.append('PRIVATE')
-            
-            if post.is_approved:
-                status.append('APPROVED')
-            else:
-                status.append('PENDING')
-            
-            status_str = ' | '.join(status)
-            
-            self.stdout.write(
-                f"ID: {post.id:3d} | {post.type:7s} | {status_str:20s} | "
-                f"User: {post.user.username:15s} | Title: {post.title[:40]}"
-            )
+        # Streamed with the author and section joined in, so memory stays constant
+        writer = PostWriter(self.stdout, options['format'])
+        rows = posts.select_related('user', 'section').order_by('-created_at', '-id')
+        for post in rows.iterator(chunk_size=options['chunk_size']):
+            writer.write(post)
+        
+        # csv/jsonl output contains only the rows
+        if not table:
+            return
         
         # Summary
+        summary = breakdown['summary']
         self.stdout.write('\n=== Summary ===')
-        self.stdout.write(f"Total: {posts.count()}")
-        self.stdout.write(f"Public + Approved: {posts.filter(is_public=True, is_approved=True).count()}")
-        self.stdout.write(f"Public + Pending: {posts.filter(is_public=True, is_approved=False).count()}")
-        self.stdout.write(f"Private + Approved: {posts.filter(is_public=False, is_approved=True).count()}")
-        self.stdout.write(f"Private + Pending: {posts.filter(is_public=False, is_approved=False).count()}")
+        self.stdout.write(f"Total: {summary['total_posts']}")
+        self.stdout.write(f"Public + Approved: {summary['public_approved']}")
+        self.stdout.write(f"Public + Pending: {summary['public_pending']}")
+        self.stdout.write(f"Private + Approved: {summary['private_approved']}")
+        self.stdout.write(f"Private + Pending: {summary['private_pending']}")
+        
+        self.stdout.write('\n=== By Section ===')
+        for section in breakdown['by_section']:
+            self.stdout.write(
+                f"{(section['name'] or '(none)')[:20]:20s} | Total: {section['total_posts']:5d} | "
+                f"Public + Approved: {section['public_approved']}"
+            )
         
         # Show all users
         self.stdout.write('\n=== All Users ===')
-        users = User.objects.all().order_by('username')
-        for user in users:
-            post_count = Post.objects.filter(user=user).count()
+        for user in users_with_post_counts().iterator(chunk_size=options['chunk_size']):
             active_status = 'ACTIVE' if user.is_active else 'INACTIVE'
             role = 'ADMIN' if user.is_staff else 'USER'
             self.stdout.write(
-                f"ID: {user.id:3d} | {user.username:15s} | {active_status:8s} | {role:5s} | Posts: {post_count}"
+                f"ID: {user.id:3d} | {user.username:15s} | {active_status:8s} | {role:5s} | Posts: {user.post_count}"
             )
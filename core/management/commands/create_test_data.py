@@ -1,13 +1,44 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from django.db import connection, connections
 from core.models import Post, Comment, Rating, Section
+from core.management.synthetic_data import COMMENT_TEXTS, SyntheticData, init_worker, run_task
+from core.response_cache import GLOBAL_RESOURCE, bump_versions
+from core import ranking, search
 from django.utils import timezone
+from datetime import timedelta
+import multiprocessing
 import random
+import time
 
 class Command(BaseCommand):
-    help = 'Create test data for API demonstration'
+    help = 'Create test data for API demonstration, or load-test volume with --users/--posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, help='Generate this many synthetic users (default with --posts: 100)')
+        parser.add_argument('--posts', type=int, help='Generate this many synthetic posts (default with --users: 1000)')
+        parser.add_argument('--comments-per-post', type=float, default=3, help='Average comments per post (default: 3)')
+        parser.add_argument('--ratings-per-post', type=float, default=5, help='Average ratings per post (default: 5)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed generates the same data (default: 42)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert (default: 1000)')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation times over this many past days (default: 365)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes generating comments and ratings in parallel (default: 1, SQLite always uses 1)',
+        )
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Do not rebuild the search index and feed rankings afterwards',
+        )
 
     def handle(self, *args, **options):
+        if options['users'] is not None or options['posts'] is not None:
+            self.generate(options)
+            return
+        
         self.stdout.write('Creating test data...')
         
         # Create sections first
@@ -29,6 +60,77 @@ class Command(BaseCommand):
             self.style.SUCCESS('Successfully created test data!')
         )
 
+    def generate(self, options):
+        """Bulk-generate load-test volume (see core/management/synthetic_data.py)"""
+        users = options['users'] if options['users'] is not None else 100
+        posts = options['posts'] if options['posts'] is not None else 1000
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if users < 2 or posts < 0 or batch_size < 1 or workers < 1:
+            raise CommandError('--users must be at least 2, --batch-size and --workers at least 1')
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite has a single writer lock, parallel inserts would only fail with "database is locked"
+            self.stdout.write(self.style.WARNING('SQLite allows one writer at a time, using 1 worker'))
+            workers = 1
+        
+        started = time.monotonic()
+        self.create_sections()
+        now = timezone.now()
+        data = SyntheticData(
+            seed=options['seed'],
+            section_ids=list(Section.objects.order_by('pk').values_list('pk', flat=True)),
+            comments_per_post=options['comments_per_post'],
+            ratings_per_post=options['ratings_per_post'],
+            batch_size=batch_size,
+            start=now - timedelta(days=options['days']),
+            end=now,
+        )
+        
+        data.create_users(users, report=self.progress('Users', users))
+        chunks = data.create_posts(posts, report=self.progress('Posts', posts))
+        
+        # Comments and ratings only depend on (seed, post index), so every chunk is an independent task
+        tasks = [(table, first_index, post_ids) for table in ('ratings', 'comments') for first_index, post_ids in chunks]
+        report = self.progress('Comment/rating batches', len(tasks))
+        totals = {'comments': 0, 'ratings': 0}
+        if workers > 1:
+            # Children must open their own connections
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=init_worker, initargs=(data,)) as pool:
+                results = pool.imap_unordered(run_task, tasks)
+                for done, (table, count) in enumerate(results, start=1):
+                    totals[table] += count
+                    report(done)
+        else:
+            for done, task in enumerate(tasks, start=1):
+                table, count = data.run(task)
+                totals[table] += count
+                report(done)
+        
+        if not options['skip_index']:
+            # bulk_create skips the post signals
+            self.stdout.write('Rebuilding search index and rankings...')
+            search.rebuild_index(chunk_size=batch_size)
+            ranking.rebuild_rankings(chunk_size=batch_size)
+        bump_versions(GLOBAL_RESOURCE)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Generated {users} users, {posts} posts, {totals['comments']} comments and "
+            f"{totals['ratings']} ratings in {time.monotonic() - started:.1f}s (seed {options['seed']})"
+        ))
+        self.stdout.write(f"Synthetic users log in as load{options['seed']}_<n> with password testpass123")
+
+    def progress(self, label, total):
+        """Reporter printing about 20 progress lines per table"""
+        step = max(1, total // 20)
+        state = {'next': step}
+        
+        def report(done):
+            if done >= state['next'] or done == total:
+                self.stdout.write(f'{label}: {done}/{total}')
+                state['next'] = done + step
+        return report
+
     def create_sections(self):
         """Create main sections for organizing posts"""
         
@@ -366,35 +468,14 @@ Day 3 - Deadlift Focus:
         
         users = User.objects.all()
         posts = Post.objects.all()
-
-        comments_data = [
-            "This plan looks amazing! I've been looking for something exactly like this.",
-            "Thanks for sharing! I tried this yesterday and it was perfect.",
-            "Great detailed instructions. Very helpful for beginners.",
-            "I love the Mediterranean approach. So much variety!",
-            "This workout kicked my butt! Definitely going to do it again.",
-            "Perfect for my fitness level. Thanks for the modifications.",
-            "The nutrition info is really helpful. Appreciate the macro breakdown.",
-            "I've been following this for a week and already seeing results!",
-            "Simple but effective. Love that it doesn't require gym equipment.",
-            "Could you add some vegetarian alternatives?",
-            "This is exactly what my trainer recommended. Great minds think alike!",
-            "The progression is perfect. Started easy and building up nicely.",
-            "Tried this today - harder than it looks but so worth it!",
-            "Love the scientific approach. Clear explanations make all the difference.",
-            "Perfect for busy schedules. Quick but effective!",
-            "Been doing this for a month - game changer for my energy levels.",
-            "Great for meal prep! Made everything on Sunday for the week.",
-            "The flexibility tips at the end are gold. Thank you!",
-            "Challenging but doable. Exactly what I needed to push myself.",
-            "Clear instructions and great photos. Very professional!"
-        ]
+        # Counters of the posts that received comments, applied in one UPDATE at the end
+        deltas = {}
 
         for post in posts:
             # Each post gets 2-5 random comments
             num_comments = random.randint(2, 5)
-            selected_comments = random.sample(comments_data, num_comments)
-            
+            selected_comments = random.sample(COMMENT_TEXTS, num_comments)
+
             for comment_text in selected_comments:
                 # Don't let users comment on their own posts
                 available_users = [u for u in users if u != post.user]
@@ -406,13 +487,17 @@ Day 3 - Deadlift Focus:
                         text=comment_text
                     )
                     if created:
+                        deltas.setdefault(post.pk, {'comment_count': 0})['comment_count'] += 1
                         self.stdout.write(f'Created comment on "{post.title}"')
 
+        Post.adjust_counters_many(deltas)
+
     def create_ratings(self):
         """Create realistic ratings for posts"""
         
         users = User.objects.all()
         posts = Post.objects.all()
+        deltas = {}
 
         for post in posts:
             # Each post gets 3-8 random ratings
@@ -433,8 +518,13 @@ Day 3 - Deadlift Focus:
                     defaults={'rating': rating_value}
                 )
                 if created:
+                    delta = deltas.setdefault(post.pk, {'rating_sum': 0, 'rating_count': 0})
+                    delta['rating_sum'] += rating_value
+                    delta['rating_count'] += 1
                     self.stdout.write(f'Created {rating_value}-star rating for "{post.title}"')
 
+        Post.adjust_counters_many(deltas)
+
         # Show statistics
         self.show_statistics()
 
@@ -1,6 +1,10 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core import ranking, search
+from core.management.post_options import PostWriter, add_post_arguments, filter_posts, iter_id_chunks
 from core.models import Post
-from django.contrib.auth.models import User
+from core.response_cache import bump_versions
 
 class Command(BaseCommand):
     help = 'Fix posts that are private - make them public'
@@ -16,35 +20,66 @@ class Command(BaseCommand):
             action='store_true',
             help='Delete all private unapproved posts',
         )
+        add_post_arguments(parser)
 
     def handle(self, *args, **options):
-        # Show current status
-        total = Post.objects.count()
-        private_posts = Post.objects.filter(is_public=False)
+        posts = filter_posts(Post.objects.all(), options)
+        private_posts = posts.filter(is_public=False)
+        chunk_size = options['chunk_size']
+        # Keep stdout machine-readable for csv/jsonl, report progress on stderr
+        log = self.stdout if options['format'] == 'table' else self.stderr
         
-        self.stdout.write(self.style.SUCCESS(f'\n=== Post Status ==='))
-        self.stdout.write(f"Total posts: {total}")
-        self.stdout.write(f"Private posts: {private_posts.count()}")
+        # Show current status
+        total = posts.count()
+        private_total = private_posts.count()
+        log.write(self.style.SUCCESS(f'\n=== Post Status ==='))
+        log.write(f"Total posts: {total}")
+        log.write(f"Private posts: {private_total}")
         
-        if private_posts.exists():
-            self.stdout.write('\nPrivate posts:')
-            for post in private_posts:
-                approved = 'APPROVED' if post.is_approved else 'PENDING'
-                self.stdout.write(
-                    f"  ID: {post.id} | {post.user.username} | {post.title[:40]} | {approved}"
-                )
+        if private_total:
+            log.write('\nPrivate posts:')
+            writer = PostWriter(self.stdout, options['format'])
+            rows = private_posts.select_related('user', 'section').order_by('pk')
+            for post in rows.iterator(chunk_size=chunk_size):
+                writer.write(post)
         
         if options['make_public']:
-            count = private_posts.update(is_public=True)
-            self.stdout.write(self.style.SUCCESS(f'\n✓ Made {count} posts public'))
+            count = self.make_public(private_posts, private_total, chunk_size, log)
+            log.write(self.style.SUCCESS(f'\n✓ Made {count} posts public'))
         
         if options['delete_private']:
-            private_unapproved = Post.objects.filter(is_public=False, is_approved=False)
-            count = private_unapproved.count()
-            private_unapproved.delete()
-            self.stdout.write(self.style.SUCCESS(f'\n✓ Deleted {count} private unapproved posts'))
+            private_unapproved = posts.filter(is_public=False, is_approved=False)
+            count = self.delete_posts(private_unapproved, chunk_size, log)
+            log.write(self.style.SUCCESS(f'\n✓ Deleted {count} private unapproved posts'))
         
         if not options['make_public'] and not options['delete_private']:
-            self.stdout.write('\nOptions:')
-            self.stdout.write('  --make-public      Make all posts public')
-            self.stdout.write('  --delete-private   Delete all private unapproved posts')
+            log.write('\nOptions:')
+            log.write('  --make-public      Make all posts public')
+            log.write('  --delete-private   Delete all private unapproved posts')
+
+    def make_public(self, queryset, total, chunk_size, log):
+        """Update chunk by chunk, each in its own short transaction"""
+        done = 0
+        for ids in iter_id_chunks(queryset, chunk_size):
+            with transaction.atomic():
+                Post.objects.filter(pk__in=ids).update(is_public=True, updated_at=timezone.now())
+                # update() skips the post signals: index newly visible posts and refresh rankings here
+                for post in Post.objects.filter(pk__in=ids, is_approved=True):
+                    search.index_post(post)
+                ranking.refresh_posts(ids)
+            done += len(ids)
+            log.write(f"Made public {done}/{total}")
+        if done:
+            bump_versions('posts', 'sections')
+        return done
+
+    def delete_posts(self, queryset, chunk_size, log):
+        total = queryset.count()
+        done = 0
+        for ids in iter_id_chunks(queryset, chunk_size):
+            with transaction.atomic():
+                # Queryset delete still sends pre_delete, which cleans up the search index
+                Post.objects.filter(pk__in=ids).delete()
+            done += len(ids)
+            log.write(f"Deleted {done}/{total}")
+        return done
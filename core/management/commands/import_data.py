@@ -0,0 +1,134 @@
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core import search
+from core.management.importer import Checkpoint, Importer, init_worker, validate_batch
+from core.response_cache import GLOBAL_RESOURCE, bump_versions
+
+class Command(BaseCommand):
+    help = 'Import posts, comments and ratings from NDJSON (see core/management/importer.py for the record format)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='NDJSON file, or - for stdin (e.g. the output of export_data)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Lines per validation task and transaction (default: 1000)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes parsing and validating batches in parallel; inserts stay in file order (default: 1)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='SQLite file recording progress after every batch; an existing one resumes the import after its last batch',
+        )
+        parser.add_argument('--rejects', help='Write rejected rows with their errors to this NDJSON file (default: stderr)')
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Create unknown sections, and unknown authors as inactive users without a password',
+        )
+        parser.add_argument(
+            '--publish',
+            action='store_true',
+            help='Posts without is_public/is_approved become public and approved (e.g. export_data output)',
+        )
+        parser.add_argument(
+            '--skip-index',
+            action='store_true',
+            help='Do not rebuild the search index afterwards',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if batch_size < 1 or workers < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        source = options['input']
+        checkpoint = None
+        if options['checkpoint']:
+            try:
+                checkpoint = Checkpoint(options['checkpoint'], source)
+            except ValueError as e:
+                raise CommandError(str(e))
+        importer = Importer(
+            create_missing=options['create_missing'],
+            publish=options['publish'],
+            batch_size=batch_size,
+            refs=checkpoint.refs() if checkpoint else None,
+            totals=checkpoint.totals if checkpoint and checkpoint.totals else None,
+        )
+        skip = checkpoint.line if checkpoint else 0
+        if skip:
+            self.stdout.write(f'Resuming after line {skip} ({self.summary(importer.totals)} so far)')
+
+        try:
+            stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot read {source}: {e}')
+        rejects_file = open(options['rejects'], 'a', encoding='utf-8') if options['rejects'] else None
+
+        started = time.monotonic()
+        posts_before = importer.totals['posts']
+        pool = None
+        try:
+            batches = self.read_batches(stream, batch_size, skip)
+            if workers > 1:
+                # Children must open their own connections
+                connections.close_all()
+                pool = multiprocessing.Pool(workers, initializer=init_worker)
+                # Ordered results: batch n is written before n + 1, so refs always point backwards
+                validated = pool.imap(validate_batch, batches)
+            else:
+                validated = map(validate_batch, batches)
+            for last_line, (records, rejects) in validated:
+                new_refs, rejects = importer.write_batch(records, rejects)
+                for entry in rejects:
+                    line = json.dumps(entry, ensure_ascii=False, default=str)
+                    if rejects_file:
+                        rejects_file.write(line + '\n')
+                    else:
+                        self.stderr.write(line)
+                if checkpoint:
+                    checkpoint.save(last_line, importer.totals, new_refs)
+                self.stdout.write(f'Line {last_line}: {self.summary(importer.totals)}')
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+            if checkpoint:
+                checkpoint.close()
+
+        if not options['skip_index'] and importer.totals['posts'] > posts_before:
+            # bulk_create skips the post signals
+            self.stdout.write('Rebuilding search index...')
+            search.rebuild_index(chunk_size=batch_size)
+        bump_versions(GLOBAL_RESOURCE)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {self.summary(importer.totals)} in {time.monotonic() - started:.1f}s'
+        ))
+
+    @staticmethod
+    def read_batches(stream, batch_size, skip):
+        """Yield (last line number, [(line number, text)]) skipping blank lines and lines before `skip`"""
+        lines = ((number, text) for number, text in enumerate(stream, start=1) if number > skip and text.strip())
+        while True:
+            batch = list(itertools.islice(lines, batch_size))
+            if not batch:
+                return
+            yield batch[-1][0], batch
+
+    @staticmethod
+    def summary(totals):
+        return (
+            f"{totals['posts']} posts, {totals['comments']} comments, {totals['ratings']} ratings, "
+            f"{totals['rejected']} rejected"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core import ranking
+
+class Command(BaseCommand):
+    help = 'Recompute the top rated / trending scores of all public approved posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Posts read and ranking rows written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding post rankings...')
+        total = ranking.rebuild_rankings(chunk_size=options['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Ranked {total} posts'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core import search
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from all public approved posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Posts read and index rows written per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding search index...')
+        indexed, terms = search.rebuild_index(chunk_size=options['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Indexed {indexed} posts, {terms} terms'))
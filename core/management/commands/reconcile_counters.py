@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from core.models import Post, Comment, Rating
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized rating/comment counters on posts and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of posts processed per query batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted posts, do not write anything',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        checked = 0
+        repaired = 0
+        last_id = 0
+
+        while True:
+            posts = list(
+                Post.objects.filter(pk__gt=last_id).order_by('pk')
+                .only('id', 'rating_sum', 'rating_count', 'comment_count')[:chunk_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].pk
+            post_ids = [post.pk for post in posts]
+
+            ratings = {
+                row['post']: row
+                for row in Rating.objects.filter(post_id__in=post_ids).order_by()
+                .values('post').annotate(total=Sum('rating'), count=Count('id'))
+            }
+            comments = dict(
+                Comment.objects.filter(post_id__in=post_ids).order_by()
+                .values('post').annotate(count=Count('id')).values_list('post', 'count')
+            )
+
+            drifted = []
+            for post in posts:
+                rating_row = ratings.get(post.pk, {})
+                expected = (
+                    rating_row.get('total') or 0,
+                    rating_row.get('count') or 0,
+                    comments.get(post.pk, 0),
+                )
+                if (post.rating_sum, post.rating_count, post.comment_count) != expected:
+                    post.rating_sum, post.rating_count, post.comment_count = expected
+                    drifted.append(post)
+
+            if drifted and not dry_run:
+                with transaction.atomic():
+                    Post.objects.bulk_update(drifted, ['rating_sum', 'rating_count', 'comment_count'])
+
+            checked += len(posts)
+            repaired += len(drifted)
+            self.stdout.write(f"Checked {checked} posts, drifted so far: {repaired}")
+
+        action = 'Found' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {action} {repaired} of {checked} posts'))
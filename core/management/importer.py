@@ -0,0 +1,378 @@
+"""
+Bulk NDJSON import of posts, comments and ratings (import_data).
+
+One JSON object per line; "record" says what it is and defaults to "post", so
+the output of export_data (posts with embedded "comments") imports as is:
+
+    {"record": "post", "ref": "p1", "author": "anna", "section": "Nutrition", "title": ..., "type": "meal",
+     "description": ..., "is_public": true, "is_approved": true, "comments": [...], "ratings": [...]}
+    {"record": "comment", "post": "p1", "author": "tom", "text": ...}
+    {"record": "rating", "post_id": 42, "author": "tom", "rating": 5}
+
+Posts are referenced by the "ref" of an earlier post of the import (export_data
+rows use their "id") or by "post_id" of a post already in the database. Users
+and sections are looked up by username and name ("author_username" and
+"section_name" are accepted too) through in-memory maps filled in one query
+per batch. Fields are validated with the rules of PostSerializer,
+CommentSerializer and RatingSerializer; invalid rows are rejected individually
+and the rest of the batch is inserted.
+
+Parsing and validation are pure CPU work and run in worker processes; key
+resolution and the inserts run in the main process batch by batch, in file
+order, one transaction per batch. After every committed batch the optional
+checkpoint (a SQLite file holding the last line and the ref -> post id map)
+is updated, so an interrupted import resumes after the last batch it finished.
+"""
+import json
+import sqlite3
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import ranking
+from core.models import Comment, Post, Rating, Section
+from core.serializers import CommentSerializer, PostSerializer, RatingSerializer
+from .synthetic_data import explicit_timestamps
+
+RECORD_TYPES = ('post', 'comment', 'rating')
+POST_FIELDS = ('title', 'type', 'description', 'calories', 'recommendations', 'is_public')
+SERIALIZERS = {'post': PostSerializer, 'comment': CommentSerializer, 'rating': RatingSerializer}
+FIELDS = {'post': POST_FIELDS, 'comment': ('text',), 'rating': ('rating',)}
+COUNTER_DELTAS = {
+    'comment': lambda data: {'comment_count': 1},
+    'rating': lambda data: {'rating_sum': data['rating'], 'rating_count': 1},
+}
+
+
+class Rejected(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def plain_errors(errors):
+    # ErrorDetail -> str, for pickling across processes and the JSON report
+    return json.loads(json.dumps(errors))
+
+
+def first_value(raw, *names):
+    for name in names:
+        if raw.get(name) is not None:
+            return raw[name]
+    return None
+
+
+def parse_timestamps(raw):
+    moments = {}
+    for name in ('created_at', 'updated_at'):
+        value = raw.get(name)
+        if value is None:
+            continue
+        moment = parse_datetime(value) if isinstance(value, str) else None
+        if moment is None:
+            raise Rejected({name: [f'Invalid ISO datetime: {value!r}']})
+        moments[name] = moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+    return moments
+
+
+def validate_record(kind, raw, embedded=False):
+    """One record -> dict of what the writer needs; raises Rejected"""
+    if not isinstance(raw, dict):
+        raise Rejected({'non_field_errors': ['Record must be an object']})
+    author = first_value(raw, 'author', 'author_username')
+    if not isinstance(author, str) or not author:
+        raise Rejected({'author': ['This field is required.']})
+    serializer = SERIALIZERS[kind](data={name: raw[name] for name in FIELDS[kind] if name in raw})
+    if not serializer.is_valid():
+        raise Rejected(plain_errors(serializer.errors))
+    record = {'kind': kind, 'author': author, 'data': dict(serializer.validated_data), **parse_timestamps(raw)}
+
+    if kind == 'post':
+        # Read-only in PostSerializer, imports may set it
+        if 'is_approved' in raw:
+            if not isinstance(raw['is_approved'], bool):
+                raise Rejected({'is_approved': ['Must be a valid boolean.']})
+            record['data']['is_approved'] = raw['is_approved']
+        ref = first_value(raw, 'ref', 'id')
+        record['ref'] = str(ref) if ref is not None else None
+        record['section'] = first_value(raw, 'section', 'section_name')
+    elif not embedded:
+        post_ref, post_id = raw.get('post'), raw.get('post_id')
+        if post_id is not None and not isinstance(post_id, int):
+            raise Rejected({'post_id': ['A valid integer is required.']})
+        if post_ref is None and post_id is None:
+            raise Rejected({'post': ['This field is required.']})
+        record['post_ref'] = str(post_ref) if post_ref is not None else None
+        record['post_id'] = post_id
+    return record
+
+
+def validate_lines(lines):
+    """
+    Worker task: [(line number, text)] -> ([record], [reject]). Embedded comments and
+    ratings of a post become child records; an invalid child only rejects itself.
+    """
+    records = []
+    rejects = []
+    for line_no, text in lines:
+        try:
+            raw = json.loads(text)
+        except ValueError as e:
+            rejects.append({'line': line_no, 'errors': {'non_field_errors': [f'Invalid JSON: {e}']}, 'source': text.rstrip('\n')})
+            continue
+        kind = raw.get('record', 'post') if isinstance(raw, dict) else None
+        if kind not in RECORD_TYPES:
+            rejects.append({'line': line_no, 'errors': {'record': [f'Must be one of: {", ".join(RECORD_TYPES)}']}, 'source': raw})
+            continue
+        embedded = {name: raw.get(name) or [] for name in ('comments', 'ratings')} if kind == 'post' else {}
+        try:
+            record = validate_record(kind, raw)
+        except Rejected as e:
+            rejects.append({'line': line_no, 'record': kind, 'errors': e.errors, 'source': raw})
+            continue
+        not_lists = {name: ['Must be a list.'] for name, items in embedded.items() if not isinstance(items, list)}
+        if not_lists:
+            rejects.append({'line': line_no, 'record': kind, 'errors': not_lists, 'source': raw})
+            continue
+        record['line'] = line_no
+        record['source'] = raw
+        record['children'] = []
+        for name, items in embedded.items():
+            for index, item in enumerate(items):
+                try:
+                    child = validate_record(name[:-1], item, embedded=True)
+                except Rejected as e:
+                    rejects.append({'line': line_no, 'record': name[:-1], 'path': f'{name}[{index}]', 'errors': e.errors, 'source': item})
+                    continue
+                child['line'] = line_no
+                child['path'] = f'{name}[{index}]'
+                child['source'] = item
+                record['children'].append(child)
+        records.append(record)
+    return records, rejects
+
+
+def validate_batch(batch):
+    """Worker task: (last line number, lines) -> (last line number, validate_lines(lines))"""
+    last_line, lines = batch
+    return last_line, validate_lines(lines)
+
+
+def init_worker():
+    django.setup()  # no-op when the worker was forked from a configured process
+    connection.close()
+
+
+class Checkpoint:
+    """Progress of one import in a SQLite file: last committed line, totals and the ref -> post id map"""
+
+    def __init__(self, path, source):
+        self.db = sqlite3.connect(path)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS refs (ref TEXT PRIMARY KEY, post_id INTEGER NOT NULL)')
+        state = dict(self.db.execute('SELECT key, value FROM state'))
+        if state and state['source'] != source:
+            raise ValueError(f"Checkpoint {path} belongs to {state['source']}, not {source}")
+        self.source = source
+        self.line = int(state.get('line', 0))
+        self.totals = json.loads(state.get('totals', '{}'))
+
+    def refs(self):
+        return dict(self.db.execute('SELECT ref, post_id FROM refs'))
+
+    def save(self, line, totals, new_refs):
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO refs (ref, post_id) VALUES (?, ?)', new_refs.items())
+            self.db.executemany(
+                'INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)',
+                [('source', self.source), ('line', str(line)), ('totals', json.dumps(totals))],
+            )
+        self.line = line
+
+    def close(self):
+        self.db.close()
+
+
+class Importer:
+    """Resolves natural keys and writes validated batches (main process)"""
+
+    def __init__(self, create_missing=False, publish=False, batch_size=1000, refs=None, totals=None):
+        self.create_missing = create_missing
+        self.publish = publish
+        self.batch_size = batch_size
+        self.users = {}
+        self.sections = dict(Section.objects.values_list('name', 'id'))
+        self.refs = refs or {}
+        self.totals = totals or {'posts': 0, 'comments': 0, 'ratings': 0, 'rejected': 0}
+
+    def write_batch(self, records, rejects):
+        """Insert one validated batch in a transaction; returns (new refs, rejects)"""
+        self.resolve_users(records)
+        with transaction.atomic(), explicit_timestamps(Post, Comment, Rating):
+            posts, children = self.build_posts(records, rejects)
+            new_refs = self.insert_posts(posts)
+            # Comments and ratings of this batch may point at its posts
+            self.refs.update(new_refs)
+            comments, ratings, deltas = self.build_children(children, rejects)
+            Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+            Rating.objects.bulk_create(ratings, batch_size=self.batch_size)
+            # Also refreshes the feed ranking of the touched posts. Posts of this batch keep
+            # their imported updated_at; existing posts changed, so the export must see them again
+            new_ids = {post.pk for _, post in posts}
+            Post.adjust_counters_many({pk: delta for pk, delta in deltas.items() if pk in new_ids}, touch=False)
+            Post.adjust_counters_many({pk: delta for pk, delta in deltas.items() if pk not in new_ids})
+            ranking.refresh_posts([post.pk for _, post in posts if post.pk not in deltas])
+        self.totals['posts'] += len(posts)
+        self.totals['comments'] += len(comments)
+        self.totals['ratings'] += len(ratings)
+        self.totals['rejected'] += len(rejects)
+        return new_refs, rejects
+
+    def resolve_users(self, records):
+        names = {record['author'] for record in records} | {child['author'] for record in records for child in record['children']}
+        missing = [name for name in names if name not in self.users]
+        if not missing:
+            return
+        self.users.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        unknown = [name for name in missing if name not in self.users]
+        if unknown and self.create_missing:
+            # Inactive like self-registered users until an admin approves them; no usable password
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password, is_active=False) for name in unknown], ignore_conflicts=True,
+            )
+            self.users.update(User.objects.filter(username__in=unknown).values_list('username', 'id'))
+
+    def section_id(self, name):
+        if name is None:
+            return None
+        if name not in self.sections and self.create_missing:
+            self.sections[name] = Section.objects.get_or_create(name=name)[0].pk
+        if name not in self.sections:
+            raise Rejected({'section': [f'Section "{name}" does not exist.']})
+        return self.sections[name]
+
+    def user_id(self, name):
+        if name not in self.users:
+            raise Rejected({'author': [f'User "{name}" does not exist.']})
+        return self.users[name]
+
+    def build_posts(self, records, rejects):
+        now = timezone.now()
+        posts = []
+        children = []
+        for record in records:
+            if record['kind'] != 'post':
+                children.append((record, None))
+                continue
+            if self.publish:
+                record['data'].setdefault('is_public', True)
+                record['data'].setdefault('is_approved', True)
+            try:
+                post = Post(
+                    user_id=self.user_id(record['author']),
+                    section_id=self.section_id(record['section']),
+                    created_at=record.get('created_at', now),
+                    updated_at=record.get('updated_at', record.get('created_at', now)),
+                    **record['data'],
+                )
+            except Rejected as e:
+                rejects.append(reject_entry(record, e.errors))
+                continue
+            posts.append((record, post))
+            children.extend((child, post) for child in record['children'])
+        return posts, children
+
+    def insert_posts(self, posts):
+        if not posts:
+            return {}
+        previous_max = Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        Post.objects.bulk_create([post for _, post in posts], batch_size=self.batch_size)
+        assign_inserted_ids([post for _, post in posts], previous_max)
+        return {record['ref']: post.pk for record, post in posts if record['ref'] is not None}
+
+    def build_children(self, children, rejects):
+        now = timezone.now()
+        comments, ratings = [], []
+        deltas = {}
+        rated = set()
+        candidates = []
+        for record, parent in children:
+            try:
+                post_id = parent.pk if parent is not None else self.post_id(record)
+                user_id = self.user_id(record['author'])
+            except Rejected as e:
+                rejects.append(reject_entry(record, e.errors))
+                continue
+            candidates.append((record, post_id, user_id))
+
+        existing_posts = set(Post.objects.filter(
+            pk__in={post_id for record, post_id, _ in candidates if record.get('post_id') is not None}
+        ).values_list('pk', flat=True))
+        rating_keys = [(post_id, user_id) for record, post_id, user_id in candidates if record['kind'] == 'rating']
+        existing_ratings = set(Rating.objects.filter(
+            post_id__in={post_id for post_id, _ in rating_keys}, user_id__in={user_id for _, user_id in rating_keys},
+        ).values_list('post_id', 'user_id')) if rating_keys else set()
+
+        for record, post_id, user_id in candidates:
+            if record.get('post_id') is not None and post_id not in existing_posts:
+                rejects.append(reject_entry(record, {'post_id': [f'Invalid pk "{post_id}" - object does not exist.']}))
+                continue
+            created_at = record.get('created_at', now)
+            fields = dict(post_id=post_id, user_id=user_id, created_at=created_at,
+                          updated_at=record.get('updated_at', created_at), **record['data'])
+            if record['kind'] == 'rating':
+                if (post_id, user_id) in existing_ratings or (post_id, user_id) in rated:
+                    rejects.append(reject_entry(record, {'non_field_errors': ['The user already rated this post.']}))
+                    continue
+                rated.add((post_id, user_id))
+                ratings.append(Rating(**fields))
+            else:
+                comments.append(Comment(**fields))
+            delta = deltas.setdefault(post_id, {})
+            for field, value in COUNTER_DELTAS[record['kind']](record['data']).items():
+                delta[field] = delta.get(field, 0) + value
+        return comments, ratings, deltas
+
+    def post_id(self, record):
+        if record['post_ref'] is not None:
+            if record['post_ref'] not in self.refs:
+                raise Rejected({'post': [f'No post with ref "{record["post_ref"]}" was imported before this line.']})
+            return self.refs[record['post_ref']]
+        return record['post_id']
+
+
+def assign_inserted_ids(posts, previous_max):
+    """
+    MySQL does not return bulk_create ids. Read them back in insert order, skipping
+    rows the site wrote concurrently (matched on author and title).
+    """
+    if posts[0].pk is not None:
+        return
+    pending = iter(posts)
+    post = next(pending)
+    rows = (
+        Post.objects.filter(pk__gt=previous_max, user_id__in={post.user_id for post in posts})
+        .order_by('pk').values_list('pk', 'user_id', 'title')
+    )
+    for pk, user_id, title in rows.iterator():
+        if (user_id, title) == (post.user_id, post.title):
+            post.pk = pk
+            post = next(pending, None)
+            if post is None:
+                return
+    raise RuntimeError(f'Could not read back the ids of {len(posts)} inserted posts')
+
+
+def reject_entry(record, errors):
+    """Reject of the write phase, shaped like the ones validate_lines() writes"""
+    entry = {'line': record['line'], 'record': record['kind'], 'errors': errors}
+    if record.get('path'):
+        entry['path'] = record['path']
+    entry['source'] = record['source']
+    return entry
@@ -0,0 +1,113 @@
+"""
+Shared options for the post maintenance commands (check_posts, fix_posts):
+section/user/date filters, streaming output in table, csv or jsonl format
+and keyset-paginated id chunks for batched writes.
+"""
+import csv
+import json
+from datetime import datetime, time
+
+from django.core.management.base import CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+OUTPUT_FORMATS = ('table', 'csv', 'jsonl')
+ROW_FIELDS = ('id', 'type', 'is_public', 'is_approved', 'section', 'user', 'created_at', 'title')
+
+
+def add_post_arguments(parser):
+    parser.add_argument('--section', help='Only posts in this section (id or name)')
+    parser.add_argument('--user', help='Only posts by this user (id or username)')
+    parser.add_argument('--since', help='Only posts created at or after this date/datetime (ISO 8601)')
+    parser.add_argument('--until', help='Only posts created before this date/datetime (ISO 8601)')
+    parser.add_argument(
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default='table',
+        help='Output format for the post rows (default: table)',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=1000,
+        help='Number of posts fetched/written per query batch (default: 1000)',
+    )
+
+
+def parse_moment(value, option):
+    """Date or datetime string -> aware datetime (dates mean midnight)"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'{option} must be an ISO date or datetime, got {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_posts(queryset, options):
+    section = options.get('section')
+    if section:
+        queryset = queryset.filter(section_id=int(section)) if section.isdigit() else queryset.filter(section__name=section)
+    user = options.get('user')
+    if user:
+        queryset = queryset.filter(user_id=int(user)) if user.isdigit() else queryset.filter(user__username=user)
+    if options.get('since'):
+        queryset = queryset.filter(created_at__gte=parse_moment(options['since'], '--since'))
+    if options.get('until'):
+        queryset = queryset.filter(created_at__lt=parse_moment(options['until'], '--until'))
+    return queryset
+
+
+def iter_id_chunks(queryset, chunk_size):
+    """Yield lists of at most chunk_size ids, walking the primary key so memory stays constant"""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def post_row(post):
+    return {
+        'id': post.id,
+        'type': post.type,
+        'is_public': post.is_public,
+        'is_approved': post.is_approved,
+        'section': post.section.name if post.section_id else None,
+        'user': post.user.username,
+        'created_at': post.created_at.isoformat(),
+        'title': post.title,
+    }
+
+
+class PostWriter:
+    """Writes post rows one at a time in the requested format"""
+
+    def __init__(self, stdout, output_format):
+        self.stdout = stdout
+        self.format = output_format
+        if output_format == 'csv':
+            # OutputWrapper appends the line ending to every write
+            self.csv = csv.DictWriter(stdout, fieldnames=ROW_FIELDS, lineterminator='')
+            self.csv.writeheader()
+
+    def write(self, post):
+        row = post_row(post)
+        if self.format == 'csv':
+            self.csv.writerow(row)
+        elif self.format == 'jsonl':
+            self.stdout.write(json.dumps(row))
+        else:
+            status_str = ' | '.join([
+                'PUBLIC' if post.is_public else 'PRIVATE',
+                'APPROVED' if post.is_approved else 'PENDING',
+            ])
+            self.stdout.write(
+                f"ID: {post.id:3d} | {post.type:7s} | {status_str:20s} | "
+                f"User: {post.user.username:15s} | Title: {post.title[:40]}"
+            )
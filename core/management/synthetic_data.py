@@ -0,0 +1,292 @@
+"""
+Deterministic, skewed synthetic data for load testing (create_test_data --posts N ...).
+
+Every row is derived from (seed, row index) alone, so comments and ratings can
+be generated in separate processes and the per-post counters can be written
+together with the post before its ratings exist. Popularity follows a
+Zipf-like law: a few users write most posts and ratings, a few sections hold
+most posts and a few posts collect most of the comments and ratings.
+"""
+import itertools
+import random
+from bisect import bisect
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from core.models import Comment, Post, Rating
+
+ZIPF_EXPONENT = 1.1
+# Pareto shape of the per-post comment/rating counts (long tail, mean scaled to the requested value)
+ACTIVITY_SHAPE = 1.5
+PASSWORD = 'testpass123'
+
+RATING_VALUES = [1, 2, 3, 4, 5]
+RATING_WEIGHTS = {
+    'good': [1, 2, 6, 14, 17],
+    'poor': [8, 10, 8, 3, 1],
+}
+
+ADJECTIVES = ['Quick', 'Easy', 'Advanced', 'Beginner', 'Weekly', 'Daily', 'Intense', 'Balanced', 'Budget', 'Summer']
+TOPICS = {
+    'meal': ['High Protein', 'Mediterranean', 'Vegan', 'Keto', 'Low Carb', 'Post-Workout', 'Vegetarian', 'Paleo'],
+    'workout': ['Full Body', 'Upper Body', 'HIIT', 'Yoga', 'Powerlifting', 'Cardio', 'Core', 'Mobility'],
+}
+NOUNS = {
+    'meal': ['Meal Plan', 'Breakfast', 'Lunch Prep', 'Dinner Menu', 'Snack Guide'],
+    'workout': ['Workout', 'Routine', 'Program', 'Circuit', 'Split'],
+}
+SENTENCES = {
+    'meal': [
+        'Grilled salmon with quinoa and roasted vegetables.',
+        'Oatmeal with banana, berries and almond butter.',
+        'Greek salad with chickpeas, olives and feta.',
+        'Chicken and brown rice with steamed broccoli.',
+        'Lentil curry with spinach and whole grain bread.',
+        'Protein shake with oats and peanut butter.',
+        'Scrambled eggs with avocado toast.',
+        'Tuna and white bean salad with olive oil.',
+    ],
+    'workout': [
+        'Squats: 4 sets x 8 reps.',
+        'Push-ups: 3 sets x 12 reps.',
+        'Deadlift: 5 sets x 5 reps.',
+        'Burpees and mountain climbers for 30 seconds each.',
+        'Plank: 3 sets x 45 seconds.',
+        'Sun salutation flow, 5 rounds.',
+        'Pull-ups: 4 sets to failure.',
+        '20 minutes of steady cardio to cool down.',
+    ],
+}
+COMMENT_TEXTS = [
+    "This plan looks amazing! I've been looking for something exactly like this.",
+    "Thanks for sharing! I tried this yesterday and it was perfect.",
+    "Great detailed instructions. Very helpful for beginners.",
+    "I love the Mediterranean approach. So much variety!",
+    "This workout kicked my butt! Definitely going to do it again.",
+    "Perfect for my fitness level. Thanks for the modifications.",
+    "The nutrition info is really helpful. Appreciate the macro breakdown.",
+    "I've been following this for a week and already seeing results!",
+    "Simple but effective. Love that it doesn't require gym equipment.",
+    "Could you add some vegetarian alternatives?",
+    "This is exactly what my trainer recommended. Great minds think alike!",
+    "The progression is perfect. Started easy and building up nicely.",
+    "Tried this today - harder than it looks but so worth it!",
+    "Love the scientific approach. Clear explanations make all the difference.",
+    "Perfect for busy schedules. Quick but effective!",
+    "Been doing this for a month - game changer for my energy levels.",
+    "Great for meal prep! Made everything on Sunday for the week.",
+    "The flexibility tips at the end are gold. Thank you!",
+    "Challenging but doable. Exactly what I needed to push myself.",
+    "Clear instructions and great photos. Very professional!",
+]
+
+
+class ZipfSampler:
+    """Draws indices 0..n-1 with probability proportional to 1 / (index + 1) ** exponent"""
+
+    def __init__(self, n, exponent=ZIPF_EXPONENT):
+        self.cum_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+    def sample(self, rng):
+        return bisect(self.cum_weights, rng.random() * self.cum_weights[-1])
+
+
+def row_rng(seed, kind, index):
+    # String seeds are hashed with SHA-512, so streams are stable across processes and runs
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def activity_count(rng, mean, limit):
+    """Long-tailed count with the given mean (stochastic rounding keeps the mean unbiased)"""
+    if mean <= 0 or limit <= 0:
+        return 0
+    value = mean * (ACTIVITY_SHAPE - 1) / ACTIVITY_SHAPE * rng.paretovariate(ACTIVITY_SHAPE)
+    return min(int(value + rng.random()), limit)
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at instead of stamping now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def insert_rows(model, fields, rows, batch_size):
+    """
+    executemany() plain tuples into the model table. Comments and ratings are
+    the bulk of the volume and need no ids back, so this skips building model
+    instances, which costs several times more than the insert itself.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset:offset + batch_size])
+
+
+def inserted_ids(model, objs, previous_max):
+    """Primary keys of rows just bulk-created (MySQL does not return them, so read them back)"""
+    if objs and objs[0].pk is not None:
+        return [obj.pk for obj in objs]
+    return list(
+        model.objects.filter(pk__gt=previous_max).order_by('pk').values_list('pk', flat=True)[:len(objs)]
+    )
+
+
+class SyntheticData:
+    """
+    Generator state shared with worker processes: seed, user and section ids
+    and the time window. Posts are numbered 0..N-1 in creation order; their
+    comments and ratings are regenerated from that index wherever needed.
+    """
+
+    def __init__(self, seed, section_ids, comments_per_post, ratings_per_post, batch_size, start, end):
+        self.seed = seed
+        self.section_ids = section_ids
+        self.comments_per_post = comments_per_post
+        self.ratings_per_post = ratings_per_post
+        self.batch_size = batch_size
+        self.start = start
+        self.end = end
+        self.user_ids = []
+        self.sections = ZipfSampler(len(section_ids))
+        self.users = None
+
+    def create_users(self, count, report=None):
+        """Create (or reuse, on a rerun with the same seed) `count` users with one pre-hashed password"""
+        password = make_password(PASSWORD)
+        for offset in range(0, count, self.batch_size):
+            names = [f'load{self.seed}_{index}' for index in range(offset, min(offset + self.batch_size, count))]
+            User.objects.bulk_create(
+                [User(username=name, email=f'{name}@example.com', password=password) for name in names],
+                ignore_conflicts=True,
+            )
+            ids = dict(User.objects.filter(username__in=names).values_list('username', 'id'))
+            self.user_ids.extend(ids[name] for name in names)
+            if report:
+                report(len(self.user_ids))
+        self.users = ZipfSampler(len(self.user_ids))
+
+    def plan_post(self, index):
+        """Everything about post `index` that its comments and ratings depend on"""
+        rng = row_rng(self.seed, 'post', index)
+        author = self.users.sample(rng)
+        post_type = 'meal' if rng.random() < 0.5 else 'workout'
+        created_at = self.start + (self.end - self.start) * rng.random()
+        comment_count = activity_count(rng, self.comments_per_post, limit=10 * self.comments_per_post + 100)
+        rating_count = activity_count(rng, self.ratings_per_post, limit=len(self.user_ids) - 1)
+        return rng, author, post_type, created_at, comment_count, rating_count
+
+    def rating_values(self, index, count):
+        rng = row_rng(self.seed, 'ratings', index)
+        weights = RATING_WEIGHTS['good' if rng.random() > 0.2 else 'poor']
+        return rng, rng.choices(RATING_VALUES, weights=weights, k=count)
+
+    def build_post(self, index):
+        rng, author, post_type, created_at, comment_count, rating_count = self.plan_post(index)
+        _, values = self.rating_values(index, rating_count)
+        title = f'{rng.choice(ADJECTIVES)} {rng.choice(TOPICS[post_type])} {rng.choice(NOUNS[post_type])}'
+        return Post(
+            user_id=self.user_ids[author],
+            section_id=self.section_ids[self.sections.sample(rng)],
+            title=title[:100],
+            type=post_type,
+            description='\n'.join(rng.choice(SENTENCES[post_type]) for _ in range(rng.randint(2, 8))),
+            recommendations=rng.choice(SENTENCES[post_type]),
+            calories=rng.randint(150, 900),
+            is_public=rng.random() < 0.85,
+            is_approved=rng.random() < 0.9,
+            # Counters are known up front, so no reconciliation pass is needed afterwards
+            rating_sum=sum(values),
+            rating_count=rating_count,
+            comment_count=comment_count,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def create_posts(self, count, report=None):
+        """Insert posts in batches; returns [(first index, post ids)] per batch for the child tables"""
+        chunks = []
+        with explicit_timestamps(Post):
+            for offset in range(0, count, self.batch_size):
+                posts = [self.build_post(index) for index in range(offset, min(offset + self.batch_size, count))]
+                with transaction.atomic():
+                    previous_max = Post.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+                    Post.objects.bulk_create(posts)
+                    chunks.append((offset, inserted_ids(Post, posts, previous_max)))
+                if report:
+                    report(offset + len(posts))
+        return chunks
+
+    def activity_time(self, rng, post_created_at):
+        return post_created_at + (self.end - post_created_at) * rng.random()
+
+    def create_comments(self, first_index, post_ids):
+        adapt = connection.ops.adapt_datetimefield_value
+        rows = []
+        for index, post_id in enumerate(post_ids, start=first_index):
+            _, _, _, created_at, comment_count, _ = self.plan_post(index)
+            rng = row_rng(self.seed, 'comments', index)
+            for _ in range(comment_count):
+                commented_at = adapt(self.activity_time(rng, created_at))
+                rows.append((post_id, self.user_ids[self.users.sample(rng)], rng.choice(COMMENT_TEXTS), commented_at, commented_at))
+        with transaction.atomic():
+            insert_rows(Comment, ('post', 'user', 'text', 'created_at', 'updated_at'), rows, self.batch_size)
+        return len(rows)
+
+    def create_ratings(self, first_index, post_ids):
+        adapt = connection.ops.adapt_datetimefield_value
+        rows = []
+        user_count = len(self.user_ids)
+        for index, post_id in enumerate(post_ids, start=first_index):
+            _, author, _, created_at, _, rating_count = self.plan_post(index)
+            rng, values = self.rating_values(index, rating_count)
+            # Consecutive users from a Zipf-drawn start: distinct (one rating per user) but still skewed
+            first = self.users.sample(rng)
+            raters = (
+                position % user_count for position in range(first, first + user_count)
+                if position % user_count != author
+            )
+            for rater, value in zip(raters, values):
+                rated_at = adapt(self.activity_time(rng, created_at))
+                rows.append((post_id, self.user_ids[rater], value, rated_at, rated_at))
+        with transaction.atomic():
+            insert_rows(Rating, ('post', 'user', 'rating', 'created_at', 'updated_at'), rows, self.batch_size)
+        return len(rows)
+
+    def run(self, task):
+        """task = (table, first post index, post ids); returns (table, rows created)"""
+        table, first_index, post_ids = task
+        if table == 'comments':
+            return table, self.create_comments(first_index, post_ids)
+        return table, self.create_ratings(first_index, post_ids)
+
+
+# Worker process entry points (multiprocessing needs module-level callables)
+_worker_data = None
+
+
+def init_worker(data):
+    global _worker_data
+    django.setup()  # no-op when the worker was forked from a configured process
+    connection.close()
+    _worker_data = data
+
+
+def run_task(task):
+    return _worker_data.run(task)
@@ -0,0 +1,87 @@
+"""
+Prometheus metrics for /metrics.
+
+Under gunicorn every worker writes its samples to mmap'd files in
+PROMETHEUS_MULTIPROC_DIR (set in gunicorn_config.py) and the /metrics view sums
+the files of all workers, so any worker can answer a scrape. Without that
+variable (runserver, management commands) the default in-process registry is used.
+"""
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .permissions import is_admin_request
+
+# Unknown methods would create a new label value per request
+KNOWN_METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+REQUESTS = Counter(
+    'trainee_http_requests_total',
+    'HTTP requests by URL name, method and status code',
+    ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'trainee_http_request_duration_seconds',
+    'Request latency by URL name and method',
+    ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    'trainee_http_request_db_queries',
+    'SQL queries per request by URL name',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+DB_SECONDS = Counter(
+    'trainee_http_request_db_seconds_total',
+    'Time spent in SQL by URL name',
+    ['view'],
+)
+RESPONSE_CACHE = Counter(
+    'trainee_response_cache_requests_total',
+    'Anonymous response cache lookups (core/response_cache.py) by result',
+    ['result'],
+)
+DB_POOL_EVENTS = Counter(
+    'trainee_db_pool_events_total',
+    'Connection pool events (Trainee/db_pool) by database alias and event',
+    ['alias', 'event'],
+)
+
+
+def observe_request(request, response, duration):
+    match = getattr(request, 'resolver_match', None)
+    # URL names from core/urls.py keep the label set small; unmatched paths share one value
+    view = match.view_name if match and match.view_name else 'unmatched'
+    method = request.method if request.method in KNOWN_METHODS else 'other'
+    REQUESTS.labels(view, method, str(response.status_code)).inc()
+    LATENCY.labels(view, method).observe(duration)
+
+    stats = getattr(request, '_query_stats', None)
+    if stats is not None:
+        DB_QUERIES.labels(view).observe(stats.count)
+        DB_SECONDS.labels(view).inc(stats.duration)
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition. Scrapers send "Authorization: Bearer <METRICS_TOKEN>";
+    without a configured token only staff users (JWT) can read it.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), expected.encode()):
+            return JsonResponse({'error': 'Invalid or missing metrics token'}, status=401)
+    elif not is_admin_request(request):
+        return JsonResponse({'error': 'Metrics are staff-only unless METRICS_TOKEN is set'}, status=403)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Rating = apps.get_model('core', 'Rating')
+    Comment = apps.get_model('core', 'Comment')
+
+    def per_post(queryset, aggregate):
+        subquery = (
+            queryset.filter(post=OuterRef('pk')).order_by()
+            .values('post').annotate(value=aggregate).values('value')
+        )
+        return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+    Post.objects.update(
+        rating_sum=per_post(Rating.objects, Sum('rating')),
+        rating_count=per_post(Rating.objects, Count('id')),
+        comment_count=per_post(Comment.objects, Count('id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_section_alter_comment_post_post_section'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
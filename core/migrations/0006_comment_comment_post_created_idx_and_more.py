@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_comment_count_post_rating_count_post_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_public', 'is_approved', 'created_at'], name='post_visible_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['section', 'is_public', 'is_approved', 'created_at'], name='post_section_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', 'is_public', 'is_approved', 'created_at'], name='post_user_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_approved', 'created_at'], name='post_pending_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['post', 'created_at'], name='rating_post_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_searchdocument_searchterm_searchposting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRanking',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='core.post')),
+                ('type', models.CharField(choices=[('meal', 'Meal Plan'), ('workout', 'Workout Plan')], max_length=10)),
+                ('bayesian_score', models.FloatField()),
+                ('hot_score', models.FloatField()),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.section')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bayesian_score'], name='ranking_top_idx'), models.Index(fields=['type', 'bayesian_score'], name='ranking_top_type_idx'), models.Index(fields=['section', 'type', 'bayesian_score'], name='ranking_top_section_idx'), models.Index(fields=['hot_score'], name='ranking_hot_idx'), models.Index(fields=['type', 'hot_score'], name='ranking_hot_type_idx'), models.Index(fields=['section', 'type', 'hot_score'], name='ranking_hot_section_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_postranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationLease',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='moderation_lease', serialize=False, to='core.post')),
+                ('expires_at', models.DateTimeField()),
+                ('moderator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_leases', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['moderator', 'expires_at'], name='lease_moderator_expires_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_claimsuser_tokenrevocation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_public', 'is_approved', 'updated_at', 'id'], name='post_visible_updated_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Section(models.Model):
@@ -14,6 +17,22 @@ class Section(models.Model):
     class Meta:
         ordering = ['name']
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Posts ready for PostSerializer: author and section are joined and the
+        section post count is computed in SQL, so a page costs the same number
+        of queries for any page size. Rating and comment totals are read from
+        the denormalized counter columns.
+        """
+        section_post_count = (
+            Post.objects.filter(section=OuterRef('section')).order_by()
+            .values('section').annotate(value=Count('id')).values('value')
+        )
+        return self.select_related('user', 'section').annotate(
+            section_post_count=Coalesce(Subquery(section_post_count, output_field=IntegerField()), 0),
+        )
+
 class Post(models.Model):
     TYPE_CHOICES = [
         ('meal', 'Meal Plan'),
@@ -33,17 +52,102 @@ class Post(models.Model):
     calories = models.IntegerField(null=True, blank=True, help_text="Estimated calories")
     recommendations = models.TextField(blank=True, help_text="Additional recommendations")
     
+    # Denormalizuoti skaitliukai (atnaujinami rašymo metu, žr. Post.adjust_counters)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('rating_sum', 'rating_count', 'comment_count')
+
+    class Meta:
+        indexes = [
+            # PublicPostsView / PostListView (guests)
+            models.Index(fields=['is_public', 'is_approved', 'created_at'], name='post_visible_created_idx'),
+            # SectionPostsView
+            models.Index(fields=['section', 'is_public', 'is_approved', 'created_at'], name='post_section_visible_idx'),
+            # UserPostsView (also serves plain user_id lookups)
+            models.Index(fields=['user', 'is_public', 'is_approved', 'created_at'], name='post_user_visible_idx'),
+            # pending_posts
+            models.Index(fields=['is_approved', 'created_at'], name='post_pending_created_idx'),
+            # Catalogue export (core/export.py): keyset walk over (updated_at, id)
+            models.Index(fields=['is_public', 'is_approved', 'updated_at', 'id'], name='post_visible_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Counters are only written through adjust_counters (F() updates), so a plain save
+        # of an instance loaded earlier must not overwrite them with stale values
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def average_rating(self):
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
+        return None
+
+    @classmethod
+    def adjust_counters(cls, post_id, rating_sum=0, rating_count=0, comment_count=0):
+        """
+        Shift the denormalized counters of a post atomically in the database and refresh its feed ranking.
+        update() skips auto_now, so updated_at is set here: the incremental export (core/export.py) must
+        report the new counters.
+        """
+        cls.objects.filter(pk=post_id).update(
+            rating_sum=F('rating_sum') + rating_sum,
+            rating_count=F('rating_count') + rating_count,
+            comment_count=F('comment_count') + comment_count,
+            updated_at=timezone.now(),
+        )
+        from .ranking import refresh_post
+        post = cls.objects.filter(pk=post_id).first()
+        if post is not None:
+            refresh_post(post)
+
+    @classmethod
+    def adjust_counters_many(cls, deltas, touch=True):
+        """
+        Bulk variant of adjust_counters: {post_id: {'rating_sum': 4, 'rating_count': 1}}
+        is applied to all posts in a single UPDATE. touch=False keeps updated_at, for
+        loaders that write the timestamps of the posts themselves.
+        """
+        if not deltas:
+            return
+        updates = {}
+        for field in cls.COUNTER_FIELDS:
+            whens = [When(pk=post_id, then=Value(delta[field])) for post_id, delta in deltas.items() if delta.get(field)]
+            if whens:
+                updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+        if updates and touch:
+            updates['updated_at'] = timezone.now()
+        if updates:
+            cls.objects.filter(pk__in=list(deltas)).update(**updates)
+        from .ranking import refresh_posts
+        refresh_posts(list(deltas))
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # CommentListView: comments of a post in time order
+            models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.user.username} on {self.post.title}'
@@ -60,9 +164,101 @@ class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     rating = models.IntegerField(choices=RATING_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('post', 'user')  # Vienas vartotojas gali įvertinti postą tik vieną kartą
+        indexes = [
+            # RatingListView: ratings of a post in time order
+            models.Index(fields=['post', 'created_at'], name='rating_post_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} rated {self.post.title}: {self.rating}'
+
+class PostRanking(models.Model):
+    """Precomputed feed scores of a public approved post (see core/ranking.py)"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    # Denormalized from Post so the feed filters are served by the ranking indexes alone
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    type = models.CharField(max_length=10, choices=Post.TYPE_CHOICES)
+    bayesian_score = models.FloatField()
+    hot_score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bayesian_score'], name='ranking_top_idx'),
+            models.Index(fields=['type', 'bayesian_score'], name='ranking_top_type_idx'),
+            models.Index(fields=['section', 'type', 'bayesian_score'], name='ranking_top_section_idx'),
+            models.Index(fields=['hot_score'], name='ranking_hot_idx'),
+            models.Index(fields=['type', 'hot_score'], name='ranking_hot_type_idx'),
+            models.Index(fields=['section', 'type', 'hot_score'], name='ranking_hot_section_idx'),
+        ]
+
+
+class ModerationLease(models.Model):
+    """Time-limited claim of a pending post by one moderator, so admins don't review the same posts"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='moderation_lease')
+    moderator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='moderation_leases')
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['moderator', 'expires_at'], name='lease_moderator_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.moderator.username} reviews {self.post_id} until {self.expires_at}'
+
+
+# ========== Full-text search index (see core/search.py) ==========
+
+class SearchTerm(models.Model):
+    """Vocabulary of the search index with the number of posts containing each term"""
+    term = models.CharField(max_length=64, unique=True)
+    doc_freq = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.term
+
+class SearchDocument(models.Model):
+    """Indexed post with its length in tokens (BM25 length normalisation)"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    length = models.PositiveIntegerField()
+
+class SearchPosting(models.Model):
+    """Inverted index entry: term -> post with its precomputed BM25 term-frequency weight"""
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='postings')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.FloatField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+        indexes = [
+            # Highest-weight postings of a term first (impact-ordered candidate scan)
+            models.Index(fields=['term', '-weight'], name='posting_term_weight_idx'),
+        ]
+
+
+# ========== Stateless JWT authentication (see core/authentication.py) ==========
+
+class ClaimsUser(User):
+    """User built from JWT claims; fields outside the token are loaded on first access"""
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Reading one deferred field (e.g. first_name when a post embeds its author) loads all of them at once
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+class TokenRevocation(models.Model):
+    """Access tokens of the user issued before revoked_at are rejected; no FK so deleted users keep their row"""
+    user_id = models.IntegerField(unique=True)
+    revoked_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f'{self.user.username} rated {self.post.title}: {self.rating}'
\ No newline at end of file
+        return f'user {self.user_id} revoked at {self.revoked_at}'
@@ -0,0 +1,89 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by (created_at, id), with no COUNT(*).
+
+    DRF's cursor holds the boundary created_at only, so each page is a range
+    scan from that timestamp. When several rows share the boundary created_at,
+    the cursor adds an offset to skip the ones already returned. The offset is
+    as large as that tie (usually 0 with microsecond timestamps), never the
+    page number times the page size.
+    """
+    ordering = ('created_at', 'id')
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Default page-number pagination with an opt-in keyset mode.
+
+    ?pagination=cursor switches to CreatedAtCursorPagination; the response
+    then contains opaque `next`/`previous` tokens and no `count`.
+    """
+    cursor_query_param = 'pagination'
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.cursor_query_param) == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': "Set to 'cursor' for keyset pagination (no count, opaque next/previous links).",
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        parameters.append({
+            'name': CreatedAtCursorPagination.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Cursor token taken from a previous next/previous link.',
+            'schema': {'type': 'string'},
+        })
+        return parameters
+
+
+async def apaginate_queryset(paginator, queryset, request, view=None):
+    """
+    PageNumberPagination.paginate_queryset() on the async ORM (COUNT and page
+    query awaited); the paginator then builds its usual response. Cursor mode
+    keeps the sync implementation in a worker thread.
+    """
+    if getattr(paginator, 'cursor_pagination_class', None) and request.query_params.get(paginator.cursor_query_param) == 'cursor':
+        return await sync_to_async(paginator.paginate_queryset)(queryset, request, view)
+
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    page.object_list = [obj async for obj in page.object_list]
+
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.page = page
+    paginator.request = request
+    return list(page)
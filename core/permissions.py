@@ -1,4 +1,16 @@
 from rest_framework import permissions
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def is_admin_request(request):
+    """IsAdminUser check for a plain Django request, with the same authenticators as the API views"""
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return permissions.IsAdminUser().has_permission(drf_request, None)
+    except APIException:
+        return False
 
 
 class IsAdminUser(permissions.BasePermission):
@@ -0,0 +1,130 @@
+"""
+On-demand request profiles (see Trainee/middleware.py RequestProfilerMiddleware).
+
+A profile is either a cProfile dump ('<id>.prof', read back as pstats text)
+or a sampled collapsed-stack file ('<id>.collapsed', one "frame;frame;frame count"
+line per distinct stack, the input format of flamegraph.pl / speedscope).
+Files live in PROFILE_DIR; only the newest PROFILE_MAX_FILES are kept.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+EXTENSIONS = {'cprofile': '.prof', 'sample': '.collapsed'}
+PROFILE_ID_RE = re.compile(r'^[\w-]+$')
+PSTATS_SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'name', 'filename')
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread from a background thread (sys._current_frames)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+
+    def enable(self):
+        self.sampler.start()
+
+    def disable(self):
+        self.stopped.set()
+        self.sampler.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f'{stack} {count}\n')
+
+
+def start_profiler(mode):
+    if mode == 'sample':
+        profiler = SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    else:
+        profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def save_profile(profiler, mode, request):
+    """Write the profile to PROFILE_DIR and return its id"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^\w]+', '-', request.path).strip('-')[:60] or 'root'
+    profile_id = f"{timezone.now():%Y%m%d-%H%M%S}-{request.method.lower()}-{slug}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(settings.PROFILE_DIR, profile_id + EXTENSIONS[mode])
+    if mode == 'sample':
+        profiler.dump(path)
+    else:
+        profiler.dump_stats(path)
+    prune_profiles()
+    return profile_id
+
+
+def list_profiles():
+    """Newest first: [{'id', 'format', 'size', 'created_at'}]"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(settings.PROFILE_DIR):
+        profile_id, extension = os.path.splitext(entry.name)
+        mode = next((mode for mode, ext in EXTENSIONS.items() if ext == extension), None)
+        if mode is None or not entry.is_file():
+            continue
+        stat = entry.stat()
+        profiles.append({'id': profile_id, 'format': mode, 'size': stat.st_size, 'mtime': stat.st_mtime})
+    profiles.sort(key=lambda profile: profile['mtime'], reverse=True)
+    for profile in profiles:
+        profile['created_at'] = datetime.fromtimestamp(profile.pop('mtime'), tz=dt_timezone.utc)
+    return profiles
+
+
+def prune_profiles():
+    for profile in list_profiles()[settings.PROFILE_MAX_FILES:]:
+        try:
+            os.remove(profile_path(profile['id'], profile['format']))
+        except FileNotFoundError:
+            pass
+
+
+def profile_path(profile_id, mode):
+    return os.path.join(settings.PROFILE_DIR, profile_id + EXTENSIONS[mode])
+
+
+def find_profile(profile_id):
+    """(mode, path) of a stored profile, or None; ids never contain path separators"""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    for mode in EXTENSIONS:
+        path = profile_path(profile_id, mode)
+        if os.path.isfile(path):
+            return mode, path
+    return None
+
+
+def pstats_text(path, sort='cumulative', limit=80):
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,124 @@
+"""
+"Top rated" and "trending" feed scores, stored in PostRanking.
+
+- bayesian_score: average rating pulled towards the site-wide mean, so a post
+  with one 5-star rating does not outrank one with hundreds of 4.8s.
+- hot_score: log-scaled engagement plus post age measured from a fixed epoch.
+  Newer posts get a permanently higher baseline instead of older scores
+  decaying, so stored scores never need periodic recomputation.
+
+Rows are refreshed when a post is saved (core/signals.py) and when its
+rating/comment counters change (Post.adjust_counters), and can be rebuilt
+with the rebuild_rankings command.
+"""
+import math
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from .models import Post, PostRanking
+
+# Weight of the site-wide mean, in "virtual ratings"
+PRIOR_WEIGHT = 5
+DEFAULT_PRIOR_MEAN = 3.0
+PRIOR_MEAN_KEY = 'ranking:prior-mean'
+PRIOR_MEAN_TIMEOUT = 600
+
+# Every HOT_DECAY_SECONDS of age is worth one order of magnitude of engagement
+HOT_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HOT_DECAY_SECONDS = 45000
+
+
+def get_prior_mean():
+    mean = cache.get(PRIOR_MEAN_KEY)
+    if mean is None:
+        totals = Post.objects.filter(is_public=True, is_approved=True).aggregate(
+            rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count')
+        )
+        mean = DEFAULT_PRIOR_MEAN
+        if totals['rating_count']:
+            mean = totals['rating_sum'] / totals['rating_count']
+        cache.set(PRIOR_MEAN_KEY, mean, PRIOR_MEAN_TIMEOUT)
+    return mean
+
+
+def bayesian_score(rating_sum, rating_count, prior_mean):
+    return (PRIOR_WEIGHT * prior_mean + rating_sum) / (PRIOR_WEIGHT + rating_count)
+
+
+def hot_score(rating_count, comment_count, created_at):
+    engagement = rating_count + comment_count
+    age = (created_at - HOT_EPOCH).total_seconds()
+    return math.log10(max(engagement, 1)) + age / HOT_DECAY_SECONDS
+
+
+def build_ranking(post, prior_mean):
+    return PostRanking(
+        post_id=post.pk,
+        section_id=post.section_id,
+        type=post.type,
+        bayesian_score=bayesian_score(post.rating_sum, post.rating_count, prior_mean),
+        hot_score=hot_score(post.rating_count, post.comment_count, post.created_at),
+    )
+
+
+def refresh_post(post):
+    """Upsert the ranking row of a post, or drop it once the post is no longer public and approved"""
+    if not (post.is_public and post.is_approved):
+        PostRanking.objects.filter(post_id=post.pk).delete()
+        return
+    ranking = build_ranking(post, get_prior_mean())
+    PostRanking.objects.update_or_create(
+        post_id=post.pk,
+        defaults={
+            'section_id': ranking.section_id,
+            'type': ranking.type,
+            'bayesian_score': ranking.bayesian_score,
+            'hot_score': ranking.hot_score,
+        },
+    )
+
+
+def refresh_posts(post_ids):
+    """Bulk variant of refresh_post: one read, one delete and one upsert for all posts"""
+    posts = Post.objects.filter(pk__in=post_ids).only(
+        'id', 'section_id', 'type', 'is_public', 'is_approved',
+        'rating_sum', 'rating_count', 'comment_count', 'created_at',
+    )
+    visible = [post for post in posts if post.is_public and post.is_approved]
+    PostRanking.objects.filter(post_id__in=post_ids).exclude(post_id__in=[post.pk for post in visible]).delete()
+    if not visible:
+        return
+    prior_mean = get_prior_mean()
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    unique_fields = ['post'] if connection.features.supports_update_conflicts_with_target else None
+    PostRanking.objects.bulk_create(
+        [build_ranking(post, prior_mean) for post in visible],
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['section', 'type', 'bayesian_score', 'hot_score'],
+    )
+
+
+def rebuild_rankings(chunk_size=1000, stdout=None):
+    """Recompute every ranking row from the post counters"""
+    cache.delete(PRIOR_MEAN_KEY)
+    prior_mean = get_prior_mean()
+    PostRanking.objects.all().delete()
+
+    posts = Post.objects.filter(is_public=True, is_approved=True).only(
+        'id', 'section_id', 'type', 'rating_sum', 'rating_count', 'comment_count', 'created_at'
+    )
+    rankings = []
+    total = 0
+    for post in posts.iterator(chunk_size=chunk_size):
+        rankings.append(build_ranking(post, prior_mean))
+        if len(rankings) >= chunk_size:
+            PostRanking.objects.bulk_create(rankings)
+            total += len(rankings)
+            rankings = []
+            if stdout is not None:
+                stdout.write(f'Ranked {total} posts')
+    PostRanking.objects.bulk_create(rankings)
+    return total + len(rankings)
@@ -0,0 +1,149 @@
+"""
+Versioned response cache for anonymous read endpoints.
+
+Every cached response is keyed by URL + query string + the current version of
+each resource it depends on (e.g. 'posts', 'comments:42'). Writes bump the
+versions of the resources they touch (see core/signals.py), so stale entries
+are simply never looked up again and expire on their own.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from .metrics import RESPONSE_CACHE
+from .routers import read_from_primary, recently_written
+
+VERSION_KEY_PREFIX = 'response-version:'
+RESPONSE_KEY_PREFIX = 'response:'
+
+# Headers stored together with the cached body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+# Bumped when data embedded in every response changes (e.g. a user renames themselves)
+GLOBAL_RESOURCE = 'global'
+
+
+def get_versions(resources):
+    """Return {resource: version}, initialising unknown resources"""
+    keys = {VERSION_KEY_PREFIX + resource: resource for resource in resources}
+    found = cache.get_many(keys.keys())
+    versions = {}
+    for key, resource in keys.items():
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        versions[resource] = found[key]
+    return versions
+
+
+async def aget_versions(resources):
+    """get_versions() for the async read views"""
+    keys = {VERSION_KEY_PREFIX + resource: resource for resource in resources}
+    found = await cache.aget_many(keys.keys())
+    versions = {}
+    for key, resource in keys.items():
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            found[key] = await cache.aget(key)
+        versions[resource] = found[key]
+    return versions
+
+
+def bump_versions(*resources):
+    """Invalidate every cached response that depends on any of the resources"""
+    # A fresh timestamp (not incr) so an evicted version never gets reused
+    version = time.time_ns()
+    cache.set_many({VERSION_KEY_PREFIX + resource: version for resource in resources}, timeout=None)
+
+
+def versioned_key(request, versions):
+    raw = request.get_full_path() + '|' + '|'.join(f'{r}={v}' for r, v in sorted(versions.items()))
+    return RESPONSE_KEY_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cached_response(request, cached):
+    RESPONSE_CACHE.labels('hit').inc()
+    content, headers = cached
+    response = HttpResponse(content, headers=headers)
+    response['X-Cache'] = 'HIT'
+    # The stored ETag is valid for as long as the entry itself
+    return get_conditional_response(request, etag=headers.get('ETag'), response=response)
+
+
+def cache_entry(response):
+    """(content, headers) to store for a rendered 200 response"""
+    response.render()
+    response['X-Cache'] = 'MISS'
+    return response.content, {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+
+
+class ResourceVersionsMixin:
+    """
+    Views list the resources their output depends on in `cache_resources`;
+    URL kwargs can be used as placeholders, e.g. 'comments:{post_id}'.
+    GLOBAL_RESOURCE is always included.
+    """
+    cache_resources = ()
+    resource_versions = None
+
+    def get_cache_resources(self, kwargs):
+        return [resource.format(**kwargs) for resource in self.cache_resources]
+
+    def get_resource_versions(self):
+        """Versions for the current request, read once and before any data"""
+        if self.resource_versions is None:
+            self.resource_versions = get_versions([GLOBAL_RESOURCE, *self.get_cache_resources(self.kwargs)])
+        return self.resource_versions
+
+    async def aget_resource_versions(self):
+        """get_resource_versions() for the async read views"""
+        if self.resource_versions is None:
+            self.resource_versions = await aget_versions([GLOBAL_RESOURCE, *self.get_cache_resources(self.kwargs)])
+        return self.resource_versions
+
+
+class CachedResponseMixin(ResourceVersionsMixin):
+    """
+    Serve anonymous GET requests from the cache.
+
+    Requests with an Authorization header always bypass the cache, so the
+    check happens before authentication and never touches the database.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+            return super().dispatch(request, *args, **kwargs)
+
+        versions = self.get_resource_versions()
+        key = versioned_key(request, versions)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached_response(request, cached)
+
+        RESPONSE_CACHE.labels('miss').inc()
+        if recently_written(versions):
+            # A lagging replica would store the pre-write response under the new version
+            read_from_primary()
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, cache_entry(response), settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    async def adispatch(self, request, *args, **kwargs):
+        """dispatch() for the async read views, which only see anonymous GETs"""
+        versions = await self.aget_resource_versions()
+        key = versioned_key(request, versions)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached_response(request, cached)
+
+        RESPONSE_CACHE.labels('miss').inc()
+        if recently_written(versions):
+            read_from_primary()
+        response = await super().adispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, cache_entry(response), settings.RESPONSE_CACHE_TIMEOUT)
+        return response
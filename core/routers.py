@@ -0,0 +1,151 @@
+"""
+Read-replica routing (DATABASE_ROUTERS = ['core.routers.ReplicaRouter']).
+
+Reads of GET/HEAD requests to the API views (core/views.py, core/async_views.py)
+go to one of the DATABASE_REPLICAS aliases; writes and everything else (other
+views, management commands, signals outside a request) use the primary.
+Trainee/middleware.py ReplicaRoutingMiddleware decides per request:
+
+- read-your-writes: a successful write pins the client (user id, or the IP
+  recorded by the trusted proxy when anonymous) to the primary for
+  REPLICA_STICKY_SECONDS. The pin lives in the cache, which must be shared by
+  every worker (system check core.E001, core/checks.py);
+- one replica per request, chosen at random among the healthy ones and connected
+  on the first read. A replica that fails to connect, or raises an
+  OperationalError during a request, is skipped for REPLICA_RETRY_SECONDS and
+  the request reads from the primary instead.
+"""
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+from .throttling import SAFE_METHODS, client_ip, request_user_id
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset(['GET', 'HEAD'])
+ROUTED_MODULES = frozenset(['core.views', 'core.async_views'])
+PIN_KEY_PREFIX = 'replica-pin:'
+
+# alias -> time.monotonic() after which a failed replica is tried again (per process)
+_unhealthy = {}
+_routing = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RequestRouting:
+    """Where the reads of the current request go; the replica is connected lazily"""
+
+    def __init__(self):
+        self.candidates = []
+        self.alias = None
+
+    def read_alias(self):
+        while self.alias is None and self.candidates:
+            alias = self.candidates.pop(random.randrange(len(self.candidates)))
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError:
+                mark_unhealthy(alias)
+                continue
+            self.alias = alias
+        return self.alias or DEFAULT_DB_ALIAS
+
+
+def begin_request():
+    return _routing.set(RequestRouting())
+
+
+def end_request(token):
+    _routing.reset(token)
+
+
+def current_routing():
+    return _routing.get()
+
+
+def route_reads_to_replica(routing):
+    routing.candidates = healthy_replicas()
+
+
+def read_from_primary():
+    """Reads of the rest of the current request go to the primary"""
+    routing = _routing.get()
+    if routing is not None:
+        routing.candidates = []
+        routing.alias = None
+
+
+def reads_from_replica():
+    """True when the reads of the current request may go to a replica"""
+    routing = _routing.get()
+    return routing is not None and (routing.alias is not None or bool(routing.candidates))
+
+
+def healthy_replicas():
+    now = time.monotonic()
+    return [alias for alias in settings.DATABASE_REPLICAS if _unhealthy.get(alias, 0) <= now]
+
+
+def mark_unhealthy(alias):
+    logger.warning('Replica %s unavailable, reading from the primary for %ss', alias, settings.REPLICA_RETRY_SECONDS)
+    _unhealthy[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+def is_routed_view(view_func):
+    # as_view() functions carry their class; @api_view classes take the module of the function
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return view_class.__module__ in ROUTED_MODULES
+
+
+def client_key(request):
+    user_id = request_user_id(request)
+    if user_id is not None:
+        return f'{PIN_KEY_PREFIX}user:{user_id}'
+    return f'{PIN_KEY_PREFIX}ip:{client_ip(request)}'
+
+
+def pin_to_primary(request):
+    cache.set(client_key(request), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(request):
+    return cache.get(client_key(request)) is not None
+
+
+async def apin_to_primary(request):
+    await cache.aset(client_key(request), True, settings.REPLICA_STICKY_SECONDS)
+
+
+async def ais_pinned(request):
+    return await cache.aget(client_key(request)) is not None
+
+
+def recently_written(versions):
+    """True when a response cache version (core/response_cache.py) is younger than the stickiness window"""
+    newest = max(versions.values(), default=0)
+    return time.time_ns() - newest < settings.REPLICA_STICKY_SECONDS * 1_000_000_000
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or (routing.alias is None and not routing.candidates):
+            return None
+        return routing.read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,192 @@
+"""
+BM25 full-text search over public approved posts.
+
+The inverted index lives in SearchTerm / SearchDocument / SearchPosting and is
+kept up to date by post signals (core/signals.py). Each posting stores the
+BM25 term-frequency component computed at index time, so a query only reads
+the highest-weight postings of each query term through one index range scan
+per term and never scans post text.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F
+from .models import Post, SearchDocument, SearchPosting, SearchTerm
+
+K1 = 1.2
+B = 0.75
+
+# Postings read per query term (ordered by weight) and ranked results returned
+CANDIDATES_PER_TERM = 1000
+MAX_RESULTS = 500
+
+# Title words count this many times (simple BM25F-style field boost)
+TITLE_BOOST = 2
+
+CORPUS_STATS_KEY = 'search:corpus-stats'
+CORPUS_STATS_TIMEOUT = 600
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or that the this to was with'.split()
+)
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if 1 < len(token) <= MAX_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def post_term_counts(post):
+    counts = Counter(tokenize(post.title) * TITLE_BOOST)
+    counts.update(tokenize(post.description))
+    counts.update(tokenize(post.recommendations))
+    return counts
+
+
+def is_searchable(post):
+    return post.is_public and post.is_approved
+
+
+def term_weight(tf, length, avg_length):
+    return tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+
+def get_corpus_stats():
+    """(document count, average document length), cached because BM25 tolerates slightly stale values"""
+    stats = cache.get(CORPUS_STATS_KEY)
+    if stats is None:
+        row = SearchDocument.objects.aggregate(count=Count('pk'), avg_length=Avg('length'))
+        stats = (row['count'], row['avg_length'] or 0)
+        cache.set(CORPUS_STATS_KEY, stats, CORPUS_STATS_TIMEOUT)
+    return stats
+
+
+def get_term_ids(terms):
+    """Map terms to SearchTerm ids, creating the missing ones"""
+    term_ids = dict(SearchTerm.objects.filter(term__in=terms).values_list('term', 'id'))
+    missing = [term for term in terms if term not in term_ids]
+    if missing:
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in missing], ignore_conflicts=True)
+        # bulk_create does not return ids on MySQL, so read them back
+        term_ids.update(SearchTerm.objects.filter(term__in=missing).values_list('term', 'id'))
+    return term_ids
+
+
+def remove_post(post_id):
+    term_ids = list(SearchPosting.objects.filter(post_id=post_id).values_list('term_id', flat=True))
+    if term_ids:
+        SearchTerm.objects.filter(pk__in=term_ids).update(doc_freq=F('doc_freq') - 1)
+        SearchPosting.objects.filter(post_id=post_id).delete()
+    SearchDocument.objects.filter(post_id=post_id).delete()
+
+
+def index_post(post):
+    """(Re)index one post; posts that are not public and approved are removed from the index"""
+    remove_post(post.pk)
+    if not is_searchable(post):
+        return
+    counts = post_term_counts(post)
+    if not counts:
+        return
+
+    length = sum(counts.values())
+    _, avg_length = get_corpus_stats()
+    avg_length = avg_length or length
+
+    term_ids = get_term_ids(list(counts))
+    SearchDocument.objects.create(post_id=post.pk, length=length)
+    SearchTerm.objects.filter(pk__in=term_ids.values()).update(doc_freq=F('doc_freq') + 1)
+    SearchPosting.objects.bulk_create([
+        SearchPosting(term_id=term_ids[term], post_id=post.pk, weight=term_weight(tf, length, avg_length))
+        for term, tf in counts.items()
+    ])
+
+
+def search(query, limit=MAX_RESULTS):
+    """Return ids of matching posts ordered by BM25 score (best first)"""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    doc_count, _ = get_corpus_stats()
+    scores = defaultdict(float)
+    for term_id, doc_freq in SearchTerm.objects.filter(term__in=terms, doc_freq__gt=0).values_list('id', 'doc_freq'):
+        idf = math.log(1 + (max(doc_count, doc_freq) - doc_freq + 0.5) / (doc_freq + 0.5))
+        postings = (
+            SearchPosting.objects.filter(term_id=term_id).order_by('-weight')
+            .values_list('post_id', 'weight')[:CANDIDATES_PER_TERM]
+        )
+        for post_id, weight in postings:
+            scores[post_id] += idf * weight
+
+    return sorted(scores, key=lambda post_id: (-scores[post_id], post_id))[:limit]
+
+
+def rebuild_index(chunk_size=1000, stdout=None):
+    """Drop and rebuild the whole index from the public approved posts"""
+    SearchPosting.objects.all().delete()
+    SearchDocument.objects.all().delete()
+    SearchTerm.objects.all().delete()
+    cache.delete(CORPUS_STATS_KEY)
+
+    posts = Post.objects.filter(is_public=True, is_approved=True).only(
+        'id', 'title', 'description', 'recommendations'
+    )
+
+    # Pass 1: document lengths, needed for the average length used in every weight
+    documents = []
+    for post in posts.iterator(chunk_size=chunk_size):
+        length = sum(post_term_counts(post).values())
+        if length:
+            documents.append(SearchDocument(post_id=post.pk, length=length))
+        if len(documents) >= chunk_size:
+            SearchDocument.objects.bulk_create(documents)
+            documents = []
+    SearchDocument.objects.bulk_create(documents)
+    doc_count, avg_length = get_corpus_stats()
+
+    # Pass 2: postings and document frequencies, resolving new terms once per chunk
+    doc_freq = Counter()
+    term_ids = {}
+    pending = []
+    indexed = 0
+
+    def flush():
+        new_terms = {term for _, counts, _ in pending for term in counts if term not in term_ids}
+        if new_terms:
+            term_ids.update(get_term_ids(list(new_terms)))
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(term_id=term_ids[term], post_id=post_id, weight=term_weight(tf, length, avg_length))
+                for post_id, counts, length in pending
+                for term, tf in counts.items()
+            ],
+            batch_size=chunk_size,
+        )
+        pending.clear()
+
+    for post in posts.iterator(chunk_size=chunk_size):
+        counts = post_term_counts(post)
+        if not counts:
+            continue
+        doc_freq.update(counts.keys())
+        pending.append((post.pk, counts, sum(counts.values())))
+        indexed += 1
+        if indexed % chunk_size == 0:
+            flush()
+            if stdout is not None:
+                stdout.write(f'Indexed {indexed}/{doc_count} posts')
+    flush()
+
+    SearchTerm.objects.bulk_update(
+        [SearchTerm(pk=term_ids[term], term=term, doc_freq=count) for term, count in doc_freq.items()],
+        ['doc_freq'],
+        batch_size=chunk_size,
+    )
+    return indexed, len(term_ids)
@@ -13,14 +13,51 @@ class SectionSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.IntegerField)
     def get_post_count(self, obj):
+        # Use the annotated value when the queryset provides one
+        post_count = getattr(obj, 'post_count', None)
+        if post_count is not None:
+            return post_count
         return obj.posts.count()
 
+class SectionOverviewSerializer(serializers.ModelSerializer):
+    """Section with public statistics; expects the annotations of SectionOverviewView"""
+    post_count = serializers.IntegerField(read_only=True)
+    meal_count = serializers.IntegerField(read_only=True)
+    workout_count = serializers.IntegerField(read_only=True)
+    average_rating = serializers.SerializerMethodField()
+    latest_post = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Section
+        fields = ['id', 'name', 'description', 'post_count', 'meal_count', 'workout_count', 'average_rating', 'latest_post']
+    
+    @extend_schema_field(serializers.FloatField(allow_null=True))
+    def get_average_rating(self, obj):
+        # Average over all ratings of the section's posts, not an average of averages
+        if obj.rating_count:
+            return obj.rating_sum / obj.rating_count
+        return None
+    
+    @extend_schema_field(serializers.DictField(allow_null=True))
+    def get_latest_post(self, obj):
+        if obj.latest_post_id is None:
+            return None
+        return {'id': obj.latest_post_id, 'title': obj.latest_post_title}
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
+class UserStatsSerializer(serializers.ModelSerializer):
+    """User with post count; expects the post_count annotation (see core.stats.users_with_post_counts)"""
+    post_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'is_active', 'is_staff', 'post_count']
+
 class UserCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     
@@ -51,8 +88,8 @@ class PostSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
-    average_rating = serializers.SerializerMethodField()
-    comment_count = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
     author_username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
@@ -80,16 +117,12 @@ class PostSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Calories must be between 0 and 10000")
         return value
     
-    @extend_schema_field(serializers.FloatField)
-    def get_average_rating(self, obj):
-        ratings = obj.rating_set.all()
-        if ratings:
-            return sum(rating.rating for rating in ratings) / len(ratings)
-        return None
-    
-    @extend_schema_field(serializers.IntegerField)
-    def get_comment_count(self, obj):
-        return obj.comments.count()
+    def to_representation(self, instance):
+        # Pass the annotated section post count down to the nested SectionSerializer
+        section_post_count = getattr(instance, 'section_post_count', None)
+        if section_post_count is not None and instance.section is not None:
+            instance.section.post_count = section_post_count
+        return super().to_representation(instance)
 
 class CommentSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
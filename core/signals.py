@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .authentication import revoke_user_tokens
+from .models import Post, Comment, Rating, Section
+from .response_cache import bump_versions
+from . import ranking, search
+
+
+def bump_on_commit(*resources):
+    # Bump after commit, otherwise a concurrent reader could re-cache the old rows
+    transaction.on_commit(lambda: bump_versions(*resources))
+
+
+@receiver([post_save, post_delete], sender=Section)
+def section_changed(sender, instance, **kwargs):
+    # Posts embed their section
+    bump_on_commit('sections', 'posts')
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    # Sections show a post count
+    bump_on_commit('posts', 'sections')
+
+
+@receiver(post_save, sender=Post)
+def post_saved_index(sender, instance, **kwargs):
+    # Creating, editing, publishing and approving all go through save()
+    search.index_post(instance)
+    ranking.refresh_post(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleted_search(sender, instance, **kwargs):
+    # Before the cascade removes the postings, so term frequencies can be decremented
+    search.remove_post(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # Posts show a comment count
+    bump_on_commit(f'comments:{instance.post_id}', 'posts')
+
+
+@receiver(post_save, sender=Comment)
+def comment_edited(sender, instance, created, **kwargs):
+    # Exports embed the comments of a post and pick changes up by updated_at (core/export.py);
+    # new and deleted comments move it through Post.adjust_counters
+    if not created:
+        Post.objects.filter(pk=instance.post_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Rating)
+def rating_changed(sender, instance, **kwargs):
+    # Posts show the average rating
+    bump_on_commit(f'ratings:{instance.post_id}', 'posts')
+
+
+# Fields copied into the JWT claims that grant access (core/authentication.py)
+REVOKING_USER_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+
+@receiver(pre_save, sender=User)
+def user_access_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only; QuerySet.update() bypasses this, call revoke_user_tokens() there
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(REVOKING_USER_FIELDS)):
+        return
+    old = User.objects.filter(pk=instance.pk).values(*REVOKING_USER_FIELDS).first()
+    if old and any(old[field] != getattr(instance, field) for field in REVOKING_USER_FIELDS):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -1,3 +1,1652 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from django.urls import clear_url_caches, resolve
+from django.utils.module_loading import import_string
+from importlib import import_module
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from Trainee import db_pool
+from Trainee import settings as base_settings
+from Trainee.middleware import QueryInstrumentationMiddleware
+
+from . import async_views, authentication, checks, export, ranking, response_cache, routers, search, throttling, views
+from . import urls as core_urls
+from .management.commands import benchmark
+from .management.importer import Importer
+from .models import Comment, ModerationLease, Post, PostRanking, Rating, Section, TokenRevocation
+from .serializers import RatingSerializer
+
+REPLICA = 'replica1'
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    Run with --settings=Trainee.settings_test: 'default' and 'replica1' are two
+    SQLite files that do not replicate, so a row written to only one of them
+    shows which database a request read from.
+    """
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        routers._unhealthy.clear()
+        self.user = self.create_user('alice')
+        self.admin = self.create_user('root', is_staff=True)
+        self.client = APIClient()
+
+    def create_user(self, username, **fields):
+        user = User.objects.create_user(username, f'{username}@example.com', 'secret-pass-123', **fields)
+        user.save(using=REPLICA)
+        return user
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def create_post(self, using, title):
+        post = Post(user=self.user, title=title, type='meal', description='-', is_public=True, is_approved=True)
+        if using == REPLICA:
+            # Replicated rows arrive without the app's signals (search index, cache versions)
+            return Post.objects.using(REPLICA).bulk_create([post])[0]
+        post.save(using=using)
+        return post
+
+    def post_via_api(self, title):
+        response = self.client.post('/api/posts/create/', {'title': title, 'type': 'meal', 'description': 'Oats and berries'})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def section_names(self):
+        response = self.client.get('/api/sections/')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        results = results.get('results', results) if isinstance(results, dict) else results
+        return {section['name'] for section in results}
+
+    def test_reads_of_api_views_go_to_the_replica(self):
+        replica_post = self.create_post(REPLICA, 'only on the replica')
+        primary_post = self.create_post('default', 'only on the primary')
+        # Same pk on both files: the title tells which one answered
+        self.assertEqual(replica_post.pk, primary_post.pk)
+
+        response = self.client.get(f'/api/posts/{replica_post.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'only on the replica')
+
+    def test_writes_go_to_the_primary(self):
+        self.authenticate(self.user)
+        post_id = self.post_via_api('new post')
+        self.assertTrue(Post.objects.using('default').filter(pk=post_id).exists())
+        self.assertFalse(Post.objects.using(REPLICA).filter(pk=post_id).exists())
+
+    def test_writer_reads_own_write_from_the_primary(self):
+        self.authenticate(self.user)
+        post_id = self.post_via_api('mine')
+
+        response = self.client.get(f'/api/posts/{post_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'mine')
+
+        # Other clients still read the replica, which has not seen the post
+        other = APIClient()
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        self.assertEqual(other.get(f'/api/posts/{post_id}/').status_code, 404)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self):
+        self.authenticate(self.user)
+        post_id = self.post_via_api('mine')
+        self.assertEqual(self.client.get(f'/api/posts/{post_id}/').status_code, 404)
+
+    def test_failed_write_does_not_pin(self):
+        self.authenticate(self.user)
+        response = self.client.post('/api/posts/create/', {'title': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(routers.is_pinned(response.wsgi_request))
+
+    def test_response_cache_is_filled_from_the_primary_after_a_write(self):
+        Section.objects.using(REPLICA).create(name='Replica section')
+        # Fresh version keys count as recent writes too
+        with self.settings(REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(self.section_names(), {'Replica section'})
+
+        # core/signals.py bumps the 'sections' version; the replica has not caught up yet
+        with self.captureOnCommitCallbacks(execute=True):
+            Section.objects.create(name='Primary section')
+        self.assertEqual(self.section_names(), {'Primary section'})
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        self.create_post(REPLICA, 'replica')
+        post = self.create_post('default', 'primary')
+
+        with mock.patch.object(connections[REPLICA], 'ensure_connection', side_effect=OperationalError('down')):
+            response = self.client.get(f'/api/posts/{post.pk}/')
+        self.assertEqual(response.json()['title'], 'primary')
+        self.assertEqual(routers.healthy_replicas(), [])
+
+        # Skipped until REPLICA_RETRY_SECONDS have passed
+        self.assertEqual(self.client.get(f'/api/posts/{post.pk}/').json()['title'], 'primary')
+        routers._unhealthy.clear()
+        self.assertEqual(self.client.get(f'/api/posts/{post.pk}/').json()['title'], 'replica')
+
+    def test_replica_reads_right_after_a_write_carry_no_etag(self):
+        post = self.create_post(REPLICA, 'replica')
+        self.create_post('default', 'primary')
+        # Fresh version keys count as recent writes: the replica might not have them yet
+        self.assertFalse(self.client.get(f'/api/posts/{post.pk}/').has_header('ETag'))
+        with self.settings(REPLICA_STICKY_SECONDS=0):
+            self.assertTrue(self.client.get(f'/api/posts/{post.pk}/').has_header('ETag'))
+
+    @override_settings(NUM_PROXIES=1)
+    def test_anonymous_pins_follow_the_trusted_proxy_hop(self):
+        factory = RequestFactory()
+        pinned = factory.post('/api/auth/register/', HTTP_X_FORWARDED_FOR='10.0.0.1, 203.0.113.7:50000')
+        routers.pin_to_primary(pinned)
+        # A forged X-Forwarded-For prefix neither escapes nor borrows the pin of the address
+        self.assertTrue(routers.is_pinned(factory.get('/', HTTP_X_FORWARDED_FOR='10.9.9.9, 203.0.113.7:50001')))
+        self.assertFalse(routers.is_pinned(factory.get('/', HTTP_X_FORWARDED_FOR='203.0.113.7, 198.51.100.2:40000')))
+
+    def test_replicas_need_a_shared_cache(self):
+        self.assertEqual(checks.check_replica_cache(None), [])
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=locmem):
+            self.assertEqual([error.id for error in checks.check_replica_cache(None)], ['core.E001'])
+            with self.settings(DATABASE_REPLICAS=[]):
+                self.assertEqual(checks.check_replica_cache(None), [])
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.create_post(REPLICA, 'replica')
+        self.assertFalse(Post.objects.exists())
+
+    def test_instances_read_from_the_replica_are_saved_to_the_primary(self):
+        section = Section(name='Replicated')
+        section.save(using='default')
+        section.save(using=REPLICA)
+        section = Section.objects.using(REPLICA).get(pk=section.pk)
+        section.description = 'changed'
+        section.save()
+        self.assertEqual(Section.objects.using('default').get(pk=section.pk).description, 'changed')
+        self.assertEqual(Section.objects.using(REPLICA).get(pk=section.pk).description, '')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class APITestBase(TestCase):
+    """Single-database API tests; reads are not routed to the replica"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret-pass-123')
+        self.client = APIClient()
+
+    def authenticate(self, user, client=None):
+        (client or self.client).credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def create_post(self, title='Oats', user=None, **fields):
+        fields = {'type': 'meal', 'description': 'Oats and berries', 'is_public': True, 'is_approved': True, **fields}
+        return Post.objects.create(user=user or self.user, title=title, **fields)
+
+
+class PostCounterTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.post = self.create_post()
+        self.authenticate(self.user)
+
+    def assertCounters(self, rating_sum, rating_count, comment_count):
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.rating_sum, self.post.rating_count, self.post.comment_count),
+            (rating_sum, rating_count, comment_count),
+        )
+
+    def test_comment_create_and_delete(self):
+        response = self.client.post(f'/api/posts/{self.post.pk}/comments/create/', {'text': 'Nice recipe'})
+        self.assertEqual(response.status_code, 201)
+        self.client.post(f'/api/posts/{self.post.pk}/comments/create/', {'text': 'Made it again'})
+        self.assertCounters(0, 0, 2)
+
+        self.assertEqual(self.client.delete(f"/api/comments/{response.json()['id']}/delete/").status_code, 204)
+        self.assertCounters(0, 0, 1)
+
+    def test_rating_create_update_and_delete(self):
+        response = self.client.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 4})
+        self.assertEqual(response.status_code, 201)
+        rating_id = response.json()['id']
+        self.assertCounters(4, 1, 0)
+
+        # Rating the same post again replaces the value
+        self.assertEqual(self.client.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 2}).status_code, 200)
+        self.assertCounters(2, 1, 0)
+
+        self.assertEqual(self.client.patch(f'/api/ratings/{rating_id}/update/', {'rating': 5}).status_code, 200)
+        self.assertCounters(5, 1, 0)
+        self.assertEqual(self.client.put(f'/api/ratings/{rating_id}/replace/', {'rating': 3}).status_code, 200)
+        self.assertCounters(3, 1, 0)
+
+        self.assertEqual(self.client.delete(f'/api/ratings/{rating_id}/delete/').status_code, 204)
+        self.assertCounters(0, 0, 0)
+
+    def test_losing_a_delete_race_keeps_the_counters(self):
+        # Both requests loaded the row before either deleted it
+        comment_id = self.client.post(f'/api/posts/{self.post.pk}/comments/create/', {'text': 'Nice recipe'}).json()['id']
+        rating_id = self.client.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 4}).json()['id']
+        stale_comments = [Comment.objects.get(pk=comment_id) for _ in range(2)]
+        stale_ratings = [Rating.objects.get(pk=rating_id) for _ in range(2)]
+        for comment in stale_comments:
+            views.CommentDeleteView().perform_destroy(comment)
+        for rating in stale_ratings:
+            views.RatingDeleteView().perform_destroy(rating)
+        self.assertCounters(0, 0, 0)
+
+    def test_rating_update_from_a_stale_instance(self):
+        rating_id = self.client.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 5}).json()['id']
+        stale = Rating.objects.get(pk=rating_id)
+        # A concurrent request changes the value after this one loaded the rating
+        self.assertEqual(self.client.patch(f'/api/ratings/{rating_id}/update/', {'rating': 2}).status_code, 200)
+        serializer = RatingSerializer(stale, data={'rating': 3}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        views.RatingUpdateView().perform_update(serializer)
+        self.assertCounters(3, 1, 0)
+
+    def test_average_rating_of_several_users(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'secret-pass-123')
+        other = APIClient()
+        self.authenticate(bob, other)
+        self.client.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 5})
+        other.post(f'/api/posts/{self.post.pk}/ratings/create/', {'rating': 2})
+        self.assertCounters(7, 2, 0)
+        self.assertEqual(self.post.average_rating, 3.5)
+
+    def test_create_test_data_keeps_counters_in_step(self):
+        call_command('create_test_data', stdout=io.StringIO())
+        output = io.StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=output)
+        self.assertIn('Found 0 of', output.getvalue())
+
+
+class KeysetPaginationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.posts = [self.create_post(f'Post {index}') for index in range(45)]
+        # Sign in so responses are not served from the anonymous response cache
+        self.authenticate(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('count', body)
+            ids.extend(post['id'] for post in body['results'])
+            url = body['next']
+        return ids
+
+    def test_page_number_pagination_stays_the_default(self):
+        body = self.client.get('/api/posts/public/').json()
+        self.assertEqual(body['count'], 45)
+        self.assertEqual(len(body['results']), 20)
+        self.assertIn('page=2', body['next'])
+        self.assertEqual(len(self.client.get('/api/posts/public/?page=3').json()['results']), 5)
+
+    def test_cursor_walks_every_post_once_in_created_order(self):
+        self.assertEqual(self.walk('/api/posts/public/?pagination=cursor'), [post.pk for post in self.posts])
+
+    def test_cursor_breaks_created_at_ties_by_id(self):
+        Post.objects.update(created_at=self.posts[0].created_at)
+        self.assertEqual(self.walk('/api/posts/public/?pagination=cursor'), [post.pk for post in self.posts])
+
+    def test_cursor_is_stable_when_earlier_rows_are_deleted(self):
+        first = self.client.get('/api/posts/public/?pagination=cursor').json()
+        Post.objects.filter(pk__in=[post['id'] for post in first['results'][:5]]).delete()
+        rest = self.walk(first['next'])
+        # A page number would now skip the five posts that moved up into page 1
+        self.assertEqual(rest, [post.pk for post in self.posts[20:]])
+
+    def test_comment_list_supports_both_modes(self):
+        post = self.posts[0]
+        Comment.objects.bulk_create(Comment(post=post, user=self.user, text=f'Comment {index}') for index in range(25))
+        url = f'/api/posts/{post.pk}/comments/'
+        self.assertEqual(self.client.get(url).json()['count'], 25)
+        cursor_ids = []
+        page = self.client.get(url + '?pagination=cursor').json()
+        cursor_ids += [comment['id'] for comment in page['results']]
+        cursor_ids += [comment['id'] for comment in self.client.get(page['next']).json()['results']]
+        self.assertEqual(cursor_ids, list(Comment.objects.filter(post=post).order_by('created_at', 'id').values_list('pk', flat=True)))
+
+
+class ResponseCacheTests(APITestBase):
+    def get_sections(self):
+        response = self.client.get('/api/sections/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_default_cache_is_shared_between_workers(self):
+        self.assertNotEqual(base_settings.CACHES['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_repeated_anonymous_read_is_served_from_the_cache(self):
+        self.assertEqual(self.get_sections()['X-Cache'], 'MISS')
+        self.assertEqual(self.get_sections()['X-Cache'], 'HIT')
+
+    def test_write_invalidates_the_cached_response(self):
+        self.get_sections()
+        with self.captureOnCommitCallbacks(execute=True):
+            Section.objects.create(name='Mobility')
+        response = self.get_sections()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Mobility', response.content.decode())
+
+    def test_version_bumped_by_another_worker_invalidates_the_cached_response(self):
+        self.get_sections()
+        self.assertEqual(self.get_sections()['X-Cache'], 'HIT')
+        # A cache object of its own, as in a different gunicorn worker process
+        other_worker = caches.create_connection('default')
+        with mock.patch.object(response_cache, 'cache', other_worker):
+            response_cache.bump_versions('sections')
+        self.assertEqual(self.get_sections()['X-Cache'], 'MISS')
+
+
+class ConditionalGetTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.post = self.create_post()
+        self.authenticate(self.user)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_matching_etag_answers_304_without_queries(self):
+        anonymous = APIClient()
+        url = f'/api/posts/{self.post.pk}/'
+        response = anonymous.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            self.assertEqual(anonymous.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_authenticated_read_revalidates(self):
+        url = f'/api/posts/{self.post.pk}/'
+        self.assertEqual(self.revalidate(url, self.client.get(url)['ETag']).status_code, 304)
+
+    def test_anonymous_list_revalidates(self):
+        anonymous = APIClient()
+        etag = anonymous.get('/api/posts/public/')['ETag']
+        self.assertEqual(anonymous.get('/api/posts/public/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_etag_differs_per_user(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'secret-pass-123')
+        etag = self.client.get('/api/posts/')['ETag']
+        self.authenticate(bob)
+        self.assertEqual(self.revalidate('/api/posts/', etag).status_code, 200)
+
+    def test_write_changes_the_etag(self):
+        url = f'/api/posts/{self.post.pk}/comments/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{self.post.pk}/comments/create/', {'text': 'Tried it today'})
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_author_rename_changes_the_etag_of_embedded_data(self):
+        url = f'/api/posts/{self.post.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.patch('/api/users/profile/', {'first_name': 'Alicia'}).status_code, 200)
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['first_name'], 'Alicia')
+
+
+class BatchCreateTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        self.post = self.create_post()
+
+    def batch(self, url, items):
+        return self.client.post(url, items, format='json')
+
+    def version(self, resource):
+        return response_cache.get_versions([resource])[resource]
+
+    def statuses(self, response):
+        return [result['status'] for result in response.json()['results']]
+
+    def test_posts_partial_failure_answers_207(self):
+        section = Section.objects.create(name='Fitness')
+        items = [
+            {'title': 'Morning run', 'type': 'workout', 'description': 'Five easy kilometres', 'section_id': section.pk},
+            {'title': 'x', 'type': 'meal', 'description': 'Too short a title'},
+            {'title': 'Lunch bowl', 'type': 'meal', 'description': 'Rice, beans and greens', 'section_id': 999},
+            'not an object',
+        ]
+        posts_version = self.version('posts')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.batch('/api/posts/batch/', items)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [201, 400, 400, 400])
+        body = response.json()
+        self.assertEqual((body['succeeded'], body['failed']), (1, 3))
+        self.assertIn('title', body['results'][1]['errors'])
+        self.assertIn('section_id', body['results'][2]['errors'])
+        created = Post.objects.get(title='Morning run')
+        self.assertEqual((created.user, created.section, created.is_approved), (self.user, section, False))
+        self.assertNotEqual(self.version('posts'), posts_version)
+
+    def test_all_valid_answers_201_and_all_invalid_400(self):
+        valid = [{'title': f'Plan {index}', 'type': 'meal', 'description': 'Oats, milk and fruit'} for index in range(3)]
+        self.assertEqual(self.batch('/api/posts/batch/', valid).status_code, 201)
+        self.assertEqual(self.batch('/api/posts/batch/', [{'title': ''}, {}]).status_code, 400)
+        self.assertEqual(Post.objects.filter(title__startswith='Plan ').count(), 3)
+
+    def test_malformed_or_oversized_body_is_rejected(self):
+        self.assertEqual(self.batch('/api/posts/batch/', []).status_code, 400)
+        self.assertEqual(self.batch('/api/posts/batch/', {'title': 'Not a list'}).status_code, 400)
+        with self.settings(BATCH_MAX_ITEMS=2):
+            response = self.batch('/api/posts/batch/', [{}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Too many items', response.json()['error'])
+
+    def test_comments_update_the_counter_and_bump_versions(self):
+        comments_version = self.version(f'comments:{self.post.pk}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.batch(f'/api/posts/{self.post.pk}/comments/batch/', [
+                {'text': 'Great recipe'}, {'text': 'no'}, {'text': 'Will try it tomorrow'},
+            ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [201, 400, 201])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 2)
+        self.assertNotEqual(self.version(f'comments:{self.post.pk}'), comments_version)
+
+    def test_ratings_upsert_and_update_the_counters(self):
+        other = self.create_post('Other')
+        Rating.objects.create(post=self.post, user=self.user, rating=1)
+        Post.adjust_counters(self.post.pk, rating_sum=1, rating_count=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.batch('/api/ratings/batch/', [
+                {'post': self.post.pk, 'rating': 4},   # updates the existing rating
+                {'post': other.pk, 'rating': 2},       # superseded by the next item
+                {'post': other.pk, 'rating': 5},
+                {'post': 999, 'rating': 3},
+                {'post': other.pk, 'rating': 9},
+            ])
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], [200, 200, 201, 400, 400])
+        self.assertEqual(results[1]['superseded_by'], 2)
+
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.rating_sum, self.post.rating_count), (4, 1))
+        self.assertEqual((other.rating_sum, other.rating_count), (5, 1))
+        self.assertEqual(Rating.objects.get(post=self.post, user=self.user).rating, 4)
+
+
+class ModerationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.pending = [self.create_post(f'Pending {index}', is_approved=False) for index in range(6)]
+        self.first_admin = User.objects.create_user('root', 'root@example.com', 'secret-pass-123', is_staff=True)
+        self.second_admin = User.objects.create_user('mod', 'mod@example.com', 'secret-pass-123', is_staff=True)
+        self.first = APIClient()
+        self.second = APIClient()
+        self.authenticate(self.first_admin, self.first)
+        self.authenticate(self.second_admin, self.second)
+
+    def claim(self, client, count):
+        response = client.post('/api/admin/moderation/claim/', {'count': count}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.json()['posts']]
+
+    def ids(self, posts):
+        return [post.pk for post in posts]
+
+    def test_claims_return_disjoint_batches_oldest_first(self):
+        first = self.claim(self.first, 4)
+        second = self.claim(self.second, 4)
+        self.assertEqual(first, self.ids(self.pending[:4]))
+        self.assertEqual(second, self.ids(self.pending[4:]))
+        self.assertEqual(self.claim(self.second, 4), [])
+
+        mine = self.first.get('/api/admin/moderation/queue/?claimed=mine').json()['results']
+        self.assertEqual([post['id'] for post in mine], first)
+
+    def test_expired_lease_can_be_claimed_again(self):
+        claimed = self.claim(self.first, 2)
+        ModerationLease.objects.filter(post_id__in=claimed).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.claim(self.second, 2), claimed)
+        self.assertEqual(set(ModerationLease.objects.filter(post_id__in=claimed).values_list('moderator', flat=True)), {self.second_admin.pk})
+
+    def test_bulk_approve_skips_posts_leased_by_others(self):
+        theirs = self.claim(self.second, 2)
+        mine = self.claim(self.first, 1)
+        unclaimed = self.pending[3].pk
+        approved_post = self.create_post('Already approved')
+        ids = theirs + mine + [unclaimed, approved_post.pk]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.first.post('/api/admin/moderation/approve/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(sorted(body['approved']), sorted(mine + [unclaimed]))
+        self.assertEqual(body['leased_by_others'], sorted(theirs))
+        self.assertEqual(body['not_pending'], [approved_post.pk])
+        self.assertFalse(Post.objects.filter(pk__in=theirs, is_approved=True).exists())
+        self.assertFalse(ModerationLease.objects.filter(post_id__in=mine).exists())
+
+    def test_bulk_reject_skips_posts_leased_by_others(self):
+        theirs = self.claim(self.second, 1)
+        ids = theirs + self.ids(self.pending[1:3])
+        response = self.first.post('/api/admin/moderation/reject/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['rejected']), self.ids(self.pending[1:3]))
+        self.assertEqual(response.json()['leased_by_others'], theirs)
+        self.assertTrue(Post.objects.filter(pk__in=theirs).exists())
+        self.assertFalse(Post.objects.filter(pk__in=self.ids(self.pending[1:3])).exists())
+
+    def test_expired_lease_of_another_admin_does_not_block(self):
+        theirs = self.claim(self.second, 1)
+        ModerationLease.objects.filter(post_id__in=theirs).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.first.post('/api/admin/moderation/approve/', {'ids': theirs}, format='json')
+        self.assertEqual(response.json()['approved'], theirs)
+
+    def test_invalid_ids_are_rejected(self):
+        self.assertEqual(self.first.post('/api/admin/moderation/approve/', {'ids': 'all'}, format='json').status_code, 400)
+        with self.settings(MODERATION_MAX_BATCH=2):
+            response = self.first.post('/api/admin/moderation/reject/', {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_moderation_requires_staff(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.post('/api/admin/moderation/claim/', {'count': 1}, format='json').status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class ConcurrentClaimTests(TransactionTestCase):
+    """Needs SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8, PostgreSQL); SQLite serializes writers anyway"""
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_concurrent_claims_get_disjoint_batches(self):
+        author = User.objects.create_user('alice', 'alice@example.com', 'secret-pass-123')
+        for index in range(40):
+            Post.objects.create(user=author, title=f'Pending {index}', type='meal', description='Oats and berries')
+        admins = [User.objects.create_user(f'mod{index}', is_staff=True) for index in range(4)]
+        barrier = threading.Barrier(len(admins))
+        claimed = {}
+
+        def claim(admin):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+            try:
+                barrier.wait()
+                response = client.post('/api/admin/moderation/claim/', {'count': 10}, format='json')
+                claimed[admin.pk] = [post['id'] for post in response.json()['posts']]
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=(admin,)) for admin in admins]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        batches = list(claimed.values())
+        all_ids = [pk for batch in batches for pk in batch]
+        self.assertEqual(len(batches), len(admins))
+        self.assertEqual(len(all_ids), len(set(all_ids)))
+        self.assertEqual(ModerationLease.objects.count(), len(all_ids))
+
+
+class PostCommandTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        section = Section.objects.create(name='Nutrition')
+        self.create_post('In a section', section=section)
+        self.create_post('Without a section', is_public=False, is_approved=False)
+
+    def run_command(self, *args):
+        output = io.StringIO()
+        call_command(*args, stdout=output, stderr=io.StringIO())
+        return output.getvalue()
+
+    def test_check_posts_handles_posts_without_a_section(self):
+        table = self.run_command('check_posts')
+        self.assertIn('(none)', table)
+        self.assertIn('Nutrition', table)
+
+        rows = [json.loads(line) for line in self.run_command('check_posts', '--format', 'jsonl').splitlines()]
+        self.assertEqual({row['title']: row['section'] for row in rows}, {'In a section': 'Nutrition', 'Without a section': None})
+
+        csv_lines = self.run_command('check_posts', '--format', 'csv').splitlines()
+        self.assertEqual(len(csv_lines), 3)
+
+    def test_fix_posts_lists_and_publishes_posts_without_a_section(self):
+        self.assertIn('Without a section', self.run_command('fix_posts', '--format', 'csv'))
+        self.run_command('fix_posts', '--make-public')
+        self.assertTrue(Post.objects.get(title='Without a section').is_public)
+
+
+class MetricsAccessTests(APITestBase):
+    def test_metrics_are_staff_only_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.authenticate(User.objects.create_user('root', is_staff=True))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'trainee_http_requests_total', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_configured_token_is_required(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+
+
+class TokenRevocationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        # Every test starts with an empty in-process revocation filter
+        patcher = mock.patch.object(authentication, 'revocations', authentication.RevocationFilter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = User.objects.create_user('root', 'root@example.com', 'secret-pass-123', is_staff=True)
+
+    def login(self, username):
+        response = self.client.post('/api/auth/login/', {'username': username, 'password': 'secret-pass-123'})
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        return client
+
+    def test_claims_token_authenticates_without_loading_the_user(self):
+        client = self.login('alice')
+        client.get('/api/users/')  # first request loads the revocation filter
+        with self.assertNumQueries(2):  # COUNT and page of the user list
+            self.assertEqual(client.get('/api/users/').status_code, 200)
+
+    def test_deactivation_revokes_issued_tokens(self):
+        client = self.login('alice')
+        self.assertEqual(client.get('/api/users/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = client.get('/api/users/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deletion_revokes_issued_tokens(self):
+        client = self.login('alice')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(client.get('/api/users/').status_code, 401)
+
+    def test_losing_staff_revokes_admin_tokens(self):
+        client = self.login('root')
+        self.assertEqual(client.get('/api/admin/pending-users/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_staff = False
+            self.admin.save()
+        self.assertEqual(client.get('/api/admin/pending-users/').status_code, 401)
+
+    def test_other_workers_pick_up_revocations_from_the_database(self):
+        client = self.login('alice')
+        client.get('/api/users/')
+        # Revoked by another process: only the TokenRevocation row exists here
+        TokenRevocation.objects.create(user_id=self.user.pk, revoked_at=timezone.now())
+        self.assertEqual(client.get('/api/users/').status_code, 200)
+        authentication.revocations.loaded_at -= settings.JWT_REVOCATION_REFRESH_SECONDS
+        self.assertEqual(client.get('/api/users/').status_code, 401)
+
+    def test_tokens_issued_after_the_revocation_work(self):
+        TokenRevocation.objects.create(user_id=self.user.pk, revoked_at=timezone.now() - timedelta(seconds=5))
+        self.assertEqual(self.login('alice').get('/api/users/').status_code, 200)
+
+    def test_saving_unrelated_fields_does_not_revoke(self):
+        client = self.login('alice')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Alicia'
+            self.user.save()
+        self.assertEqual(client.get('/api/users/').status_code, 200)
+        self.assertFalse(TokenRevocation.objects.exists())
+
+
+@override_settings(
+    THROTTLE_ENABLED=True, NUM_PROXIES=1,
+    THROTTLE_RATES={'login': '3/minute', 'post': '2/minute', 'write': '100/minute', 'register': '', 'refresh': ''},
+)
+class ThrottleTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(throttling, 'store', throttling.SlidingWindowStore(os.path.join(directory.name, 'throttle.sqlite3')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, forwarded_for):
+        return self.client.post(
+            '/api/auth/login/', {'username': 'alice', 'password': 'wrong'}, HTTP_X_FORWARDED_FOR=forwarded_for,
+        )
+
+    def test_login_is_limited_per_ip(self):
+        for attempt in range(3):
+            self.assertEqual(self.login('203.0.113.7:50000').status_code, 401)
+        response = self.login('203.0.113.7:50001')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(response.json()['message'], 'Too many requests')
+        # Another client has a bucket of its own
+        self.assertEqual(self.login('198.51.100.2:40000').status_code, 401)
+
+    def test_spoofed_forwarded_for_does_not_reset_the_limit(self):
+        # The client sends its own X-Forwarded-For; the proxy appends the real address
+        for attempt in range(3):
+            self.assertEqual(self.login(f'10.0.0.{attempt}, 203.0.113.7:5000{attempt}').status_code, 401)
+        self.assertEqual(self.login('10.9.9.9, 203.0.113.7:50009').status_code, 429)
+
+    def test_client_ip(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7:443')
+        self.assertEqual(throttling.client_ip(request), '203.0.113.7')
+        with self.settings(NUM_PROXIES=2):
+            self.assertEqual(throttling.client_ip(request), '1.1.1.1')
+        with self.settings(NUM_PROXIES=0):
+            self.assertEqual(throttling.client_ip(request), '10.0.0.1')
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='[2001:db8::1]:443')
+        self.assertEqual(throttling.client_ip(request), '2001:db8::1')
+
+    def test_post_creation_is_limited_per_user(self):
+        self.authenticate(self.user)
+        data = {'title': 'Oats', 'type': 'meal', 'description': 'Oats and berries'}
+        statuses = [self.client.post('/api/posts/create/', data, HTTP_X_FORWARDED_FOR=f'203.0.113.{n}').status_code for n in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+
+        other = APIClient()
+        self.authenticate(User.objects.create_user('bob', 'bob@example.com', 'secret-pass-123'), other)
+        self.assertEqual(other.post('/api/posts/create/', data).status_code, 201)
+
+    async def test_login_is_limited_under_asgi(self):
+        client = AsyncClient()
+        statuses = [
+            (await client.post(
+                '/api/auth/login/', {'username': 'alice', 'password': 'wrong'}, content_type='application/json',
+                headers={'X-Forwarded-For': '203.0.113.7'},
+            )).status_code
+            for attempt in range(4)
+        ]
+        self.assertEqual(statuses, [401, 401, 401, 429])
+
+    @override_settings(THROTTLE_RATES={'post': '5/minute', 'comment': '5/minute', 'write': '100/minute'})
+    def test_batch_items_count_against_the_limit(self):
+        self.authenticate(self.user)
+        items = [{'title': f'Plan {index}', 'type': 'meal', 'description': 'Oats and berries'} for index in range(3)]
+        self.assertEqual(self.client.post('/api/posts/batch/', items, format='json').status_code, 201)
+        # 3 of 5 used: a second batch of 3 does not fit and is not inserted
+        response = self.client.post('/api/posts/batch/', items, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(Post.objects.filter(title__startswith='Plan ').count(), 3)
+        # The rejected batch was taken back (only its request hit stays): one more item still fits
+        self.assertEqual(self.client.post('/api/posts/batch/', items[:1], format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/posts/batch/', items[:1], format='json').status_code, 429)
+
+        post = self.create_post()
+        comments = [{'text': f'Comment number {index}'} for index in range(6)]
+        self.assertEqual(self.client.post(f'/api/posts/{post.pk}/comments/batch/', comments, format='json').status_code, 429)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reads_are_not_throttled(self):
+        for attempt in range(5):
+            self.assertEqual(self.client.get('/api/posts/public/').status_code, 200)
+
+    def test_sliding_window_estimate(self):
+        store = throttling.store
+        with mock.patch('core.throttling.time.time', return_value=120.0):
+            self.assertEqual([store.hit('k', 2, 60) for _ in range(2)], [0, 0])
+            self.assertGreater(store.hit('k', 2, 60), 0)
+        # Half-way through the next window the three hits of the previous one still count 1.5
+        with mock.patch('core.throttling.time.time', return_value=210.0):
+            self.assertGreater(store.hit('k', 2, 60), 0)
+        # A window later they have decayed completely
+        with mock.patch('core.throttling.time.time', return_value=300.0):
+            self.assertEqual(store.hit('k', 2, 60), 0)
+
+
+class AsyncMiddlewareTests(APITestBase):
+    def test_project_middleware_runs_natively_under_asgi(self):
+        async def get_response(request):
+            return None
+
+        for path in settings.MIDDLEWARE:
+            if not path.startswith('Trainee.'):
+                continue
+            middleware = import_string(path)(get_response)
+            self.assertTrue(iscoroutinefunction(middleware), path)
+            if hasattr(middleware, 'process_view'):
+                self.assertTrue(iscoroutinefunction(middleware.process_view), path)
+
+    async def test_queries_in_orm_threads_are_counted(self):
+        # Sync views run in a thread under ASGI, with a connection of that thread
+        await Post.objects.acreate(user=self.user, title='Oats', type='meal', description='Oats', is_public=True, is_approved=True)
+        response = await AsyncClient().get('/api/posts/public/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class InstrumentationTests(APITestBase):
+    SERVER_TIMING_RE = r'^db;dur=\d+\.\d;desc="(\d+) queries", serialize;dur=\d+\.\d, total;dur=\d+\.\d$'
+
+    def setUp(self):
+        super().setUp()
+        self.create_post()
+        self.admin = User.objects.create_user('root', 'root@example.com', 'secret-pass-123', is_staff=True)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profile_dir = self.settings(PROFILE_DIR=directory.name)
+        profile_dir.enable()
+        self.addCleanup(profile_dir.disable)
+
+    def run_middleware(self, view):
+        middleware = QueryInstrumentationMiddleware(lambda request: view())
+        request = RequestFactory().get('/api/posts/public/')
+        middleware.mark_view_started(request)
+        return middleware(request)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/posts/public/')
+        self.assertRegex(response['Server-Timing'], self.SERVER_TIMING_RE)
+        self.assertGreater(int(re.match(self.SERVER_TIMING_RE, response['Server-Timing']).group(1)), 0)
+
+        with self.settings(SERVER_TIMING_HEADER=False):
+            self.assertFalse(self.client.get('/api/posts/public/').has_header('Server-Timing'))
+
+    @override_settings(N_PLUS_ONE_THRESHOLD=3)
+    def test_repeated_sql_is_logged_as_n_plus_one(self):
+        def view():
+            for post_id in range(3):
+                Post.objects.filter(pk=post_id).exists()
+            return HttpResponse()
+
+        with self.assertLogs('Trainee.middleware', 'WARNING') as logs:
+            response = self.run_middleware(view)
+        self.assertRegex(response['Server-Timing'], self.SERVER_TIMING_RE)
+        self.assertRegex(logs.output[0], r'GET /api/posts/public/ .*queries=3')
+        self.assertRegex(logs.output[0], r'N\+1 suspect: 3x [\d.]+ms SELECT')
+
+    def test_fast_distinct_queries_are_not_logged(self):
+        def view():
+            Post.objects.exists()
+            User.objects.exists()
+            return HttpResponse()
+
+        with self.assertNoLogs('Trainee.middleware', 'WARNING'):
+            self.run_middleware(view)
+
+    def test_staff_profile_can_be_fetched(self):
+        self.authenticate(self.admin)
+        response = self.client.get('/api/posts/public/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        listed = self.client.get('/api/admin/profiles/').json()
+        self.assertEqual([(profile['id'], profile['format']) for profile in listed], [(profile_id, 'cprofile')])
+        report = self.client.get(f'/api/admin/profiles/{profile_id}/')
+        self.assertEqual(report.status_code, 200)
+        self.assertIn('function calls', report.content.decode())
+        self.assertEqual(self.client.get('/api/admin/profiles/missing/').status_code, 404)
+
+    def test_profile_flag_is_ignored_for_other_users(self):
+        self.authenticate(self.user)
+        response = self.client.get('/api/posts/public/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertFalse(os.listdir(settings.PROFILE_DIR))
+
+
+def reload_urlconf():
+    # read_view() picks the sync or async view when core/urls.py is imported
+    importlib.reload(core_urls)
+    importlib.reload(import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsyncReadViewTests(APITestBase):
+    """The async read views answer exactly like the DRF views they extend"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered first so it runs after the settings override is undone
+        cls.addClassCleanup(reload_urlconf)
+        super().setUpClass()
+        reload_urlconf()
+
+    def setUp(self):
+        super().setUp()
+        self.section = Section.objects.create(name='Nutrition')
+        self.posts = [self.create_post(f'Post {index}', section=self.section) for index in range(25)]
+        self.post = self.posts[0]
+        Comment.objects.create(post=self.post, user=self.user, text='Nice')
+        Rating.objects.create(post=self.post, user=self.user, rating=4)
+
+    def get_async(self, url, headers=None):
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def get_sync(self, url, headers=None):
+        match = resolve(url.split('?')[0])
+        sync_view = {async_view: view for view, async_view in async_views.ASYNC_VIEWS.items()}[match.func.cls]
+        response = sync_view.as_view()(RequestFactory().get(url, headers=headers), *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def assertSameResponse(self, url):
+        cache.clear()
+        async_response = self.get_async(url)
+        cache.clear()
+        sync_response = self.get_sync(url)
+        self.assertEqual(async_response.status_code, sync_response.status_code, url)
+        self.assertEqual(async_response.json(), json.loads(sync_response.content), url)
+        return async_response
+
+    def test_read_routes_are_async(self):
+        for url in ('/api/sections/', '/api/posts/public/', f'/api/posts/{self.post.pk}/'):
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    def test_page_number_pagination(self):
+        self.assertEqual(self.assertSameResponse('/api/posts/public/').json()['count'], 25)
+        self.assertEqual(len(self.assertSameResponse('/api/posts/public/?page=2').json()['results']), 5)
+        self.assertSameResponse(f'/api/sections/{self.section.pk}/posts/?page_size=5')
+        self.assertSameResponse('/api/sections/')
+
+    def test_cursor_pagination(self):
+        first = self.assertSameResponse('/api/posts/public/?pagination=cursor').json()
+        self.assertNotIn('count', first)
+        second = self.assertSameResponse(first['next'].replace('http://testserver', '')).json()
+        self.assertEqual((len(first['results']), len(second['results'])), (20, 5))
+        self.assertFalse({post['id'] for post in first['results']} & {post['id'] for post in second['results']})
+
+    def test_invalid_page_is_404(self):
+        self.assertEqual(self.assertSameResponse('/api/posts/public/?page=9').status_code, 404)
+        self.assertEqual(self.assertSameResponse('/api/posts/public/?page=last-but-one').status_code, 404)
+
+    def test_detail_and_nested_lists(self):
+        self.assertEqual(self.assertSameResponse(f'/api/posts/{self.post.pk}/').json()['title'], 'Post 0')
+        self.assertSameResponse(f'/api/sections/{self.section.pk}/posts/{self.post.pk}/')
+        self.assertEqual(len(self.assertSameResponse(f'/api/posts/{self.post.pk}/comments/').json()['results']), 1)
+        self.assertEqual(len(self.assertSameResponse(f'/api/posts/{self.post.pk}/ratings/').json()['results']), 1)
+
+    def test_missing_post_is_404(self):
+        self.assertEqual(self.assertSameResponse('/api/posts/999999/').status_code, 404)
+        self.assertEqual(self.assertSameResponse(f'/api/posts/{self.post.pk}/comments/?page=9').status_code, 404)
+
+    def test_second_request_is_served_from_the_cache(self):
+        cache.clear()
+        first = self.get_async('/api/posts/public/')
+        second = self.get_async('/api/posts/public/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_matching_etag_is_304(self):
+        # From a cached list entry and from the detail view, which renders every time
+        for url in ('/api/posts/public/', f'/api/posts/{self.post.pk}/'):
+            etag = self.get_sync(url)['ETag']
+            self.assertEqual(self.get_async(url, headers={'If-None-Match': etag}).status_code, 304, url)
+            self.assertEqual(self.get_async(url, headers={'If-None-Match': '"stale"'}).status_code, 200, url)
+
+    def test_authenticated_reads_use_the_drf_view(self):
+        draft = self.create_post('Draft', is_public=False)
+        token = f'Bearer {AccessToken.for_user(self.user)}'
+        response = self.get_async(f'/api/posts/{draft.pk}/', headers={'Authorization': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Draft')
+
+
+class ExportTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.section = Section.objects.create(name='Nutrition')
+        self.posts = [self.create_post(f'Plan {index}', section=self.section if index % 2 else None) for index in range(7)]
+        self.create_post('Private', is_public=False)
+        self.create_post('Pending', is_approved=False)
+        # Five posts share one updated_at, so chunks end in the middle of a tie
+        self.moment = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[1:6]]).update(updated_at=self.moment)
+        Post.objects.filter(pk=self.posts[0].pk).update(updated_at=self.moment - timedelta(hours=1))
+
+    def ids(self, chunks):
+        return [row['id'] for rows in chunks for row in rows]
+
+    def export(self, **params):
+        response = self.client.get('/api/posts/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_chunks_split_equal_updated_at_without_gaps_or_repeats(self):
+        until = timezone.now()
+        expected = self.ids(export.iter_post_chunks(None, until, chunk_size=100))
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(expected[0], self.posts[0].pk)
+        self.assertEqual(expected[1:6], sorted(post.pk for post in self.posts[1:6]))
+        for chunk_size in (1, 2, 3):
+            chunks = list(export.iter_post_chunks(None, until, chunk_size=chunk_size))
+            self.assertEqual(self.ids(chunks), expected, chunk_size)
+            self.assertTrue(all(len(rows) <= chunk_size for rows in chunks))
+
+    def test_since_and_until_bound_the_export(self):
+        rows = self.ids(export.iter_post_chunks(self.moment, timezone.now(), chunk_size=2))
+        self.assertEqual(sorted(rows), sorted(post.pk for post in self.posts[1:]))
+        self.assertEqual(self.ids(export.iter_post_chunks(None, self.moment, chunk_size=2)), [self.posts[0].pk])
+
+    def test_ndjson_export_and_incremental_follow_up(self):
+        Comment.objects.create(post=self.posts[1], user=self.user, text='Tasty and filling')
+        response, body = self.export(comments='1')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['section_name'], None)
+        by_id = {row['id']: row for row in rows}
+        self.assertEqual([comment['text'] for comment in by_id[self.posts[1].pk]['comments']], ['Tasty and filling'])
+
+        # Passing X-Export-Until back as since returns only what changed afterwards
+        since = response['X-Export-Until']
+        self.assertEqual(self.export(since=since)[1], '')
+        self.posts[2].title = 'Plan 2 revised'
+        self.posts[2].save()
+        rows = [json.loads(line) for line in self.export(since=since)[1].splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Plan 2 revised'])
+
+    def test_ratings_and_comments_reach_the_incremental_export(self):
+        since = self.export()[0]['X-Export-Until']
+        self.authenticate(User.objects.create_user('bob', 'bob@example.com', 'secret-pass-123'))
+        self.assertEqual(self.client.post(f'/api/posts/{self.posts[1].pk}/ratings/create/', {'rating': 4}).status_code, 201)
+        self.assertEqual(
+            self.client.post(f'/api/posts/{self.posts[3].pk}/comments/create/', {'text': 'Tasty and filling'}).status_code, 201,
+        )
+        rows = {row['id']: row for row in map(json.loads, self.export(since=since, comments='1')[1].splitlines())}
+        self.assertEqual(set(rows), {self.posts[1].pk, self.posts[3].pk})
+        self.assertEqual((rows[self.posts[1].pk]['rating_count'], rows[self.posts[1].pk]['average_rating']), (1, 4.0))
+        self.assertEqual([comment['text'] for comment in rows[self.posts[3].pk]['comments']], ['Tasty and filling'])
+
+        # Editing a comment changes the embedded text
+        since = self.export()[0]['X-Export-Until']
+        comment = Comment.objects.get(post=self.posts[3])
+        comment.text = 'Tasty, filling and cheap'
+        comment.save()
+        rows = [json.loads(line) for line in self.export(since=since, comments='1')[1].splitlines()]
+        self.assertEqual([row['comments'][0]['text'] for row in rows], ['Tasty, filling and cheap'])
+
+    def test_csv_export(self):
+        response, body = self.export(output='csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        lines = body.splitlines()
+        self.assertEqual(lines[0].split(','), list(export.POST_FIELDS))
+        self.assertEqual(len(lines), 8)
+
+    def test_invalid_parameters(self):
+        for params in ({'output': 'xml'}, {'output': 'csv', 'comments': '1'}, {'since': 'yesterday'}):
+            self.assertEqual(self.client.get('/api/posts/export/', params).status_code, 400, params)
+
+    def test_export_data_command_matches_the_endpoint(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'posts.ndjson')
+        call_command('export_data', '--chunk-size', '2', '--output', path, stderr=io.StringIO())
+        with open(path, encoding='utf-8') as exported:
+            self.assertEqual(exported.read(), self.export()[1])
+
+
+class ImportTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.tom = User.objects.create_user('tom', 'tom@example.com', 'secret-pass-123')
+        self.existing = self.create_post('Existing')
+        Rating.objects.create(post=self.existing, user=self.tom, rating=4)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source = os.path.join(self.directory, 'import.ndjson')
+        self.rejects = os.path.join(self.directory, 'rejects.ndjson')
+        self.checkpoint = os.path.join(self.directory, 'checkpoint.sqlite3')
+
+    def write_source(self, records):
+        with open(self.source, 'w', encoding='utf-8') as source:
+            source.writelines(json.dumps(record) + '\n' for record in records)
+
+    def post_record(self, ref, **fields):
+        return {'ref': ref, 'author': 'alice', 'title': f'Imported {ref}', 'type': 'meal',
+                'description': 'Oats and berries', 'is_public': True, 'is_approved': True, **fields}
+
+    def import_data(self, *args):
+        output = io.StringIO()
+        call_command('import_data', self.source, '--rejects', self.rejects, '--skip-index', *args, stdout=output)
+        return output.getvalue()
+
+    def rejected(self):
+        with open(self.rejects, encoding='utf-8') as rejects:
+            return [json.loads(line) for line in rejects]
+
+    def test_duplicate_ratings_are_rejected(self):
+        self.write_source([
+            self.post_record(
+                'p1', updated_at='2024-01-02T03:04:05Z', ratings=[{'author': 'tom', 'rating': 3}, {'author': 'tom', 'rating': 2}],
+            ),
+            {'record': 'rating', 'post': 'p1', 'author': 'alice', 'rating': 5},
+            {'record': 'rating', 'post': 'p1', 'author': 'alice', 'rating': 1},
+            {'record': 'rating', 'post_id': self.existing.pk, 'author': 'tom', 'rating': 1},
+        ])
+        self.import_data()
+        post = Post.objects.get(title='Imported p1')
+        self.assertEqual(
+            sorted(Rating.objects.filter(post=post).values_list('user__username', 'rating')), [('alice', 5), ('tom', 3)],
+        )
+        self.assertEqual((post.rating_sum, post.rating_count), (8, 2))
+        # Counting the imported ratings keeps the imported timestamp
+        self.assertEqual(post.updated_at.isoformat(), '2024-01-02T03:04:05+00:00')
+        self.assertEqual(Rating.objects.get(post=self.existing).rating, 4)
+        rejected = self.rejected()
+        self.assertEqual([(entry['line'], entry.get('path')) for entry in rejected], [(1, 'ratings[1]'), (3, None), (4, None)])
+        self.assertTrue(all(entry['errors'] == {'non_field_errors': ['The user already rated this post.']} for entry in rejected))
+        self.assertEqual(
+            [entry['source'] for entry in rejected],
+            [
+                {'author': 'tom', 'rating': 2},
+                {'record': 'rating', 'post': 'p1', 'author': 'alice', 'rating': 1},
+                {'record': 'rating', 'post_id': self.existing.pk, 'author': 'tom', 'rating': 1},
+            ],
+        )
+
+    def test_interrupted_import_resumes_from_the_checkpoint(self):
+        self.write_source([
+            self.post_record('p1'),
+            self.post_record('p2'),
+            {'record': 'comment', 'post': 'p1', 'author': 'tom', 'text': 'Tasty and filling'},
+            {'record': 'rating', 'post': 'p2', 'author': 'tom', 'rating': 5},
+            self.post_record('p3', comments=[{'author': 'tom', 'text': 'Great for mornings'}]),
+            {'record': 'comment', 'post': 'p3', 'author': 'alice', 'text': 'Thanks, enjoy'},
+        ])
+        write_batch = Importer.write_batch
+        calls = []
+
+        def fail_second_batch(importer, records, rejects):
+            calls.append(records)
+            if len(calls) == 2:
+                raise OperationalError('connection lost')
+            return write_batch(importer, records, rejects)
+
+        with mock.patch.object(Importer, 'write_batch', autospec=True, side_effect=fail_second_batch):
+            with self.assertRaises(OperationalError):
+                self.import_data('--batch-size', '2', '--checkpoint', self.checkpoint)
+        self.assertEqual(Post.objects.filter(title__startswith='Imported').count(), 2)
+
+        output = self.import_data('--batch-size', '2', '--checkpoint', self.checkpoint)
+        self.assertIn('Resuming after line 2 (2 posts, 0 comments, 0 ratings, 0 rejected so far)', output)
+        self.assertIn('3 posts, 3 comments, 1 ratings, 0 rejected', output)
+        # Refs of the first run's posts came back from the checkpoint
+        posts = {post.title: post for post in Post.objects.filter(title__startswith='Imported')}
+        self.assertEqual(sorted(posts), ['Imported p1', 'Imported p2', 'Imported p3'])
+        self.assertEqual([comment.text for comment in Comment.objects.filter(post=posts['Imported p1'])], ['Tasty and filling'])
+        self.assertEqual(posts['Imported p2'].rating_sum, 5)
+        self.assertEqual(posts['Imported p3'].comment_count, 2)
+        self.assertEqual(self.rejected(), [])
+
+        # Finished: running it again imports nothing
+        self.import_data('--batch-size', '2', '--checkpoint', self.checkpoint)
+        self.assertEqual(Post.objects.filter(title__startswith='Imported').count(), 3)
+
+    def test_checkpoint_of_another_file_is_refused(self):
+        self.write_source([self.post_record('p1')])
+        self.import_data('--checkpoint', self.checkpoint)
+        other = os.path.join(self.directory, 'other.ndjson')
+        with open(other, 'w', encoding='utf-8') as source:
+            source.write(json.dumps(self.post_record('p2')) + '\n')
+        with self.assertRaisesMessage(CommandError, 'belongs to'):
+            call_command('import_data', other, '--checkpoint', self.checkpoint, stdout=io.StringIO())
+
+
+class RankingTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.nutrition = Section.objects.create(name='Nutrition')
+        self.fitness = Section.objects.create(name='Fitness')
+        self.raters = [User.objects.create_user(f'rater{index}', f'rater{index}@example.com', 'secret-pass-123') for index in range(4)]
+        self.popular = self.create_post('Popular', section=self.nutrition)
+        self.lucky = self.create_post('Lucky', section=self.nutrition)
+        self.workout = self.create_post('Workout', type='workout', section=self.fitness)
+        for rater in self.raters:
+            self.rate(self.popular, rater, 5)
+        self.rate(self.lucky, self.raters[0], 5)
+        self.rate(self.workout, self.raters[0], 1)
+
+    def rate(self, post, user, value):
+        client = APIClient()
+        self.authenticate(user, client)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/posts/{post.pk}/ratings/create/', {'rating': value})
+        self.assertIn(response.status_code, (200, 201))
+
+    def titles(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [post['title'] for post in response.json()['results']]
+
+    def test_top_ranks_many_good_ratings_above_one_perfect_rating(self):
+        self.assertEqual(self.titles('/api/posts/top/'), ['Popular', 'Lucky', 'Workout'])
+
+    def test_trending_prefers_engagement_and_recency(self):
+        # Most engagement first, then the newest of equally engaged posts
+        self.assertEqual(self.titles('/api/posts/trending/'), ['Popular', 'Workout', 'Lucky'])
+        Post.objects.filter(pk=self.popular.pk).update(created_at=timezone.now() - timedelta(days=30))
+        call_command('rebuild_rankings', stdout=io.StringIO())
+        cache.clear()
+        self.assertEqual(self.titles('/api/posts/trending/')[-1], 'Popular')
+
+    def test_section_and_type_filters(self):
+        self.assertEqual(self.titles('/api/posts/top/', section=self.fitness.pk), ['Workout'])
+        self.assertEqual(self.titles('/api/posts/trending/', type='meal'), ['Popular', 'Lucky'])
+        self.assertEqual(self.titles('/api/posts/top/', section=self.nutrition.pk, type='workout'), [])
+        for url in ('/api/posts/top/', '/api/posts/trending/'):
+            for params in ({'section': 'abc'}, {'section': '-1'}, {'type': 'snack'}):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400, (url, params))
+                self.assertIn('error', response.json())
+
+    def test_ratings_and_comments_refresh_the_ranking(self):
+        before = PostRanking.objects.get(post=self.lucky)
+        for rater in self.raters[1:]:
+            self.rate(self.lucky, rater, 5)
+        after = PostRanking.objects.get(post=self.lucky)
+        self.assertGreater(after.bayesian_score, before.bayesian_score)
+        self.assertGreater(after.hot_score, before.hot_score)
+
+        self.authenticate(self.user)
+        self.client.post(f'/api/posts/{self.workout.pk}/comments/create/', {'text': 'Hard but good'})
+        self.assertGreater(PostRanking.objects.get(post=self.workout).hot_score, ranking.hot_score(1, 0, self.workout.created_at))
+
+    def test_hidden_posts_leave_the_ranking(self):
+        self.lucky.is_public = False
+        self.lucky.save()
+        self.assertFalse(PostRanking.objects.filter(post=self.lucky).exists())
+
+    def test_rebuild_rankings_restores_every_visible_post(self):
+        self.create_post('Private', is_public=False)
+        PostRanking.objects.all().delete()
+        call_command('rebuild_rankings', '--chunk-size', '2', stdout=io.StringIO())
+        rebuilt = dict(PostRanking.objects.values_list('post_id', 'bayesian_score'))
+        self.assertEqual(set(rebuilt), {self.popular.pk, self.lucky.pk, self.workout.pk})
+        # The rebuild uses the current site-wide mean: 26 stars / 6 ratings
+        for post in Post.objects.filter(pk__in=rebuilt):
+            self.assertAlmostEqual(rebuilt[post.pk], ranking.bayesian_score(post.rating_sum, post.rating_count, 26 / 6))
+
+
+class SearchTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        self.shake = self.create_post('Protein shake', description='Protein powder, milk and a banana')
+        self.salad = self.create_post('Salad', description='Greens with a little protein from seeds, olive oil, lemon and salt')
+        self.run = self.create_post('Morning run', type='workout', description='Five kilometres at an easy pace')
+
+    def titles(self, query):
+        response = self.client.get('/api/posts/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [post['title'] for post in response.json()['results']]
+
+    def test_results_are_ranked_by_bm25(self):
+        # Title words are boosted and a short document outweighs a long one with the same term
+        self.assertEqual(self.titles('protein'), ['Protein shake', 'Salad'])
+        # Matching more query terms ranks higher
+        self.assertEqual(self.titles('olive protein'), ['Salad', 'Protein shake'])
+        self.assertEqual(self.titles('the and'), [])
+
+    def test_edit_reindexes_the_post(self):
+        response = self.client.patch(f'/api/posts/{self.run.pk}/update/', {'description': 'Sprints, then a protein bar'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Morning run', self.titles('protein'))
+        self.assertEqual(self.titles('kilometres'), [])
+
+    def test_unpublished_and_deleted_posts_leave_the_index(self):
+        response = self.client.patch(f'/api/posts/{self.shake.pk}/update/', {'is_public': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles('protein'), ['Salad'])
+
+        self.assertEqual(self.client.delete(f'/api/posts/{self.salad.pk}/delete/').status_code, 204)
+        self.assertEqual(self.titles('protein'), [])
+        self.assertFalse(search.SearchPosting.objects.filter(post_id=self.salad.pk).exists())
+        self.assertEqual(search.SearchTerm.objects.get(term='protein').doc_freq, 0)
+
+    def test_pending_posts_are_not_indexed(self):
+        self.create_post('Protein pancakes', is_approved=False)
+        self.assertNotIn('Protein pancakes', self.titles('protein'))
+
+    def test_rebuild_index_matches_incremental_indexing(self):
+        def index_rows():
+            return (
+                sorted(search.SearchDocument.objects.values_list('post_id', 'length')),
+                dict(search.SearchTerm.objects.filter(doc_freq__gt=0).values_list('term', 'doc_freq')),
+            )
+
+        incremental = index_rows()
+        indexed, terms = search.rebuild_index(chunk_size=2)
+        self.assertEqual(indexed, 3)
+        self.assertEqual(terms, len(incremental[1]))
+        self.assertEqual(index_rows(), incremental)
+        self.assertEqual(self.titles('protein'), ['Protein shake', 'Salad'])
+
+    def test_rebuild_command_drops_stale_rows(self):
+        # Rows left behind by writes that skipped the signals (bulk updates, raw SQL)
+        Post.objects.filter(pk=self.shake.pk).update(is_public=False)
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 2 posts', out.getvalue())
+        self.assertEqual(self.titles('protein'), ['Salad'])
+
+    def test_empty_query_is_rejected(self):
+        for params in ({}, {'q': '  '}):
+            response = self.client.get('/api/posts/search/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+
+
+class AdminStatsTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user('root', 'root@example.com', 'secret-pass-123', is_staff=True)
+        self.authenticate(self.admin)
+        section = Section.objects.create(name='Nutrition')
+        self.create_post('Oats', section=section)
+        self.create_post('Draft', is_approved=False, section=section)
+        self.create_post('Run', user=self.admin, type='workout', is_public=False)
+
+    def test_stats_count_status_type_and_section(self):
+        response = self.client.get('/api/admin/stats/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['summary'], {
+            'total_posts': 3,
+            'public_approved': 1,
+            'public_pending': 1,
+            'private_approved': 1,
+            'private_pending': 0,
+        })
+        self.assertEqual(body['by_type']['meal'], 2)
+        self.assertEqual(body['by_type']['workout'], 1)
+        by_section = {section['name']: section for section in body['by_section']}
+        self.assertEqual(by_section['Nutrition']['total_posts'], 2)
+        self.assertEqual(by_section['Nutrition']['public_pending'], 1)
+        self.assertEqual(by_section[None]['private_approved'], 1)
+
+    def test_snapshot_is_served_until_fresh_is_requested(self):
+        first = self.client.get('/api/admin/stats/').json()
+        self.create_post('Later')
+
+        cached = self.client.get('/api/admin/stats/').json()
+        self.assertEqual(cached['summary']['total_posts'], 3)
+        self.assertEqual(cached['generated_at'], first['generated_at'])
+
+        fresh = self.client.get('/api/admin/stats/', {'fresh': '1'}).json()
+        self.assertEqual(fresh['summary']['total_posts'], 4)
+        # ?fresh=1 also replaces the snapshot for the next plain request
+        self.assertEqual(self.client.get('/api/admin/stats/').json()['summary']['total_posts'], 4)
+
+    @override_settings(ADMIN_STATS_SNAPSHOT_SECONDS=0)
+    def test_zero_seconds_disables_the_snapshot(self):
+        self.client.get('/api/admin/stats/')
+        self.create_post('Later')
+        self.assertEqual(self.client.get('/api/admin/stats/').json()['summary']['total_posts'], 4)
+
+    def test_user_stats_are_paginated_with_post_counts(self):
+        for index in range(settings.REST_FRAMEWORK['PAGE_SIZE']):
+            User.objects.create_user(f'user{index:02d}', f'user{index}@example.com', 'secret-pass-123')
+
+        response = self.client.get('/api/admin/stats/users/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], settings.REST_FRAMEWORK['PAGE_SIZE'] + 2)
+        self.assertIsNotNone(body['next'])
+        counts = {user['username']: user['post_count'] for user in body['results']}
+        self.assertEqual(counts['alice'], 2)
+        self.assertEqual(counts['root'], 1)
+
+    def test_debug_posts_are_capped_and_leave_users_to_the_stats_endpoint(self):
+        response = self.client.get('/api/admin/debug/all-posts/', {'limit': '2'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertNotIn('users', body)
+        self.assertEqual([post['title'] for post in body['posts']], ['Run', 'Draft'])
+        self.assertEqual(body['summary']['total_posts'], 3)
+
+        self.assertEqual(self.client.get('/api/admin/debug/all-posts/', {'limit': 'all'}).status_code, 400)
+
+    def test_admin_stats_need_staff(self):
+        self.authenticate(self.user)
+        for url in ('/api/admin/stats/', '/api/admin/stats/users/', '/api/admin/debug/all-posts/'):
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+
+
+class BenchmarkCommandTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.create_post(section=Section.objects.create(name='Nutrition'))
+        User.objects.create_user('root', 'root@example.com', 'secret-pass-123', is_staff=True)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profile_dir = self.settings(PROFILE_DIR=directory.name)
+        profile_dir.enable()
+        self.addCleanup(profile_dir.disable)
+
+    def test_later_routes_are_benchmarked(self):
+        output = io.StringIO()
+        call_command(
+            'benchmark', '--iterations', '1', '--warmup', '0', '--password', 'secret-pass-123',
+            '--routes', 'admin-profile,admin-db-pool,post-export,metrics', stdout=output,
+        )
+        lines = output.getvalue().splitlines()
+        for route in ('admin-profile-list', 'admin-profile-detail', 'admin-db-pool', 'post-export', 'metrics'):
+            self.assertTrue(any(f' {route} ' in line and ' admin ' in line and ' 200 ' in line for line in lines), route)
+
+    def test_route_without_a_scenario_fails_the_run(self):
+        routes = [route for route in benchmark.ROUTES if route[0] != 'post-export']
+        with mock.patch.object(benchmark, 'ROUTES', routes):
+            with self.assertRaisesMessage(CommandError, 'post-export'):
+                call_command('benchmark', '--iterations', '1', '--warmup', '0', stdout=io.StringIO())
+
+
+class FakeConnectionError(Exception):
+    pass
+
+
+class FakeConnection:
+    """Raw DB-API connection stand-in: alive=False makes the health check fail"""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def execute(self, sql):
+                if not connection.alive:
+                    raise FakeConnectionError('server has gone away')
+
+            def fetchall(self):
+                return [(1,)]
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        return db_pool.ConnectionPool('test-pool', {'SIZE': 1, 'TIMEOUT': 0.05, **options}, FakeConnectionError)
+
+    def test_checkout_reuses_released_connections(self):
+        pool = self.make_pool()
+        connection = pool.checkout(FakeConnection)
+        pool.release(connection, reusable=True)
+
+        self.assertIs(pool.checkout(FakeConnection), connection)
+        self.assertEqual(pool.snapshot()['created'], 1)
+        self.assertEqual(pool.snapshot()['reused'], 1)
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.make_pool()
+        pool.checkout(FakeConnection)
+
+        with self.assertRaisesMessage(OperationalError, "Connection pool 'test-pool' exhausted"):
+            pool.checkout(FakeConnection)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['in_use'], snapshot['waits'], snapshot['timeouts']), (1, 1, 1))
+
+    def test_release_wakes_a_waiting_checkout(self):
+        pool = self.make_pool(TIMEOUT=5)
+        connection = pool.checkout(FakeConnection)
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(connection=pool.checkout(FakeConnection)))
+        waiter.start()
+        while not pool.snapshot()['waits']:
+            time.sleep(0.01)
+
+        pool.release(connection, reusable=True)
+        waiter.join(timeout=5)
+        self.assertIs(result['connection'], connection)
+        self.assertEqual(pool.snapshot()['timeouts'], 0)
+
+    def test_discarded_connection_frees_its_slot_for_a_waiter(self):
+        pool = self.make_pool(TIMEOUT=5)
+        connection = pool.checkout(FakeConnection)
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(connection=pool.checkout(FakeConnection)))
+        waiter.start()
+        while not pool.snapshot()['waits']:
+            time.sleep(0.01)
+
+        pool.release(connection, reusable=False)
+        waiter.join(timeout=5)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(result['connection'], connection)
+        self.assertEqual(pool.snapshot()['discarded'], 1)
+
+    def test_dead_idle_connection_is_replaced(self):
+        pool = self.make_pool(HEALTH_CHECK_IDLE=0)
+        dead = pool.checkout(FakeConnection)
+        pool.release(dead, reusable=True)
+        dead.alive = False
+
+        replacement = pool.checkout(FakeConnection)
+        self.assertIsNot(replacement, dead)
+        self.assertTrue(dead.closed)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['in_use'], snapshot['idle']), (1, 0))
+        self.assertEqual((snapshot['health_checks'], snapshot['reconnects']), (1, 1))
+
+    def test_expired_connection_is_not_reused(self):
+        pool = self.make_pool(MAX_LIFETIME=0)
+        old = pool.checkout(FakeConnection)
+        pool.release(old, reusable=True)
+        self.assertTrue(old.closed)
+        self.assertIsNot(pool.checkout(FakeConnection), old)
+
+    @mock.patch('Trainee.db_pool.time.sleep')
+    def test_connect_is_retried_on_transient_errors(self, sleep):
+        attempts = []
+
+        def connect():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise FakeConnectionError('connection refused')
+            return FakeConnection()
+
+        self.assertIsInstance(self.make_pool().checkout(connect), FakeConnection)
+        self.assertEqual(len(attempts), 3)
+
+    @mock.patch('Trainee.db_pool.time.sleep')
+    def test_failed_connect_gives_the_slot_back(self, sleep):
+        pool = self.make_pool(CONNECT_RETRIES=0)
+
+        def connect():
+            raise FakeConnectionError('connection refused')
+
+        with self.assertRaises(FakeConnectionError):
+            pool.checkout(connect)
+        self.assertIsInstance(pool.checkout(FakeConnection), FakeConnection)
+
+
+class PooledWrapperTests(SimpleTestCase):
+    class Wrapper(db_pool.PooledDatabaseWrapperMixin):
+        """The DatabaseWrapper state _close() looks at"""
+        alias = 'test-wrapper'
+        settings_dict = {'POOL': {'SIZE': 1}}
+
+        class Database:
+            OperationalError = FakeConnectionError
+
+        def __init__(self, connection, autocommit=True, in_atomic_block=False, errors_occurred=False):
+            self.connection = connection
+            self.autocommit = autocommit
+            self.in_atomic_block = in_atomic_block
+            self.errors_occurred = errors_occurred
+
+        def get_autocommit(self):
+            return self.autocommit
+
+    def setUp(self):
+        self.addCleanup(db_pool._pools.pop, self.Wrapper.alias, None)
+
+    def close(self, **state):
+        connection = db_pool.get_pool(self.Wrapper(None)).checkout(FakeConnection)
+        self.Wrapper(connection, **state)._close()
+        return connection, db_pool.get_pool(self.Wrapper(None)).snapshot()
+
+    def test_clean_connection_goes_back_to_the_pool(self):
+        connection, snapshot = self.close()
+        self.assertFalse(connection.closed)
+        self.assertEqual((snapshot['idle'], snapshot['discarded']), (1, 0))
+
+    def test_connection_mid_transaction_is_discarded(self):
+        connection, snapshot = self.close(autocommit=False, in_atomic_block=True)
+        self.assertTrue(connection.closed)
+        self.assertEqual((snapshot['idle'], snapshot['discarded']), (0, 1))
+
+    def test_connection_with_errors_is_discarded(self):
+        connection, snapshot = self.close(errors_occurred=True)
+        self.assertTrue(connection.closed)
+        self.assertEqual((snapshot['idle'], snapshot['discarded']), (0, 1))
+
+    def test_open_implicit_transaction_is_rolled_back_before_reuse(self):
+        connection, snapshot = self.close(autocommit=False)
+        self.assertTrue(connection.rolled_back)
+        self.assertEqual(snapshot['idle'], 1)
@@ -0,0 +1,227 @@
+"""
+Sliding-window request throttles shared by all gunicorn workers.
+
+Counters live in a small SQLite file (THROTTLE_DB) that every worker process
+opens, so a limit holds for the whole server and not per worker. Each key keeps
+the hit count of the current and the previous fixed window; the estimate
+    previous * (unused part of the window) + current
+approximates a true sliding window with two integers per key, updated by one
+UPSERT. Checked by Trainee/middleware.py ThrottleMiddleware before authentication.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# URL name -> scope; scopes keyed by IP protect anonymous endpoints, the others count per user
+VIEW_SCOPES = {
+    'token_obtain_pair': 'login',
+    'token_refresh': 'refresh',
+    'user-create': 'register',
+    'post-create': 'post',
+    'section-post-create': 'post',
+    'post-batch-create': 'post',
+    'comment-create': 'comment',
+    'section-post-comment-create': 'comment',
+    'comment-batch-create': 'comment',
+    'post-export': 'export',
+}
+IP_SCOPES = frozenset(['login', 'refresh', 'register'])
+# Every unsafe request also counts against this scope
+WRITE_SCOPE = 'write'
+SAFE_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+PURGE_INTERVAL = 300
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS throttle (
+    key TEXT PRIMARY KEY,
+    win INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    prev INTEGER NOT NULL,
+    expires REAL NOT NULL
+)
+'''
+
+# All right-hand sides see the old row, so prev takes the count of the window that just ended
+HIT_SQL = '''
+INSERT INTO throttle (key, win, count, prev, expires) VALUES (?, ?, ?, 0, ?)
+ON CONFLICT(key) DO UPDATE SET
+    prev = CASE WHEN win = excluded.win THEN prev WHEN win = excluded.win - 1 THEN count ELSE 0 END,
+    count = CASE WHEN win = excluded.win THEN count + excluded.count ELSE excluded.count END,
+    win = excluded.win,
+    expires = excluded.expires
+RETURNING count, prev
+'''
+
+
+def parse_rate(rate):
+    """'10/minute' -> (10, 60); empty or None disables the scope"""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip().rstrip('s')]
+
+
+def retry_after(limit, window, count, prev, elapsed):
+    """Seconds until one more hit fits under the limit again"""
+    if count >= limit:
+        # The current window alone is full: wait for it to end and decay as the previous one
+        return window - elapsed + window * (1 - (limit - 1) / count)
+    # The previous window's share has to decay below the remaining budget
+    return window * (1 - (limit - 1 - count) / prev) - elapsed
+
+
+class SlidingWindowStore:
+    """One SQLite connection per thread (and per process after a fork)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.purged_at = 0
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Counters are disposable, no need to wait for the disk
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(SCHEMA)
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def hit(self, key, limit, window, weight=1):
+        """
+        Count `weight` hits; returns 0 when allowed, otherwise the seconds to wait.
+        A rejected weighted hit (a batch) is taken back, so one oversized batch
+        does not lock the client out for many windows.
+        """
+        now = time.time()
+        current = int(now // window)
+        conn = self.connection()
+        count, prev = conn.execute(HIT_SQL, (key, current, weight, (current + 2) * window)).fetchone()
+        if now - self.purged_at > PURGE_INTERVAL:
+            self.purged_at = now
+            conn.execute('DELETE FROM throttle WHERE expires < ?', (now,))
+
+        elapsed = now - current * window
+        if prev * (1 - elapsed / window) + count <= limit:
+            return 0
+        if weight > 1:
+            conn.execute('UPDATE throttle SET count = count - ? WHERE key = ? AND win = ?', (weight, key, current))
+        return max(1, math.ceil(retry_after(limit, window, count, prev, elapsed)))
+
+
+store = SlidingWindowStore(settings.THROTTLE_DB)
+
+
+def client_ip(request):
+    """
+    Client address as recorded by the nearest trusted proxy. Entries left of the
+    last NUM_PROXIES in X-Forwarded-For come from the client and are ignored;
+    NUM_PROXIES = 0 means no proxy, REMOTE_ADDR. Azure's front end appends
+    "ip:port" with a new port per connection, so the port is dropped.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if settings.NUM_PROXIES and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',')]
+        address = hops[-min(settings.NUM_PROXIES, len(hops))]
+    if address.startswith('['):
+        address = address[1:].split(']', 1)[0]  # [IPv6]:port
+    elif address.count(':') == 1:
+        address = address.split(':', 1)[0]  # IPv4:port
+    return address or 'unknown'
+
+
+def request_user_id(request):
+    """User id from a valid access token without touching the database, or None"""
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def request_rules(request, view_name):
+    """[(scope, ident)] that apply to the request"""
+    scopes = []
+    scope = VIEW_SCOPES.get(view_name)
+    if scope:
+        scopes.append(scope)
+    if request.method not in SAFE_METHODS:
+        scopes.append(WRITE_SCOPE)
+    if not scopes:
+        return []
+
+    ip = 'ip:' + client_ip(request)
+    user_id = None
+    if any(scope not in IP_SCOPES for scope in scopes):
+        user_id = request_user_id(request)
+    user = f'user:{user_id}' if user_id is not None else ip
+    return [(scope, ip if scope in IP_SCOPES else user) for scope in scopes]
+
+
+def check_request(request, view_name):
+    """Seconds the client has to wait, or 0"""
+    return hit_rules(request_rules(request, view_name))
+
+
+async def acheck_request(request, view_name):
+    """check_request for ASGI requests: the store is only touched, in a thread, when a rule applies"""
+    rules = request_rules(request, view_name)
+    if not rules:
+        return 0
+    return await sync_to_async(hit_rules)(rules)
+
+
+def check_items(request, view_name, items):
+    """
+    Batch endpoints: ThrottleMiddleware counted the request as one hit of the view's scope,
+    the other items of the batch count against it too (the write scope counts requests).
+    """
+    if not settings.THROTTLE_ENABLED or items <= 1:
+        return 0
+    rules = [(scope, ident) for scope, ident in request_rules(request, view_name) if scope != WRITE_SCOPE]
+    return hit_rules(rules, weight=items - 1)
+
+
+def hit_rules(rules, weight=1):
+    wait = 0
+    for scope, ident in rules:
+        rate = parse_rate(settings.THROTTLE_RATES.get(scope))
+        if rate is None:
+            continue
+        try:
+            wait = max(wait, store.hit(f'{scope}:{ident}', *rate, weight=weight))
+        except sqlite3.Error:
+            # A broken store must not take the API down with it
+            logger.exception('Throttle store %s unavailable', settings.THROTTLE_DB)
+            return 0
+    return wait
+
+
+def throttled_body(wait):
+    """Same shape as core.exceptions.custom_exception_handler produces for a DRF Throttled error"""
+    return {
+        'error': True,
+        'message': 'Too many requests',
+        'details': {'detail': str(Throttled(wait).detail)},
+    }
@@ -1,20 +1,22 @@
 from django.urls import path
 from . import views
+from .async_views import read_view
 
 urlpatterns = [
     # ========== HIERARCHICAL URLS (Section → Post → Comment) ==========
     
     # Level 1: Sections
-    path('sections/', views.SectionListView.as_view(), name='section-list'),
+    path('sections/', read_view(views.SectionListView), name='section-list'),
+    path('sections/overview/', views.SectionOverviewView.as_view(), name='section-overview'),
     path('sections/<int:pk>/', views.SectionDetailView.as_view(), name='section-detail'),
     
     # Level 2: Posts within Sections
-    path('sections/<int:section_id>/posts/', views.SectionPostsView.as_view(), name='section-posts'),
-    path('sections/<int:section_id>/posts/<int:pk>/', views.PostDetailView.as_view(), name='section-post-detail'),
+    path('sections/<int:section_id>/posts/', read_view(views.SectionPostsView), name='section-posts'),
+    path('sections/<int:section_id>/posts/<int:pk>/', read_view(views.PostDetailView), name='section-post-detail'),
     path('sections/<int:section_id>/posts/create/', views.PostCreateView.as_view(), name='section-post-create'),
     
     # Level 3: Comments within Section Posts
-    path('sections/<int:section_id>/posts/<int:post_id>/comments/', views.CommentListView.as_view(), name='section-post-comments'),
+    path('sections/<int:section_id>/posts/<int:post_id>/comments/', read_view(views.CommentListView), name='section-post-comments'),
     path('sections/<int:section_id>/posts/<int:post_id>/comments/create/', views.CommentCreateView.as_view(), name='section-post-comment-create'),
     
     # ========== FLAT URLS (for convenience and backward compatibility) ==========
@@ -32,12 +34,26 @@ urlpatterns = [
     path('admin/users/<int:pk>/approve/', views.approve_user, name='admin-approve-user'),
     path('admin/pending-posts/', views.pending_posts, name='admin-pending-posts'),
     path('admin/debug/all-posts/', views.all_posts_debug, name='admin-debug-posts'),
+    path('admin/stats/', views.admin_stats, name='admin-stats'),
+    path('admin/stats/users/', views.UserStatsView.as_view(), name='admin-stats-users'),
+    path('admin/profiles/', views.profile_list, name='admin-profile-list'),
+    path('admin/profiles/<str:profile_id>/', views.profile_detail, name='admin-profile-detail'),
+    path('admin/db-pool/', views.db_pool_stats, name='admin-db-pool'),
+    path('admin/moderation/queue/', views.ModerationQueueView.as_view(), name='admin-moderation-queue'),
+    path('admin/moderation/claim/', views.claim_pending_posts, name='admin-moderation-claim'),
+    path('admin/moderation/approve/', views.bulk_approve_posts, name='admin-moderation-approve'),
+    path('admin/moderation/reject/', views.bulk_reject_posts, name='admin-moderation-reject'),
     
     # Post URLs (flat access)
     path('posts/', views.PostListView.as_view(), name='post-list'),
-    path('posts/public/', views.PublicPostsView.as_view(), name='public-posts'),
-    path('posts/<int:pk>/', views.PostDetailView.as_view(), name='post-detail'),
+    path('posts/public/', read_view(views.PublicPostsView), name='public-posts'),
+    path('posts/export/', views.export_posts, name='post-export'),
+    path('posts/search/', views.PostSearchView.as_view(), name='post-search'),
+    path('posts/top/', views.TopPostsView.as_view(), name='post-top'),
+    path('posts/trending/', views.TrendingPostsView.as_view(), name='post-trending'),
+    path('posts/<int:pk>/', read_view(views.PostDetailView), name='post-detail'),
     path('posts/create/', views.PostCreateView.as_view(), name='post-create'),
+    path('posts/batch/', views.batch_create_posts, name='post-batch-create'),
     path('posts/<int:pk>/update/', views.PostUpdateView.as_view(), name='post-update'),  # PATCH only
     path('posts/<int:pk>/replace/', views.PostReplaceView.as_view(), name='post-replace'),  # PUT only
     path('posts/<int:pk>/delete/', views.PostDeleteView.as_view(), name='post-delete'),
@@ -45,17 +61,19 @@ urlpatterns = [
     path('posts/<int:pk>/approve/', views.approve_post, name='post-approve'),
     
     # Comment URLs (flat access)
-    path('posts/<int:post_id>/comments/', views.CommentListView.as_view(), name='comment-list'),
+    path('posts/<int:post_id>/comments/', read_view(views.CommentListView), name='comment-list'),
     path('comments/<int:pk>/', views.CommentDetailView.as_view(), name='comment-detail'),
     path('posts/<int:post_id>/comments/create/', views.CommentCreateView.as_view(), name='comment-create'),
+    path('posts/<int:post_id>/comments/batch/', views.batch_create_comments, name='comment-batch-create'),
     path('comments/<int:pk>/update/', views.CommentUpdateView.as_view(), name='comment-update'),  # PATCH only
     path('comments/<int:pk>/replace/', views.CommentReplaceView.as_view(), name='comment-replace'),  # PUT only
     path('comments/<int:pk>/delete/', views.CommentDeleteView.as_view(), name='comment-delete'),
     
     # Rating URLs
-    path('posts/<int:post_id>/ratings/', views.RatingListView.as_view(), name='rating-list'),
+    path('posts/<int:post_id>/ratings/', read_view(views.RatingListView), name='rating-list'),
     path('ratings/<int:pk>/', views.RatingDetailView.as_view(), name='rating-detail'),
     path('posts/<int:post_id>/ratings/create/', views.RatingCreateView.as_view(), name='rating-create'),
+    path('ratings/batch/', views.batch_create_ratings, name='rating-batch-create'),
     path('ratings/<int:pk>/update/', views.RatingUpdateView.as_view(), name='rating-update'),  # PATCH only
     path('ratings/<int:pk>/replace/', views.RatingReplaceView.as_view(), name='rating-replace'),  # PUT only
     path('ratings/<int:pk>/delete/', views.RatingDeleteView.as_view(), name='rating-delete'),
@@ -1,18 +1,32 @@
+import os
+
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Count
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from .models import Post, Comment, Rating, Section
-from .serializers import UserSerializer, UserCreateSerializer, UserUpdateSerializer, PostSerializer, CommentSerializer, RatingSerializer, SectionSerializer
+from django.db import connections, transaction
+from django.utils import timezone
+from datetime import timedelta
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Sum
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from .models import Post, Comment, Rating, Section, ModerationLease
+from .pagination import OptionalCursorPagination
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin, GLOBAL_RESOURCE, bump_versions
+from . import export, profiling, ranking, search, stats, throttling
+from Trainee import db_pool
+from .serializers import UserSerializer, UserCreateSerializer, UserUpdateSerializer, PostSerializer, CommentSerializer, RatingSerializer, SectionSerializer, SectionOverviewSerializer, UserStatsSerializer
 
 # Section views
 @extend_schema(tags=['Sections'])
-class SectionListView(generics.ListCreateAPIView):
+class SectionListView(CachedResponseMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List all sections or create a new section (admin only for creation)"""
-    queryset = Section.objects.all()
+    cache_resources = ('sections',)
+    queryset = Section.objects.annotate(post_count=Count('posts')).order_by('name')
     serializer_class = SectionSerializer
     
     def get_permissions(self):
@@ -21,8 +35,9 @@ class SectionListView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
 
 @extend_schema(tags=['Sections'])
-class SectionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SectionDetailView(CachedResponseMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update or delete a section (admin only for update/delete)"""
+    cache_resources = ('sections',)
     queryset = Section.objects.all()
     serializer_class = SectionSerializer
     
@@ -31,16 +46,45 @@ class SectionDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
+@extend_schema(
+    tags=['Sections'],
+    summary="Sections overview",
+    description="All sections with public post counts (meal/workout split), average rating and latest post"
+)
+class SectionOverviewView(CachedResponseMixin, generics.ListAPIView):
+    """Home page section list computed in a single grouped query"""
+    cache_resources = ('sections', 'posts')
+    serializer_class = SectionOverviewSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    
+    def get_queryset(self):
+        visible = Q(posts__is_public=True, posts__is_approved=True)
+        latest = Post.objects.filter(
+            section=OuterRef('pk'), is_public=True, is_approved=True
+        ).order_by('-created_at', '-id')
+        return Section.objects.annotate(
+            post_count=Count('posts', filter=visible),
+            meal_count=Count('posts', filter=visible & Q(posts__type='meal')),
+            workout_count=Count('posts', filter=visible & Q(posts__type='workout')),
+            rating_sum=Sum('posts__rating_sum', filter=visible),
+            rating_count=Sum('posts__rating_count', filter=visible),
+            latest_post_id=Subquery(latest.values('id')[:1]),
+            latest_post_title=Subquery(latest.values('title')[:1]),
+        ).order_by('name')
+
 @extend_schema(tags=['Sections', 'Posts'])
-class SectionPostsView(generics.ListAPIView):
+class SectionPostsView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """List all posts in a specific section"""
+    cache_resources = ('posts',)
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         section_id = self.kwargs['section_id']
         # Show only approved public posts (for all users)
-        return Post.objects.filter(section_id=section_id, is_public=True, is_approved=True)
+        return Post.objects.for_listing().filter(section_id=section_id, is_public=True, is_approved=True)
 
 # User views
 @extend_schema(tags=['Users'])
@@ -81,7 +125,13 @@ class UserUpdateView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user may be built from token claims (JWT_STATELESS_AUTH), never save that one
+        return User.objects.get(pk=self.request.user.pk)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        # User data is embedded in posts, comments and ratings
+        bump_versions(GLOBAL_RESOURCE)
 
 @extend_schema(tags=['Users'])
 class UserDeleteView(generics.DestroyAPIView):
@@ -94,21 +144,23 @@ class UserDeleteView(generics.DestroyAPIView):
     summary="Get user's posts",
     description="Retrieve all posts created by a specific user"
 )
-class UserPostsView(generics.ListAPIView):
+class UserPostsView(ConditionalGetMixin, generics.ListAPIView):
     """Get all posts by a specific user"""
+    cache_resources = ('posts',)
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         user_id = self.kwargs['pk']
         # If viewing own profile, show ALL posts (including pending/private)
         if self.request.user.is_authenticated and str(self.request.user.id) == str(user_id):
-            return Post.objects.filter(user_id=user_id)
+            return Post.objects.for_listing().filter(user_id=user_id)
         # Show only approved public posts for non-authenticated users
         if not self.request.user.is_authenticated:
-            return Post.objects.filter(user_id=user_id, is_public=True, is_approved=True)
+            return Post.objects.for_listing().filter(user_id=user_id, is_public=True, is_approved=True)
         # Show all approved public posts for other authenticated users
-        return Post.objects.filter(user_id=user_id, is_public=True, is_approved=True)
+        return Post.objects.for_listing().filter(user_id=user_id, is_public=True, is_approved=True)
 
 @extend_schema(
     tags=['Admin'],
@@ -148,19 +200,22 @@ def approve_user(request, pk):
 
 # Post views
 @extend_schema(tags=['Posts'])
-class PostListView(generics.ListAPIView):
+class PostListView(ConditionalGetMixin, generics.ListAPIView):
+    cache_resources = ('posts',)
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         # Show only approved public posts for unauthenticated users
         if self.request.user.is_authenticated:
-            return Post.objects.all()
-        return Post.objects.filter(is_public=True, is_approved=True)
+            return Post.objects.for_listing()
+        return Post.objects.for_listing().filter(is_public=True, is_approved=True)
 
 @extend_schema(tags=['Posts'])
-class PostDetailView(generics.RetrieveAPIView):
-    queryset = Post.objects.all()
+class PostDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    cache_resources = ('posts',)
+    queryset = Post.objects.for_listing()
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -283,13 +338,134 @@ def approve_post(request, pk):
         return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @extend_schema(tags=['Posts'])
-class PublicPostsView(generics.ListAPIView):
+class PublicPostsView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     """List only approved public posts"""
+    cache_resources = ('posts',)
+    serializer_class = PostSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
+    
+    def get_queryset(self):
+        return Post.objects.for_listing().filter(is_public=True, is_approved=True)
+
+@extend_schema(
+    tags=['Posts'],
+    summary="Export public posts (NDJSON or CSV)",
+    description="The whole public catalogue in one streamed response instead of paging through /posts/public/: "
+                "author, section, rating aggregates and comment count per post, ordered by updated_at. "
+                "?since= limits it to posts changed since then; the X-Export-Until header is the since "
+                "of the next incremental export. ?comments=1 embeds each post's comments (NDJSON only).",
+    parameters=[
+        OpenApiParameter('output', str, enum=list(export.EXPORT_FORMATS), description='Default: ndjson'),
+        OpenApiParameter('since', str, description='ISO date or datetime'),
+        OpenApiParameter('comments', bool),
+    ],
+    responses={(200, 'application/x-ndjson'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR},
+)
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def export_posts(request):
+    output = request.query_params.get('output', 'ndjson')
+    if output not in export.EXPORT_FORMATS:
+        return Response({'error': f"output must be one of: {', '.join(export.EXPORT_FORMATS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    with_comments = request.query_params.get('comments') in ('1', 'true', 'True')
+    if with_comments and output == 'csv':
+        return Response({'error': 'Comments can only be embedded in the ndjson output'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    since = request.query_params.get('since')
+    try:
+        since = export.parse_since(since) if since else None
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    until = timezone.now()
+    # Decided now, the rows are read after the view has returned
+    using = Post.objects.db
+    chunks = export.iter_post_chunks(since, until, using=using, with_comments=with_comments)
+    content = export.render_chunks(chunks, output)
+    response = StreamingHttpResponse(
+        export.streaming_content(request._request, content), content_type=export.CONTENT_TYPES[output],
+    )
+    response['Content-Disposition'] = f'attachment; filename="posts-{until:%Y%m%dT%H%M%S}.{output}"'
+    response['X-Export-Until'] = until.isoformat()
+    return response
+
+@extend_schema(
+    tags=['Posts'],
+    summary="Search posts",
+    description="Full-text search over public approved posts (title, description, recommendations) ranked by BM25",
+    parameters=[OpenApiParameter('q', str, required=True, description='Search query')],
+)
+class PostSearchView(generics.ListAPIView):
+    """Search public approved posts, best matches first"""
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
-        return Post.objects.filter(is_public=True, is_approved=True)
+        return Post.objects.for_listing().filter(is_public=True, is_approved=True)
+    
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Rank ids from the inverted index, then load only the requested page
+        post_ids = self.paginate_queryset(search.search(query))
+        posts = self.get_queryset().in_bulk(post_ids)
+        serializer = self.get_serializer([posts[pk] for pk in post_ids if pk in posts], many=True)
+        return self.get_paginated_response(serializer.data)
+
+class RankedPostsView(CachedResponseMixin, generics.ListAPIView):
+    """Public approved posts ordered by a precomputed PostRanking score"""
+    cache_resources = ('posts',)
+    serializer_class = PostSerializer
+    permission_classes = [permissions.AllowAny]
+    score_field = None
+    
+    def list(self, request, *args, **kwargs):
+        self.ranking_filters = {}
+        section_id = request.query_params.get('section')
+        if section_id:
+            if not section_id.isdigit():
+                return Response({'error': 'section must be a section id'}, status=status.HTTP_400_BAD_REQUEST)
+            self.ranking_filters['ranking__section_id'] = int(section_id)
+        post_type = request.query_params.get('type')
+        if post_type:
+            types = [choice for choice, _ in Post.TYPE_CHOICES]
+            if post_type not in types:
+                return Response({'error': f"type must be one of: {', '.join(types)}"}, status=status.HTTP_400_BAD_REQUEST)
+            self.ranking_filters['ranking__type'] = post_type
+        return super().list(request, *args, **kwargs)
+    
+    def get_queryset(self):
+        # Driven by the ranking index; posts are joined by primary key
+        return Post.objects.for_listing().filter(
+            is_public=True, is_approved=True, **getattr(self, 'ranking_filters', {})
+        ).order_by(f'-ranking__{self.score_field}', '-ranking__post_id')
+
+RANKED_POSTS_PARAMETERS = [
+    OpenApiParameter('section', int, description='Only posts of this section'),
+    OpenApiParameter('type', str, enum=['meal', 'workout'], description='Only meal or workout plans'),
+]
+
+@extend_schema(
+    tags=['Posts'],
+    summary="Top rated posts",
+    description="Public approved posts ordered by Bayesian average rating",
+    parameters=RANKED_POSTS_PARAMETERS,
+)
+class TopPostsView(RankedPostsView):
+    score_field = 'bayesian_score'
+
+@extend_schema(
+    tags=['Posts'],
+    summary="Trending posts",
+    description="Public approved posts ordered by time-decayed engagement",
+    parameters=RANKED_POSTS_PARAMETERS,
+)
+class TrendingPostsView(RankedPostsView):
+    score_field = 'hot_score'
 
 @extend_schema(
     tags=['Admin'],
@@ -300,73 +476,301 @@ class PublicPostsView(generics.ListAPIView):
 @permission_classes([permissions.IsAdminUser])
 def pending_posts(request):
     """Admin: get all posts waiting for approval (both public and private)"""
-    posts = Post.objects.filter(is_approved=False)
+    posts = Post.objects.for_listing().filter(is_approved=False)
     serializer = PostSerializer(posts, many=True)
     return Response(serializer.data)
 
+# Admin statistics
+DEBUG_POSTS_LIMIT = 200
+
+@extend_schema(
+    tags=['Admin'],
+    summary="Get post statistics (admin only)",
+    description="Post counts by status, type and section from one grouped query. "
+                "Served from a snapshot refreshed every ADMIN_STATS_SNAPSHOT_SECONDS; ?fresh=1 recomputes it.",
+    parameters=[OpenApiParameter('fresh', bool, description='Skip the cached snapshot')],
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admin_stats(request):
+    fresh = request.query_params.get('fresh', '').lower() in ('1', 'true', 'yes')
+    return Response(stats.get_snapshot(fresh=fresh))
+
+@extend_schema(
+    tags=['Admin'],
+    summary="Users with post counts (admin only)",
+    description="Paginated users ordered by username, post counts from one grouped query",
+)
+class UserStatsView(generics.ListAPIView):
+    serializer_class = UserStatsSerializer
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        return stats.users_with_post_counts()
+
 @extend_schema(
     tags=['Admin'],
     summary="Get all posts with status (admin only)",
-    description="Debug endpoint to see all posts and their visibility status"
+    description="Debug endpoint to see posts and their visibility status. "
+                f"Lists the newest posts (?limit=, default {DEBUG_POSTS_LIMIT}); "
+                "use /api/admin/stats/ and /api/admin/stats/users/ for totals."
 )
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def all_posts_debug(request):
-    """Admin: get ALL posts with full status info"""
-    from django.contrib.auth.models import User
-    
-    posts = Post.objects.all().order_by('-created_at')
-    
-    posts_data = []
-    for post in posts:
-        posts_data.append({
-            'id': post.id,
-            'title': post.title,
-            'type': post.type,
-            'is_public': post.is_public,
-            'is_approved': post.is_approved,
-            'author': post.user.username,
-            'author_id': post.user.id,
-            'created_at': post.created_at,
-        })
-    
-    users = User.objects.all().order_by('username')
-    users_data = []
-    for user in users:
-        users_data.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'is_active': user.is_active,
-            'is_staff': user.is_staff,
-            'post_count': Post.objects.filter(user=user).count(),
-        })
-    
+    """Admin: newest posts with full status info and the status summary (users: /api/admin/stats/users/)"""
+    try:
+        limit = int(request.query_params.get('limit', DEBUG_POSTS_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, DEBUG_POSTS_LIMIT))
+
+    posts_data = [
+        {
+            'id': post['id'],
+            'title': post['title'],
+            'type': post['type'],
+            'is_public': post['is_public'],
+            'is_approved': post['is_approved'],
+            'author': post['user__username'],
+            'author_id': post['user_id'],
+            'created_at': post['created_at'],
+        }
+        for post in Post.objects.order_by('-created_at').values(
+            'id', 'title', 'type', 'is_public', 'is_approved', 'user__username', 'user_id', 'created_at'
+        )[:limit]
+    ]
+
     return Response({
         'posts': posts_data,
-        'users': users_data,
-        'summary': {
-            'total_posts': posts.count(),
-            'public_approved': posts.filter(is_public=True, is_approved=True).count(),
-            'public_pending': posts.filter(is_public=True, is_approved=False).count(),
-            'private_approved': posts.filter(is_public=False, is_approved=True).count(),
-            'private_pending': posts.filter(is_public=False, is_approved=False).count(),
-        }
+        'summary': stats.post_breakdown()['summary'],
+    })
+
+# Profiling views
+@extend_schema(
+    tags=['Admin'],
+    summary="List request profiles (admin only)",
+    description="Profiles recorded with the X-Profile header or ?profile= query parameter, newest first"
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def profile_list(request):
+    return Response(profiling.list_profiles())
+
+@extend_schema(
+    tags=['Admin'],
+    summary="Get a request profile (admin only)",
+    description="cProfile profiles: ?output=pstats (text report, ?sort=cumulative|tottime|ncalls|name|filename) "
+                "or ?output=raw (.prof file for snakeviz etc.). Sampled profiles: collapsed stacks for flamegraph tools.",
+    parameters=[
+        OpenApiParameter('output', str, enum=['pstats', 'raw', 'collapsed']),
+        OpenApiParameter('sort', str, enum=list(profiling.PSTATS_SORT_KEYS)),
+    ],
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def profile_detail(request, profile_id):
+    found = profiling.find_profile(profile_id)
+    if found is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    mode, path = found
+    
+    output = request.query_params.get('output', 'pstats' if mode == 'cprofile' else 'collapsed')
+    if mode == 'sample' or output == 'collapsed':
+        if mode != 'sample':
+            return Response({'error': 'Collapsed stacks are only recorded by the sampling profiler (X-Profile: sample)'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return FileResponse(open(path, 'rb'), content_type='text/plain; charset=utf-8')
+    if output == 'raw':
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.prof')
+    
+    sort = request.query_params.get('sort', 'cumulative')
+    if sort not in profiling.PSTATS_SORT_KEYS:
+        return Response({'error': f"sort must be one of: {', '.join(profiling.PSTATS_SORT_KEYS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return HttpResponse(profiling.pstats_text(path, sort=sort), content_type='text/plain; charset=utf-8')
+
+# Connection pool
+@extend_schema(
+    tags=['Admin'],
+    summary="Database connection pool statistics (admin only)",
+    description="Counters of the worker process that answers the request: checkouts, reuses, waits, "
+                "reconnects etc. per database alias. Every gunicorn worker has its own pool; "
+                "/metrics sums them across workers (trainee_db_pool_events_total)."
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def db_pool_stats(request):
+    return Response({
+        'enabled': any(connections[alias].settings_dict['ENGINE'].startswith('Trainee.db_pool') for alias in connections),
+        'pid': os.getpid(),
+        'pools': db_pool.pool_stats(),
+    })
+
+# Moderation views
+@extend_schema(
+    tags=['Admin'],
+    summary="Moderation queue (admin only)",
+    description="Paginated pending posts, oldest first. ?claimed=mine shows posts leased to you, "
+                "?claimed=unclaimed only posts nobody holds a lease on.",
+    parameters=[OpenApiParameter('claimed', str, enum=['mine', 'unclaimed'])],
+)
+class ModerationQueueView(generics.ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = OptionalCursorPagination
+    
+    def get_queryset(self):
+        now = timezone.now()
+        queryset = Post.objects.for_listing().filter(is_approved=False)
+        claimed = self.request.query_params.get('claimed')
+        if claimed == 'mine':
+            queryset = queryset.filter(moderation_lease__moderator=self.request.user, moderation_lease__expires_at__gt=now)
+        elif claimed == 'unclaimed':
+            queryset = queryset.exclude(moderation_lease__expires_at__gt=now)
+        return queryset.order_by('created_at', 'id')
+
+def parse_moderation_ids(request):
+    """Read {"ids": [...]} from a bulk moderation request; returns (ids, error_response)"""
+    ids = request.data.get('ids') if isinstance(request.data, dict) else None
+    if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+        return None, Response({'error': 'ids must be a non-empty list of post ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > settings.MODERATION_MAX_BATCH:
+        return None, Response(
+            {'error': f'Too many ids: {len(ids)} (maximum {settings.MODERATION_MAX_BATCH} per request)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return ids, None
+
+def leased_by_others(ids, user, now):
+    return set(
+        ModerationLease.objects.filter(post_id__in=ids, expires_at__gt=now)
+        .exclude(moderator=user).values_list('post_id', flat=True)
+    )
+
+@extend_schema(
+    tags=['Admin'],
+    request=None,
+    responses={200: PostSerializer(many=True)},
+    summary="Claim pending posts (admin only)",
+    description="Lease the oldest unclaimed pending posts to the current admin for MODERATION_LEASE_SECONDS. "
+                "Body: {\"count\": 20}. Claiming again returns a new batch; your earlier leases stay until they expire."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def claim_pending_posts(request):
+    """Admin: take a batch of pending posts from the moderation queue"""
+    try:
+        count = int(request.data.get('count', 20))
+    except (TypeError, ValueError, AttributeError):
+        return Response({'error': 'count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    count = max(1, min(count, settings.MODERATION_MAX_BATCH))
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.MODERATION_LEASE_SECONDS)
+    
+    with transaction.atomic():
+        # SKIP LOCKED: concurrent claims get disjoint batches instead of waiting on each other
+        post_ids = list(
+            Post.objects.select_for_update(skip_locked=True)
+            .filter(is_approved=False).exclude(moderation_lease__expires_at__gt=now)
+            .order_by('created_at', 'id').values_list('id', flat=True)[:count]
+        )
+        ModerationLease.objects.filter(post_id__in=post_ids).delete()  # expired leases
+        ModerationLease.objects.bulk_create([
+            ModerationLease(post_id=post_id, moderator=request.user, expires_at=expires_at) for post_id in post_ids
+        ])
+    
+    posts = Post.objects.for_listing().filter(pk__in=post_ids).order_by('created_at', 'id')
+    return Response({
+        'lease_expires_at': expires_at,
+        'posts': PostSerializer(posts, many=True).data,
+    })
+
+@extend_schema(
+    tags=['Admin'],
+    request=None,
+    summary="Bulk approve posts (admin only)",
+    description="Body: {\"ids\": [1, 2, 3]}. Approves all listed pending posts with a single UPDATE. "
+                "Posts leased to another admin are skipped."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_approve_posts(request):
+    """Admin: approve many posts at once"""
+    ids, error_response = parse_moderation_ids(request)
+    if error_response:
+        return error_response
+    now = timezone.now()
+    
+    with transaction.atomic():
+        blocked = leased_by_others(ids, request.user, now)
+        approved_ids = list(
+            Post.objects.select_for_update()
+            .filter(pk__in=[pk for pk in ids if pk not in blocked], is_approved=False)
+            .values_list('id', flat=True)
+        )
+        Post.objects.filter(pk__in=approved_ids).update(is_approved=True, updated_at=now)
+        ModerationLease.objects.filter(post_id__in=approved_ids).delete()
+        
+        # update() skips the post signals: index newly visible posts and refresh rankings here
+        for post in Post.objects.filter(pk__in=approved_ids, is_public=True):
+            search.index_post(post)
+        ranking.refresh_posts(approved_ids)
+        transaction.on_commit(lambda: bump_versions('posts', 'sections'))
+    
+    approved = set(approved_ids)
+    return Response({
+        'approved': approved_ids,
+        'leased_by_others': sorted(blocked),
+        'not_pending': [pk for pk in ids if pk not in approved and pk not in blocked],
+    })
+
+@extend_schema(
+    tags=['Admin'],
+    request=None,
+    summary="Bulk reject posts (admin only)",
+    description="Body: {\"ids\": [1, 2, 3]}. Deletes the listed pending posts. Posts leased to another admin are skipped."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_reject_posts(request):
+    """Admin: remove many inappropriate pending posts at once"""
+    ids, error_response = parse_moderation_ids(request)
+    if error_response:
+        return error_response
+    now = timezone.now()
+    
+    with transaction.atomic():
+        blocked = leased_by_others(ids, request.user, now)
+        rejected = Post.objects.filter(pk__in=[pk for pk in ids if pk not in blocked], is_approved=False)
+        rejected_ids = list(rejected.values_list('id', flat=True))
+        rejected.delete()
+    
+    rejected = set(rejected_ids)
+    return Response({
+        'rejected': rejected_ids,
+        'leased_by_others': sorted(blocked),
+        'not_pending': [pk for pk in ids if pk not in rejected and pk not in blocked],
     })
 
 # Comment views
 @extend_schema(tags=['Comments'])
-class CommentListView(generics.ListAPIView):
+class CommentListView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
+    cache_resources = ('comments:{post_id}',)
     serializer_class = CommentSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         post_id = self.kwargs['post_id']
-        return Comment.objects.filter(post_id=post_id)
+        # Author joined in (one query per page); ordered like the cursor paginator and the post/created_at index
+        return Comment.objects.filter(post_id=post_id).select_related('user').order_by('created_at', 'id')
 
 @extend_schema(tags=['Comments'])
-class CommentDetailView(generics.RetrieveAPIView):
-    queryset = Comment.objects.all()
+class CommentDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    # Every comment write also bumps 'posts' (comment counts)
+    cache_resources = ('posts',)
+    queryset = Comment.objects.select_related('user')
     serializer_class = CommentSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -379,7 +783,9 @@ class CommentCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         post_id = self.kwargs['post_id']
         post = get_object_or_404(Post, id=post_id)
-        serializer.save(user=self.request.user, post=post)
+        with transaction.atomic():
+            serializer.save(user=self.request.user, post=post)
+            Post.adjust_counters(post.pk, comment_count=1)
 
 @extend_schema(
     tags=['Comments'],
@@ -442,20 +848,31 @@ class CommentDeleteView(generics.DestroyAPIView):
         if self.request.user.is_staff:
             return Comment.objects.all()
         return Comment.objects.filter(user=self.request.user)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # A concurrent delete got there first: the counter was already decremented
+            if instance.delete()[0]:
+                Post.adjust_counters(instance.post_id, comment_count=-1)
 
 # Rating views  
 @extend_schema(tags=['Ratings'])
-class RatingListView(generics.ListAPIView):
+class RatingListView(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
+    cache_resources = ('ratings:{post_id}',)
     serializer_class = RatingSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
     
     def get_queryset(self):
         post_id = self.kwargs['post_id']
-        return Rating.objects.filter(post_id=post_id)
+        # Author joined in (one query per page); ordered like the cursor paginator and the post/created_at index
+        return Rating.objects.filter(post_id=post_id).select_related('user').order_by('created_at', 'id')
 
 @extend_schema(tags=['Ratings'])
-class RatingDetailView(generics.RetrieveAPIView):
-    queryset = Rating.objects.all()
+class RatingDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    # Every rating write also bumps 'posts' (rating averages)
+    cache_resources = ('posts',)
+    queryset = Rating.objects.select_related('user')
     serializer_class = RatingSerializer
     permission_classes = [permissions.AllowAny]
 
@@ -478,25 +895,39 @@ class RatingCreateView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Check if rating already exists, update it instead of creating new
-        existing_rating = Rating.objects.filter(post=post, user=request.user).first()
-        if existing_rating:
-            # Update existing rating with validated data
-            existing_rating.rating = serializer.validated_data['rating']
-            existing_rating.save()
-            serializer = self.get_serializer(existing_rating)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
-            # Create new rating
-            serializer.save(user=request.user, post=post)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        with transaction.atomic():
+            # Check if rating already exists, update it instead of creating new
+            existing_rating = Rating.objects.select_for_update().filter(post=post, user=request.user).first()
+            if existing_rating:
+                # Update existing rating with validated data
+                old_value = existing_rating.rating
+                existing_rating.rating = serializer.validated_data['rating']
+                existing_rating.save()
+                Post.adjust_counters(post.pk, rating_sum=existing_rating.rating - old_value)
+                serializer = self.get_serializer(existing_rating)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+            else:
+                # Create new rating
+                serializer.save(user=request.user, post=post)
+                Post.adjust_counters(post.pk, rating_sum=serializer.instance.rating, rating_count=1)
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class RatingCounterMixin:
+    """Keeps Post.rating_sum in step when an existing rating value changes"""
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # The value read by get_object() may already be stale; concurrent updates queue on the row lock
+            old_value = get_object_or_404(Rating.objects.select_for_update(), pk=serializer.instance.pk).rating
+            rating = serializer.save()
+            Post.adjust_counters(rating.post_id, rating_sum=rating.rating - old_value)
 
 @extend_schema(
     tags=['Ratings'],
     summary="Partial update of rating (PATCH only)",
     description="Update specific fields of a rating. Only provided fields will be updated."
 )
-class RatingUpdateView(generics.UpdateAPIView):
+class RatingUpdateView(RatingCounterMixin, generics.UpdateAPIView):
     """PATCH only - partial update"""
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
@@ -515,7 +946,7 @@ class RatingUpdateView(generics.UpdateAPIView):
         422: OpenApiResponse(description='Missing required field: rating')
     }
 )
-class RatingReplaceView(generics.UpdateAPIView):
+class RatingReplaceView(RatingCounterMixin, generics.UpdateAPIView):
     """PUT only - full replacement"""
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
@@ -556,3 +987,186 @@ class RatingDeleteView(generics.DestroyAPIView):
         if self.request.user.is_staff:
             return Rating.objects.all()
         return Rating.objects.filter(user=self.request.user)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Locked first, so the value subtracted is the one deleted
+            rating = Rating.objects.select_for_update().filter(pk=instance.pk).first()
+            # A concurrent delete got there first: the counters were already decremented
+            if rating is not None and rating.delete()[0]:
+                Post.adjust_counters(rating.post_id, rating_sum=-rating.rating, rating_count=-1)
+
+# Batch views
+def validate_batch(request, serializer_class, exclude=()):
+    """
+    Validate every item of a batch request body with the serializer's own validators,
+    after charging the items to the view's throttle scope. Returns (valid, results, error_response): valid is a list of (index, item, validated_data),
+    results holds the per-item errors. Keys in `exclude` are left to the caller to resolve in bulk.
+    """
+    items = request.data
+    if not isinstance(items, list) or not items:
+        return [], [], Response({'error': 'Request body must be a non-empty list of items'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        return [], [], Response(
+            {'error': f'Too many items: {len(items)} (maximum {settings.BATCH_MAX_ITEMS} per request)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    # Every item counts against the post/comment throttle, not just the request
+    wait = throttling.check_items(request, request.resolver_match.view_name, len(items))
+    if wait:
+        response = Response(throttling.throttled_body(wait), status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(wait)
+        return [], [], response
+    
+    valid = []
+    results = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'status': 400, 'errors': {'non_field_errors': ['Item must be an object']}})
+            continue
+        serializer = serializer_class(data={k: v for k, v in item.items() if k not in exclude})
+        if serializer.is_valid():
+            valid.append((index, item, serializer.validated_data))
+        else:
+            results.append({'index': index, 'status': 400, 'errors': serializer.errors})
+    return valid, results, None
+
+def batch_response(results):
+    """201 if every item was created/updated, 207 if only some were, 400 if none"""
+    results.sort(key=lambda result: result['index'])
+    failed = sum(1 for result in results if result['status'] == 400)
+    if not failed:
+        response_status = status.HTTP_201_CREATED
+    elif failed == len(results):
+        response_status = status.HTTP_400_BAD_REQUEST
+    else:
+        response_status = status.HTTP_207_MULTI_STATUS
+    return Response({'results': results, 'succeeded': len(results) - failed, 'failed': failed}, status=response_status)
+
+def related_id_error(value):
+    # Same message PrimaryKeyRelatedField produces for a missing object
+    return [f'Invalid pk "{value}" - object does not exist.']
+
+@extend_schema(
+    tags=['Posts'],
+    request=PostSerializer(many=True),
+    summary="Create posts in bulk",
+    description="Validate a list of posts with the PostSerializer rules and insert the valid ones in one transaction. "
+                "Returns per-item results; `id` is null on databases that cannot return ids from bulk inserts (MySQL)."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_create_posts(request):
+    """Bulk PostCreateView"""
+    # section_id is resolved with one query for the whole batch instead of one per item
+    valid, results, error_response = validate_batch(request, PostSerializer, exclude=('section_id',))
+    if error_response:
+        return error_response
+    
+    section_ids = {item['section_id'] for _, item, _ in valid if item.get('section_id') is not None}
+    sections = Section.objects.in_bulk([pk for pk in section_ids if str(pk).isdigit()])
+    
+    to_create = []
+    for index, item, data in valid:
+        section_id = item.get('section_id')
+        section = None
+        if section_id is not None:
+            section = sections.get(int(section_id)) if str(section_id).isdigit() else None
+            if section is None:
+                results.append({'index': index, 'status': 400, 'errors': {'section_id': related_id_error(section_id)}})
+                continue
+        to_create.append((index, Post(user=request.user, section=section, **data)))
+    
+    with transaction.atomic():
+        Post.objects.bulk_create([post for _, post in to_create], batch_size=500)
+        # bulk_create skips signals; new posts are unapproved, so only cached listings change
+        transaction.on_commit(lambda: bump_versions('posts', 'sections'))
+    
+    results.extend({'index': index, 'status': 201, 'id': post.pk} for index, post in to_create)
+    return batch_response(results)
+
+@extend_schema(
+    tags=['Comments'],
+    request=CommentSerializer(many=True),
+    summary="Create comments in bulk",
+    description="Validate a list of comments for one post and insert the valid ones in one transaction."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_create_comments(request, post_id):
+    """Bulk CommentCreateView"""
+    post = get_object_or_404(Post, id=post_id)
+    valid, results, error_response = validate_batch(request, CommentSerializer)
+    if error_response:
+        return error_response
+    
+    comments = [(index, Comment(post=post, user=request.user, **data)) for index, _, data in valid]
+    if comments:
+        with transaction.atomic():
+            Comment.objects.bulk_create([comment for _, comment in comments], batch_size=500)
+            Post.adjust_counters(post.pk, comment_count=len(comments))
+            transaction.on_commit(lambda: bump_versions(f'comments:{post.pk}', 'posts'))
+    
+    results.extend({'index': index, 'status': 201, 'id': comment.pk} for index, comment in comments)
+    return batch_response(results)
+
+@extend_schema(
+    tags=['Ratings'],
+    request=RatingSerializer(many=True),
+    summary="Create or update ratings in bulk",
+    description="Each item needs `post` and `rating`. Like RatingCreateView, an existing rating of the same user "
+                "for that post is updated (status 200) instead of duplicated (status 201)."
+)
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def batch_create_ratings(request):
+    """Bulk RatingCreateView with the same upsert semantics"""
+    valid, results, error_response = validate_batch(request, RatingSerializer)
+    if error_response:
+        return error_response
+    
+    post_ids = {item.get('post') for _, item, _ in valid}
+    existing_posts = set(Post.objects.filter(pk__in=[pk for pk in post_ids if str(pk).isdigit()]).values_list('pk', flat=True))
+    
+    # Later items for the same post win, as if they were sent one after another
+    by_post = {}
+    for index, item, data in valid:
+        post_id = item.get('post')
+        post_id = int(post_id) if str(post_id).isdigit() else None
+        if post_id not in existing_posts:
+            results.append({'index': index, 'status': 400, 'errors': {'post': related_id_error(item.get('post'))}})
+            continue
+        if post_id in by_post:
+            superseded_index = by_post[post_id][0]
+            results.append({'index': superseded_index, 'status': 200, 'superseded_by': index})
+        by_post[post_id] = (index, data['rating'])
+    
+    with transaction.atomic():
+        existing = {
+            rating.post_id: rating
+            for rating in Rating.objects.select_for_update().filter(user=request.user, post_id__in=list(by_post))
+        }
+        to_create = []
+        to_update = []
+        deltas = {}
+        now = timezone.now()
+        for post_id, (index, value) in by_post.items():
+            rating = existing.get(post_id)
+            if rating is not None:
+                deltas[post_id] = {'rating_sum': value - rating.rating}
+                rating.rating = value
+                rating.updated_at = now  # bulk_update skips auto_now
+                to_update.append((index, rating))
+            else:
+                deltas[post_id] = {'rating_sum': value, 'rating_count': 1}
+                to_create.append((index, Rating(post_id=post_id, user=request.user, rating=value)))
+        
+        Rating.objects.bulk_create([rating for _, rating in to_create], batch_size=500)
+        Rating.objects.bulk_update([rating for _, rating in to_update], ['rating', 'updated_at'], batch_size=500)
+        Post.adjust_counters_many(deltas)
+        resources = ['posts'] + [f'ratings:{post_id}' for post_id in by_post]
+        transaction.on_commit(lambda: bump_versions(*resources))
+    
+    results.extend({'index': index, 'status': 201, 'id': rating.pk} for index, rating in to_create)
+    results.extend({'index': index, 'status': 200, 'id': rating.pk} for index, rating in to_update)
+    return batch_response(results)
@@ -1,13 +1,28 @@
 # Gunicorn configuration for Azure App Service
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 # Bind to the port provided by Azure
 bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 
 # Worker processes
 workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
+
+# GUNICORN_WORKER=asgi runs Trainee.asgi on uvicorn workers with the async read views
+# (core/async_views.py), so a slow query no longer holds a whole worker; default is sync WSGI.
+# Django's own middleware (sessions, CSRF, auth, messages...) still runs in a thread per hook
+# under ASGI, which costs ~2 ms per request, and on one core with a local database ASGI was
+# slower at 8+ connections. Only switch after `manage.py benchmark_concurrency --compare`
+# against both deployments shows a gain with the production database.
+if os.environ.get('GUNICORN_WORKER', 'sync') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'Trainee.asgi:application'
+    os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+else:
+    worker_class = 'sync'
+    wsgi_app = 'Trainee.wsgi:application'
 worker_connections = 1000
 timeout = 120
 keepalive = 5
@@ -35,3 +50,22 @@ secure_scheme_headers = {
     'X-FORWARDED-PROTO': 'https',
     'X-FORWARDED-SSL': 'on'
 }
+
+# Prometheus metrics (core/metrics.py): each worker writes its samples to mmap'd files
+# in this directory and /metrics sums them. Set here so workers inherit it before importing Django.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'trainee-prometheus'))
+
+# Imported here, not in child_exit: that hook runs in a signal handler and can interrupt itself mid-import
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Files left by a previous master would be summed into the new counters
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the live-process files of a dead worker; its counter totals are kept
+    multiprocess.mark_process_dead(worker.pid)
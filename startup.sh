@@ -12,7 +12,7 @@ python manage.py collectstatic --noinput
 echo "Running database migrations..."
 python manage.py migrate --noinput
 
-# Start Gunicorn
+# Start Gunicorn (app and worker class come from gunicorn_config.py, GUNICORN_WORKER=asgi for ASGI)
 echo "Starting Gunicorn server..."
 gunicorn --bind=0.0.0.0:${PORT:-8000} \
          --workers 3 \
@@ -20,4 +20,4 @@ gunicorn --bind=0.0.0.0:${PORT:-8000} \
          --access-logfile '-' \
          --error-logfile '-' \
          --log-level info \
-         Trainee.wsgi:application
+         --config gunicorn_config.py